@@ -0,0 +1,45 @@
+"""
+Benchmarks, run as modules from the project root, for example:
+
+    python -m benchmarks.serializers --rows 100000
+
+They run against the database configured by DJANGO_SETTINGS_MODULE and roll
+back everything they seed.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def rollback():
+    """
+    Run the block in a transaction that is always rolled back.
+    """
+    from django.db import transaction
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def timed(func, repeat=3):
+    """
+    Return the best wall time of `repeat` calls to `func` and its last result.
+    """
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(label, count, seconds, unit='rows'):
+    print(f"{label:<40} {count:>10} {unit} {seconds:>9.3f}s {count / seconds:>14,.0f} {unit}/s")
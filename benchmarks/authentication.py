@@ -0,0 +1,49 @@
+"""
+Authentications/sec of knox TokenAuthentication against CachedTokenAuthentication.
+
+    python -m benchmarks.authentication --requests 5000
+"""
+import argparse
+from benchmarks import report, rollback, setup, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--tokens', type=int, default=5, help='Tokens held by the benchmark user.')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from knox.auth import TokenAuthentication
+    from knox.models import AuthToken
+    from rest_framework.test import APIRequestFactory
+    from users.models import User
+    from utils.authentication import CachedTokenAuthentication
+
+    with rollback():
+        user = User.objects.create_user(username='benchmark-auth', password='benchmark')
+        tokens = [AuthToken.objects.create(user)[1] for _ in range(args.tokens)]
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Token %s' % tokens[-1])
+
+        for label, authentication in (
+            ('TokenAuthentication', TokenAuthentication()),
+            ('CachedTokenAuthentication', CachedTokenAuthentication()),
+        ):
+            authentication.authenticate(request)  # Warm up; fills the token cache.
+            with CaptureQueriesContext(connection) as queries:
+                authentication.authenticate(request)
+
+            def run():
+                for _ in range(args.requests):
+                    authentication.authenticate(request)
+
+            seconds, _ = timed(run, args.repeat)
+            report(label, args.requests, seconds, unit='auths')
+            print(f"{'':<40} {len(queries):>10} queries per authentication")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Broker messages and end-to-end latency of batched task calls against delay().
+
+    python -m benchmarks.batching --jobs 2000 --batch-size 100 --max-wait 0.05
+
+Runs an in-process solo worker on Celery's in-memory broker and cache result
+backend, so no RabbitMQ or Redis is needed. The benchmark task returns the
+time it ran at, and latency is measured from the enqueue call to that time.
+"""
+import argparse
+import os
+import statistics
+import time
+from benchmarks import setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000, help='At most 4000: the in-memory result backend keeps the last 5000 results.')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--max-wait', type=float, default=0.05)
+    args = parser.parse_args()
+    if args.jobs > 4000:
+        parser.error('--jobs must be at most 4000.')
+
+    # core.settings reads the broker and the result backend from the environment.
+    os.environ['CELERY_BROKER_URL'] = 'memory://'
+    os.environ['CELERY_RESULT_BACKEND'] = 'cache+memory://'
+    setup()
+    from celery.contrib.testing.worker import start_worker
+    from celery.signals import after_task_publish
+    from core.batching import Batcher
+    from core.celery import app
+
+    # The in-memory transport and result polling default to 1s and 0.5s sleeps.
+    app.conf.update(broker_transport_options={'polling_interval': 0.001})
+
+    @app.task(name='benchmarks.Clock')
+    def clock(index):
+        return time.time()
+
+    published = []
+    after_task_publish.connect(lambda **kwargs: published.append(1), weak=False)
+    batcher = Batcher(args.batch_size, args.max_wait)
+    cases = [
+        ('delay()', clock.delay),
+        (f'batched, {args.batch_size} per message', lambda index: batcher.enqueue(clock, index)),
+    ]
+
+    # The in-memory transport stalls under the threads pool; a solo worker runs tasks one at a time.
+    with start_worker(app, pool='solo', perform_ping_check=False, loglevel='ERROR'):
+        print(f"{'':<32} {'messages':>9} {'msg/s':>10} {'jobs/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+        for label, enqueue in cases:
+            published.clear()
+            start = time.time()
+            handles = []
+            for index in range(args.jobs):
+                handles.append((time.time(), enqueue(index)))
+            publish_seconds = time.time() - start
+            latencies = [(handle.get(timeout=120, interval=0.001) - enqueued) * 1000 for enqueued, handle in handles]
+            total_seconds = time.time() - start
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{label:<32} {len(published):>9} {len(published) / publish_seconds:>10,.0f} "
+                f"{args.jobs / total_seconds:>10,.0f} {quantiles[49]:>9.1f} {quantiles[98]:>9.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Task throughput of each worker profile on CPU-bound and IO-bound tasks.
+
+    python -m benchmarks.celery_profiles --tasks 200 --cpu-ms 20 --io-ms 100
+
+For every entry of WORKER_PROFILES a worker is started in a subprocess
+with CELERY_WORKER_PROFILE set, as docker-compose starts them, and fed
+--tasks tasks spinning the CPU for --cpu-ms, then --tasks tasks sleeping
+for --io-ms, on the profile's queue.
+
+Broker and results go through the filesystem transport and result backend
+in a temporary directory, so neither RabbitMQ nor Redis is needed. That
+transport is polled: a worker with every prefetch slot taken only looks
+for the next message every 2 seconds, which caps profiles prefetching one
+task per process at about 0.5 tasks/s per process. Pass --broker (with
+CELERY_RESULT_BACKEND set) to measure against RabbitMQ instead.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks import setup
+
+
+def configure_environment(directory, broker):
+    # core.settings reads the broker and the result backend from the environment.
+    if broker:
+        os.environ['CELERY_BROKER_URL'] = broker
+        return
+    results = Path(directory) / 'results'
+    results.mkdir(exist_ok=True)
+    os.environ['CELERY_BROKER_URL'] = 'filesystem://'
+    os.environ['CELERY_RESULT_BACKEND'] = f'file://{results}'
+
+
+def configure(app, directory):
+    broker = Path(directory) / 'broker'
+    broker.mkdir(exist_ok=True)
+    app.conf.update(broker_transport_options={
+        'data_folder_in': str(broker), 'data_folder_out': str(broker), 'control_folder': str(broker), 'polling_interval': 0.01,
+    })
+
+
+def register_tasks(app):
+    @app.task(name='benchmarks.Spin')
+    def spin(milliseconds):
+        deadline = time.thread_time() + milliseconds / 1000
+        while time.thread_time() < deadline:
+            pass
+
+    @app.task(name='benchmarks.Wait')
+    def wait(milliseconds):
+        time.sleep(milliseconds / 1000)
+
+    return spin, wait
+
+
+def run_worker(profile, directory, broker):
+    os.environ['CELERY_WORKER_PROFILE'] = profile
+    configure_environment(directory, broker)
+    setup()
+    from core.celery import app
+    configure(app, directory)
+    register_tasks(app)
+    app.worker_main(['worker', '-l', 'WARNING', '--without-heartbeat', '--without-gossip', '--without-mingle'])
+
+
+def drain(handles):
+    for handle in handles:
+        handle.get(timeout=120, interval=0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--cpu-ms', type=float, default=20, help='CPU time each CPU-bound task spins for.')
+    parser.add_argument('--io-ms', type=float, default=100, help='Time each IO-bound task sleeps for.')
+    parser.add_argument('--profiles', nargs='*', help='Defaults to every entry of WORKER_PROFILES.')
+    parser.add_argument('--broker', help='Broker URL to use instead of the filesystem transport.')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return run_worker(args.worker, args.directory, args.broker)
+    if args.broker and not os.getenv('CELERY_RESULT_BACKEND'):
+        parser.error('--broker needs CELERY_RESULT_BACKEND to be set.')
+
+    directory = tempfile.mkdtemp()
+    configure_environment(directory, args.broker)
+    setup()
+    from django.conf import settings
+    from core.celery import app
+    configure(app, directory)
+    spin, wait = register_tasks(app)
+
+    try:
+        print(f"{'':<10} {'pool':<8} {'concurrency':>11} {'prefetch':>8} {'acks late':>9} {'CPU tasks/s':>12} {'IO tasks/s':>11}")
+        for name in args.profiles or settings.WORKER_PROFILES:
+            profile = settings.WORKER_PROFILES[name]
+            queue = profile['QUEUES'][0]
+            command = [sys.executable, '-m', 'benchmarks.celery_profiles', '--worker', name, '--directory', directory]
+            worker = subprocess.Popen(command + (['--broker', args.broker] if args.broker else []))
+            try:
+                wait.apply_async((0,), queue=queue).get(timeout=120, interval=0.01)  # Worker is up.
+                rates = []
+                for task, milliseconds in ((spin, args.cpu_ms), (wait, args.io_ms)):
+                    start = time.perf_counter()
+                    drain([task.apply_async((milliseconds,), queue=queue) for _ in range(args.tasks)])
+                    rates.append(args.tasks / (time.perf_counter() - start))
+            finally:
+                worker.terminate()
+                worker.wait()
+            concurrency = profile['CONCURRENCY'] or os.cpu_count()
+            print(
+                f"{name:<10} {profile['POOL']:<8} {concurrency:>11} {profile['PREFETCH_MULTIPLIER']:>8} "
+                f"{str(profile['ACKS_LATE']):>9} {rates[0]:>12,.1f} {rates[1]:>11,.1f}"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Concurrent request throughput of the catalog reads under WSGI and ASGI.
+
+    python -m benchmarks.concurrency --concurrency 50 --requests 2000 --seed 20000
+
+Requests are driven in process, without sockets or a server: core.wsgi from
+a pool of --concurrency threads, as a threaded WSGI worker would, and
+core.asgi from --concurrency asyncio tasks on one event loop, against both
+the synchronous DRF views and their async variants. Unlike the other
+benchmarks the seeded rows are committed, so that every thread's connection
+sees them, and deleted at the end.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+from benchmarks import setup
+
+
+def wsgi_get(application, path, query_string):
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query_string, 'HTTP_HOST': 'localhost'}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+    try:
+        size = sum(len(chunk) for chunk in body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    assert status[0].startswith('200'), status[0]
+    return size
+
+
+async def asgi_get(application, path, query_string):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query_string.encode(),
+        'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    disconnected = asyncio.Event()
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Django listens for a client disconnect while the view runs.
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    status, size = [], 0
+
+    async def send(message):
+        nonlocal size
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        else:
+            size += len(message.get('body', b''))
+
+    await application(scope, receive, send)
+    assert status[0] == 200, status[0]
+    return size
+
+
+def run_wsgi(application, path, query_string, requests, concurrency):
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        sizes = list(pool.map(lambda _: wsgi_get(application, path, query_string), range(requests)))
+        return time.perf_counter() - start, sizes
+
+
+def run_asgi(application, path, query_string, requests, concurrency):
+    async def main():
+        remaining = iter(range(requests))
+        sizes = []
+
+        async def client():
+            for _ in remaining:
+                sizes.append(await asgi_get(application, path, query_string))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - start, sizes
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0, help='Items to seed (committed, deleted afterwards); 0 uses the existing catalog.')
+    args = parser.parse_args()
+
+    setup()
+    from benchmarks.seed import seed_categories, seed_items
+    from core.asgi import application as asgi_application
+    from core.wsgi import application as wsgi_application
+    from items.models import Category, Item
+
+    categories = seed_categories(10) if args.seed else []
+    try:
+        if args.seed:
+            seed_items(args.seed, categories)
+        category = Category.objects.filter(item__isnull=False).values_list('uuid', flat=True).first()
+        item = Item.objects.values_list('uuid', flat=True).first()
+        cases = [
+            ('items by category, WSGI sync view', run_wsgi, f'/items/category/{category}/', 'stream=1'),
+            ('items by category, ASGI sync view', run_asgi, f'/items/category/{category}/', 'stream=1'),
+            ('items by category, ASGI async view', run_asgi, f'/items/async/category/{category}/', ''),
+            # There is no synchronous item detail view; under WSGI the async one runs through async_to_sync.
+            ('item detail, WSGI async view', run_wsgi, f'/items/async/{item}', ''),
+            ('item detail, ASGI async view', run_asgi, f'/items/async/{item}', ''),
+            ('categories, WSGI sync view', run_wsgi, '/items/categories', ''),
+            ('categories, ASGI sync view', run_asgi, '/items/categories', ''),
+            ('categories, ASGI async view', run_asgi, '/items/async/categories', ''),
+        ]
+        print(f"{'':<40} {'requests':>10} {'seconds':>9} {'requests/s':>12} {'bytes':>10}")
+        for label, run, path, query_string in cases:
+            application = wsgi_application if run is run_wsgi else asgi_application
+            run(application, path, query_string, args.concurrency, args.concurrency)  # Warm up connections.
+            seconds, sizes = run(application, path, query_string, args.requests, args.concurrency)
+            print(f"{label:<40} {args.requests:>10} {seconds:>9.3f} {args.requests / seconds:>12,.0f} {sizes[0]:>10}")
+    finally:
+        Category.objects.filter(pk__in=[category.pk for category in categories]).delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Latency of attribute filtering and facet counting over a seeded AttributeValue table.
+
+    python -m benchmarks.facets --rows 5000000
+"""
+import argparse
+from benchmarks import rollback, setup, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000000, help='AttributeValue rows to seed.')
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--explain', action='store_true', help='Print the query plans.')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from benchmarks.seed import seed_attribute_values, seed_categories
+    from items.filters import facet_counts, filter_by_attributes
+    from items.models import Item
+
+    with rollback():
+        items = seed_attribute_values(args.rows, seed_categories(args.categories))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        print(f'seeded {items} items, {args.rows} attribute values')
+
+        cases = {
+            'color=red': {'color': ['red']},
+            'color=red AND size=XL': {'color': ['red'], 'size': ['XL']},
+            'color=red AND size=XL AND brand=brand-7': {'color': ['red'], 'size': ['XL'], 'brand': ['brand-7']},
+        }
+        for label, filters in cases.items():
+            matching = filter_by_attributes(Item.objects.all(), filters)
+            page = matching.order_by('name', 'uuid')[:100]
+            queries = [
+                ('first page', lambda: list(page.values_list('uuid', 'name'))),
+                ('facet counts', lambda: facet_counts(matching)),
+            ]
+            for query_label, query in queries:
+                seconds, _ = timed(query, args.repeat)
+                print(f'{label:<45} {query_label:<14} {seconds * 1000:>9.1f} ms')
+            if args.explain:
+                options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+                print(page.explain(**options))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Login latency under mixed load, checking passwords in the request thread
+against the hashing pool.
+
+    python -m benchmarks.login --logins 16 --readers 16 --seconds 10 --workers 4
+
+One process plays a threaded WSGI worker: --logins threads keep posting
+to /users/login (without a session) while --readers threads read the
+category list, both through core.wsgi. Each mode reports the throughput,
+p50 and p99 latency of both, and the logins rejected with 503 once more
+than PASSWORD_HASHING['MAX_QUEUE'] checks wait for the pool. The login
+throttle is off for the run. The benchmark user is committed and deleted
+at the end, with its tokens.
+"""
+import argparse
+import io
+import json
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+from benchmarks import setup
+
+
+def wsgi_request(application, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'HTTP_HOST': 'localhost',
+        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(data)), 'wsgi.input': io.BytesIO(data),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(application, logins, readers, seconds, credentials):
+    deadline = time.perf_counter() + seconds
+    results = {'login': [], 'read': []}
+    statuses = {'login': {}, 'read': {}}
+    lock = threading.Lock()
+
+    def client(kind, method, path, body):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = wsgi_request(application, method, path, body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[kind][status] = statuses[kind].get(status, 0) + 1
+                if status == 200:
+                    results[kind].append(elapsed)
+
+    threads = [threading.Thread(target=client, args=('login', 'POST', '/users/login', credentials)) for _ in range(logins)]
+    threads += [threading.Thread(target=client, args=('read', 'GET', '/items/categories', None)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=16, help='Threads logging in.')
+    parser.add_argument('--readers', type=int, default=16, help='Threads reading categories.')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=None, help='Hashing pool processes; defaults to PASSWORD_HASHING_WORKERS.')
+    args = parser.parse_args()
+
+    setup()
+    from unittest import mock
+    from django.conf import settings
+    from django.test.utils import override_settings
+    from core.wsgi import application
+    from users.models import User
+    from users.views import LoginAPIView
+
+    workers = args.workers or settings.PASSWORD_HASHING['WORKERS']
+    user = User.objects.create_user(username='benchmark-login', password='benchmark')
+    credentials = {'username': user.username, 'password': 'benchmark', 'session': False}
+    try:
+        print(f"{'':<26} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6} {'reads/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        with mock.patch.object(LoginAPIView, 'throttle_classes', []):
+            # Inline first: the pool's queue bound is sized on first use.
+            for label, pool_workers in (('in the request thread', 0), (f'on {workers} pool workers', workers)):
+                with override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'WORKERS': pool_workers}):
+                    run(application, 1, 1, 1, credentials)  # Warm up connections and the pool.
+                    results, statuses = run(application, args.logins, args.readers, args.seconds, credentials)
+                logins, reads = results['login'], results['read']
+                print(
+                    f"{label:<26} {len(logins) / args.seconds:>9,.1f} {percentile(logins, 0.5) * 1000:>8.0f} {percentile(logins, 0.99) * 1000:>8.0f} "
+                    f"{statuses['login'].get(503, 0):>6} {len(reads) / args.seconds:>9,.0f} {percentile(reads, 0.5) * 1000:>8.1f} {percentile(reads, 0.99) * 1000:>8.1f}"
+                )
+    finally:
+        user.delete()
+
+
+if __name__ == '__main__':
+    main()
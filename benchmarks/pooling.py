@@ -0,0 +1,83 @@
+"""
+Request throughput with and without database connection pooling.
+
+    python -m benchmarks.pooling --concurrency 20 --requests 4000
+
+PostgreSQL only. Each configuration runs in its own process, because the
+database engine is chosen from the environment when the settings load:
+a new connection per request (CONN_MAX_AGE=0, no pool), persistent
+per-thread connections (DB_CONN_MAX_AGE) and utils.db.pooled_postgresql with
+a pool smaller than the thread count. Requests go through core.wsgi from
+--concurrency threads, with a distinct query string each so that the
+response cache does not answer them. The seeded categories are committed so
+that the child processes see them, and deleted at the end.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks import report, setup
+
+
+def run_child(args):
+    setup()
+    from benchmarks.concurrency import wsgi_get
+    from core.wsgi import application
+    from utils.metrics import export
+
+    def get(index):
+        return wsgi_get(application, '/items/categories', f'nonce={index}')
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(get, range(args.concurrency)))  # Warm up.
+        start = time.perf_counter()
+        list(pool.map(get, range(args.concurrency, args.concurrency + args.requests)))
+        seconds = time.perf_counter() - start
+    wait = export().get('db_pool_wait_seconds', {}).get('values', {})
+    wait_seconds = sum(value['sum'] for value in wait.values())
+    print(json.dumps({'seconds': seconds, 'wait_seconds': wait_seconds}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_child(args)
+
+    setup()
+    from django.db import connection
+    from benchmarks.seed import seed_categories
+    from items.models import Category
+    if connection.vendor != 'postgresql':
+        parser.error('Connection pooling only applies to PostgreSQL.')
+
+    categories = seed_categories(50)
+    cases = [
+        ('new connection per request', {'DB_POOL_MAX_SIZE': '0', 'DB_CONN_MAX_AGE': '0'}),
+        ('persistent connection per thread', {'DB_POOL_MAX_SIZE': '0', 'DB_CONN_MAX_AGE': '600'}),
+        (f'pool of {args.pool_size}', {'DB_POOL_MAX_SIZE': str(args.pool_size), 'DB_POOL_MIN_SIZE': str(args.pool_size)}),
+    ]
+    try:
+        for label, env in cases:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.pooling', '--child',
+                 '--requests', str(args.requests), '--concurrency', str(args.concurrency)],
+                env={**os.environ, **env}, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+            report(label, args.requests, result['seconds'], unit='requests')
+            if result['wait_seconds']:
+                print(f"{'':<40} {result['wait_seconds'] / args.requests * 1000:.3f} ms average pool wait")
+    finally:
+        Category.objects.filter(pk__in=[category.pk for category in categories]).delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Insert throughput and index size of random UUID, time-ordered UUID and bigint keys.
+
+    python -m benchmarks.primary_keys --rows 10000000 --batch-size 100000
+
+PostgreSQL only. Each key type gets a table shaped like items_attributevalue:
+its own primary key, a foreign key column holding the key of a parent row
+(indexed, as the (item, ...) indexes are) and a short value. Rows are
+COPYed in batches, parents advancing the way new items do, and the sizes
+of both indexes are read once all batches are in. Everything is rolled
+back.
+"""
+import argparse
+import io
+import itertools
+import time
+import uuid
+from benchmarks import rollback, setup
+
+
+def key_factories():
+    from utils.uuids import uuid7
+    counter = itertools.count(1)
+    return {
+        'uuid4': ('uuid', uuid.uuid4),
+        'uuid7': ('uuid', uuid7),
+        'bigint': ('bigint', lambda: next(counter)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=100000)
+    parser.add_argument('--per-parent', type=int, default=5, help='Rows sharing a parent key, like the attribute values of an item.')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    if connection.vendor != 'postgresql':
+        parser.error('The benchmark compares PostgreSQL index sizes.')
+
+    print(f"{'':<8} {'rows':>11} {'seconds':>9} {'rows/s':>10} {'pkey MB':>9} {'fkey MB':>9} {'table MB':>9}")
+    for kind, (column_type, new_key) in key_factories().items():
+        new_parent = key_factories()[kind][1]  # Its own sequence for bigint.
+        table = f'benchmark_keys_{kind}'
+        with rollback(), connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE {table} (key {column_type} PRIMARY KEY, parent {column_type} NOT NULL, value varchar(100) NOT NULL)')
+            cursor.execute(f'CREATE INDEX {table}_parent ON {table} (parent)')
+            seconds = 0.0
+            parent = None
+            for start in range(0, args.rows, args.batch_size):
+                buffer = io.StringIO()
+                for index in range(start, min(start + args.batch_size, args.rows)):
+                    if index % args.per_parent == 0:
+                        parent = new_parent()
+                    buffer.write(f'{new_key()}\t{parent}\tvalue {index % 50}\n')
+                buffer.seek(0)
+                begin = time.perf_counter()
+                cursor.copy_expert(f'COPY {table} (key, parent, value) FROM STDIN', buffer)
+                seconds += time.perf_counter() - begin
+            cursor.execute(
+                'SELECT pg_relation_size(%s), pg_relation_size(%s), pg_relation_size(%s)',
+                [f'{table}_pkey', f'{table}_parent', table],
+            )
+            sizes = [size / 2 ** 20 for size in cursor.fetchone()]
+        print(f"{kind:<8} {args.rows:>11,} {seconds:>9.2f} {args.rows / seconds:>10,.0f} {sizes[0]:>9.1f} {sizes[1]:>9.1f} {sizes[2]:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
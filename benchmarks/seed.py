@@ -0,0 +1,69 @@
+import random
+from decimal import Decimal
+
+WORDS = (
+    'red', 'blue', 'green', 'black', 'white', 'steel', 'wooden', 'compact', 'wireless', 'smart',
+    'phone', 'laptop', 'chair', 'desk', 'lamp', 'camera', 'speaker', 'watch', 'bottle', 'jacket',
+)
+
+
+def seed_categories(count=10):
+    from items.models import Category
+    roots = Category.objects.bulk_create(Category(name=f'Category {i}') for i in range(count))
+    return roots
+
+
+def seed_items(count, categories, batch_size=5000, seed=0):
+    """
+    Bulk insert `count` items with random names and prices spread over `categories`.
+    """
+    from items.models import Item
+    rng = random.Random(seed)
+    created = []
+    for start in range(0, count, batch_size):
+        batch = [
+            Item(
+                name=' '.join(rng.choices(WORDS, k=3)),
+                description=' '.join(rng.choices(WORDS, k=12)),
+                price=Decimal(rng.randrange(100, 1000000)) / 100,
+                category=rng.choice(categories),
+            )
+            for _ in range(min(batch_size, count - start))
+        ]
+        created += Item.objects.bulk_create(batch, batch_size=batch_size)
+    return created
+
+ATTRIBUTES = {
+    'color': WORDS[:5],
+    'size': ('XS', 'S', 'M', 'L', 'XL', 'XXL'),
+    'material': ('cotton', 'wool', 'steel', 'plastic', 'glass', 'oak'),
+    'brand': tuple(f'brand-{i}' for i in range(50)),
+    'rating': tuple(str(i) for i in range(1, 6)),
+}
+
+
+def seed_attribute_values(count, categories, batch_size=5000, seed=0):
+    """
+    Bulk insert items carrying one value for each of ATTRIBUTES until `count`
+    attribute values exist. Returns the number of items created.
+    """
+    from items.models import Attribute, AttributeValue
+    rng = random.Random(seed)
+    attributes = {
+        category.pk: Attribute.objects.bulk_create(Attribute(name=name, category=category) for name in ATTRIBUTES)
+        for category in categories
+    }
+    per_item = len(ATTRIBUTES)
+    items = 0
+    for start in range(0, count, batch_size * per_item):
+        batch = seed_items(min(batch_size, (count - start) // per_item), categories, batch_size, seed=rng.random())
+        AttributeValue.objects.bulk_create(
+            (
+                AttributeValue(item=item, attribute=attribute, value=rng.choice(ATTRIBUTES[attribute.name]))
+                for item in batch
+                for attribute in attributes[item.category_id]
+            ),
+            batch_size=batch_size,
+        )
+        items += len(batch)
+    return items
@@ -0,0 +1,42 @@
+"""
+Rows/sec of the DRF ModelSerializers against the values() read serializers.
+
+    python -m benchmarks.serializers --rows 100000
+"""
+import argparse
+from benchmarks import report, rollback, setup, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+    from benchmarks.seed import seed_categories, seed_items
+    from items.models import Category, Item
+    from items.serializers import CategoryReadSerializer, CategorySerializer, ItemReadSerializer, ItemSerializer
+
+    with rollback():
+        categories = seed_categories(100)
+        seed_items(args.rows, categories)
+        renderer = JSONRenderer()
+        cases = [
+            ('ItemSerializer', lambda: ItemSerializer(Item.objects.all(), many=True).data, args.rows),
+            ('ItemReadSerializer', lambda: ItemReadSerializer(Item.objects.all()).data, args.rows),
+            ('CategorySerializer', lambda: CategorySerializer(Category.objects.all(), many=True).data, len(categories)),
+            ('CategoryReadSerializer', lambda: CategoryReadSerializer(Category.objects.all()).data, len(categories)),
+        ]
+        rendered = []
+        for label, serialize, count in cases:
+            seconds, data = timed(serialize, args.repeat)
+            report(label, count, seconds)
+            rendered.append(renderer.render(sorted(data, key=lambda row: str(row['uuid']))))
+        print('items byte-identical:', rendered[0] == rendered[1])
+        print('categories byte-identical:', rendered[2] == rendered[3])
+
+
+if __name__ == '__main__':
+    main()
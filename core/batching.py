@@ -0,0 +1,152 @@
+"""
+Coalesce many small calls of a Celery task into one broker message.
+
+    from core.batching import delay_batched
+    result = delay_batched(simple_task, 1, 2)
+    result.get(timeout=10)
+
+Calls of the same task are collected per process and published as a single
+RunBatch message once TASK_BATCHING['MAX_SIZE'] calls are pending or the
+oldest one has waited TASK_BATCHING['MAX_WAIT'] seconds. The worker runs the
+calls one after the other in that single invocation, and every caller gets
+a BatchedResult reading its own outcome from the batch result.
+
+Batched calls share the batch's retries, time limits and acknowledgement,
+so use it for short, idempotent jobs. Fanning results back in needs a result
+backend (CELERY_RESULT_BACKEND).
+"""
+import atexit
+import os
+import threading
+import time
+from django.conf import settings
+
+
+class BatchedTaskError(Exception):
+    """
+    A batched call raised; the message carries the exception type and text.
+    """
+
+
+class PendingBatch:
+    def __init__(self, task):
+        self.task = task
+        self.calls = []
+        self.created = time.monotonic()
+        self.sent = threading.Event()
+        self.async_result = None
+        self.error = None
+
+
+class BatchedResult:
+    """
+    Outcome of one call in a batch, with the `ready()`/`get()` subset of AsyncResult.
+    """
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    def ready(self):
+        return self.batch.sent.is_set() and self.batch.async_result is not None and self.batch.async_result.ready()
+
+    def get(self, timeout=None, interval=0.5):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self.batch.sent.wait(timeout):
+            raise TimeoutError('The batch was not published in time.')
+        if self.batch.error is not None:
+            raise self.batch.error
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        outcome = self.batch.async_result.get(timeout=remaining, interval=interval)[self.index]
+        if 'error' in outcome:
+            raise BatchedTaskError(outcome['error'])
+        return outcome['result']
+
+
+class Batcher:
+    """
+    Per-process collector of pending batches, flushed by size from the
+    enqueuing thread and by age from a daemon thread.
+    """
+
+    def __init__(self, max_size, max_wait):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.pid = None
+
+    def enqueue(self, task, *args, **kwargs):
+        with self.lock:
+            self.ensure_flusher()
+            batch = self.pending.get(task.name)
+            if batch is None:
+                batch = self.pending[task.name] = PendingBatch(task)
+                self.wakeup.notify()
+            batch.calls.append((args, kwargs))
+            index = len(batch.calls) - 1
+            full = len(batch.calls) >= self.max_size
+            if full:
+                del self.pending[task.name]
+        if full:
+            self.send(batch)
+        return BatchedResult(batch, index)
+
+    def send(self, batch):
+        from core.tasks import run_batch
+        queue = getattr(batch.task, 'queue', None)
+        try:
+            batch.async_result = run_batch.apply_async((batch.task.name, batch.calls), **({'queue': queue} if queue else {}))
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.sent.set()
+
+    def flush(self):
+        with self.lock:
+            batches = list(self.pending.values())
+            self.pending.clear()
+        for batch in batches:
+            self.send(batch)
+
+    def ensure_flusher(self):
+        # Called with the lock held; threads do not survive a fork, so a
+        # forked worker starts its own.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.pending = {}
+            threading.Thread(target=self.run_flusher, name='celery-batcher', daemon=True).start()
+
+    def run_flusher(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                due = [name for name, batch in self.pending.items() if now - batch.created >= self.max_wait]
+                batches = [self.pending.pop(name) for name in due]
+                if not batches:
+                    deadlines = [batch.created + self.max_wait - now for batch in self.pending.values()]
+                    self.wakeup.wait(min(deadlines) if deadlines else None)
+                    continue
+            for batch in batches:
+                self.send(batch)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = Batcher(settings.TASK_BATCHING['MAX_SIZE'], settings.TASK_BATCHING['MAX_WAIT'])
+            atexit.register(_batcher.flush)
+    return _batcher
+
+
+def delay_batched(task, *args, **kwargs):
+    """
+    Like `task.delay(*args, **kwargs)`, but coalesced with other calls of the same task.
+    """
+    return get_batcher().enqueue(task, *args, **kwargs)
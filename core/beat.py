@@ -0,0 +1,64 @@
+"""
+A beat scheduler that only schedules while it holds a lock, so that a
+second beat started by mistake, or a standby one, sends nothing.
+"""
+import uuid
+from celery.beat import PersistentScheduler
+from celery.utils.log import get_logger
+from django.conf import settings
+from django.core.cache import caches
+
+logger = get_logger(__name__)
+
+LOCK_KEY = 'beat:lock'
+
+
+class LockedScheduler(PersistentScheduler):
+    """
+    PersistentScheduler that ticks only while it holds BEAT_LOCK in the
+    shared cache. The holder renews the lock at least three times per
+    timeout; others retry as often, and take over once it expires.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lock_id = uuid.uuid4().hex
+        self.has_lock = False
+        super().__init__(*args, **kwargs)
+
+    @property
+    def cache(self):
+        return caches[settings.BEAT_LOCK['ALIAS']]
+
+    def acquire_lock(self):
+        if self.cache.add(LOCK_KEY, self.lock_id, settings.BEAT_LOCK['TIMEOUT']) or self.renew_lock():
+            if not self.has_lock:
+                logger.info('beat: Acquired the scheduler lock.')
+            self.has_lock = True
+        elif self.has_lock:
+            logger.warning('beat: Lost the scheduler lock to another beat.')
+            self.has_lock = False
+        return self.has_lock
+
+    def renew_lock(self):
+        """
+        Extend the lock if it is ours. Between the read and the touch it may
+        expire and be taken by another beat, whose lock the touch extends
+        instead; reading the owner again tells whose lock was extended.
+        """
+        cache = self.cache
+        return (
+            cache.get(LOCK_KEY) == self.lock_id
+            and cache.touch(LOCK_KEY, settings.BEAT_LOCK['TIMEOUT'])
+            and cache.get(LOCK_KEY) == self.lock_id
+        )
+
+    def tick(self, *args, **kwargs):
+        renew_interval = settings.BEAT_LOCK['TIMEOUT'] / 3
+        if not self.acquire_lock():
+            return renew_interval
+        return min(super().tick(*args, **kwargs), renew_interval)
+
+    def close(self):
+        if self.has_lock and self.cache.get(LOCK_KEY) == self.lock_id:
+            self.cache.delete(LOCK_KEY)
+        super().close()
@@ -1,13 +1,47 @@
 import os
+import threading
+import time
 from celery import Celery
+from celery.signals import after_task_publish, before_task_publish
+from kombu import Exchange, Queue
+from utils.metrics import histogram
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
-app = Celery('core', broker="pyamqp://rabbitmq:5672")
+# core is not an installed app, so autodiscovery alone never imports core.tasks on the workers.
+app = Celery('core', include=['core.tasks'])
 
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+def apply_worker_profile(name):
+    """
+    Configure this process as a worker of the WORKER_PROFILES entry `name`.
+
+    It has to run before the worker command line is parsed, which resolves
+    the pool and concurrency from the configuration; hence the environment
+    variable rather than a worker option. Explicit -P, -c, -Q and time limit
+    options still take precedence.
+    """
+    from django.conf import settings
+    profile = settings.WORKER_PROFILES[name]
+    app.conf.update(
+        # Bound as producers create missing queues, not to the default exchange.
+        task_queues=[Queue(queue, Exchange(queue), routing_key=queue) for queue in profile['QUEUES']],
+        worker_pool=profile['POOL'],
+        worker_concurrency=profile['CONCURRENCY'],
+        worker_prefetch_multiplier=profile['PREFETCH_MULTIPLIER'],
+        task_acks_late=profile['ACKS_LATE'],
+        task_reject_on_worker_lost=profile['ACKS_LATE'],
+        task_soft_time_limit=profile['SOFT_TIME_LIMIT'],
+        task_time_limit=profile['TIME_LIMIT'],
+    )
+
+
+if os.getenv('CELERY_WORKER_PROFILE'):
+    apply_worker_profile(os.environ['CELERY_WORKER_PROFILE'])
+
+
 @app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs) -> None:
     # Example of periodic task (will be executed every 30 seconds)
@@ -17,3 +51,23 @@ def setup_periodic_tasks(sender, **kwargs) -> None:
 @app.task(name="PeriodicTask (every 30 seconds)")
 def periodic_task() -> None:
     print("Example of periodic task executed!")
+
+
+enqueue_seconds = histogram('celery_enqueue_duration_seconds', 'Time to publish a task message to the broker, by task.')
+# Publishing is synchronous, so both signals fire in the publishing thread.
+# One slot per thread: a publish that raises, and never sends
+# after_task_publish, leaves nothing behind once the next one starts.
+_publish_started = threading.local()
+
+
+@before_task_publish.connect
+def start_publish_timer(sender=None, headers=None, **kwargs):
+    _publish_started.task = headers['id'], time.perf_counter()
+
+
+@after_task_publish.connect
+def record_publish_time(sender=None, headers=None, **kwargs):
+    task_id, start = getattr(_publish_started, 'task', (None, None))
+    _publish_started.task = None, None
+    if task_id == headers['id']:
+        enqueue_seconds.observe(time.perf_counter() - start, task=sender)
@@ -0,0 +1,125 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+import psutil
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from utils.metrics import histogram
+
+probe_seconds = histogram('health_probe_duration_seconds', 'Duration of readiness probes by probe.')
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='health')
+_lock = threading.Lock()
+_last_check = None
+
+
+def probe_database(alias='default', timeout=None):
+    connection = connections[alias]
+    if connection.vendor == 'postgresql' and timeout:
+        return probe_postgresql(connection, timeout)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        # Probe threads live outside the request cycle; honour CONN_MAX_AGE
+        # the way request_finished does.
+        connection.close_if_unusable_or_obsolete()
+
+
+def probe_postgresql(connection, timeout):
+    """
+    Connect afresh with libpq's connect_timeout (whole seconds, at least 2)
+    and a statement_timeout, rather than through the pool, whose checkout
+    waits up to DB_POOL['TIMEOUT'], so that a probe cut off by run_probes
+    does not keep its thread for long.
+    """
+    params = connection.get_connection_params()
+    options = '%s -c statement_timeout=%d' % (params.get('options', ''), timeout * 1000)
+    raw = connection.Database.connect(**{**params, 'connect_timeout': max(2, math.ceil(timeout)), 'options': options.strip()})
+    try:
+        with raw.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        raw.close()
+
+
+def probe_broker(timeout):
+    from core.celery import app
+    with app.connection_for_write(connect_timeout=timeout) as connection:
+        connection.ensure_connection(max_retries=0, timeout=timeout)
+
+
+def probe_cache(alias):
+    cache = caches[alias]
+    cache.set('health:probe', 1, 30)
+    if cache.get('health:probe') != 1:
+        raise RuntimeError('Read back a different value.')
+
+
+def probe_memory(threshold):
+    usage = psutil.virtual_memory().percent
+    if usage > threshold:
+        raise RuntimeError(f'Memory usage {usage}% above {threshold}%.')
+    return {'usage': usage}
+
+
+def get_probes():
+    config = settings.HEALTH_CHECK
+    probes = {'database': partial(probe_database, timeout=config['TIMEOUT'])}
+    if config['BROKER']:
+        probes['broker'] = partial(probe_broker, config['TIMEOUT'])
+    for alias in config['CACHES']:
+        probes['cache:%s' % alias] = partial(probe_cache, alias)
+    probes['memory'] = partial(probe_memory, config['MEMORY_THRESHOLD'])
+    return probes
+
+
+def run_probe(name, probe):
+    start = time.perf_counter()
+    result = {'status': 'ok'}
+    try:
+        result.update(probe() or {})
+    except Exception as e:
+        result = {'status': 'error', 'detail': str(e) or type(e).__name__}
+    result['seconds'] = time.perf_counter() - start
+    probe_seconds.observe(result['seconds'], probe=name)
+    return result
+
+
+def run_probes():
+    """
+    Run every probe concurrently and wait at most HEALTH_CHECK['TIMEOUT']
+    seconds; probes still running are reported as timed out.
+    """
+    timeout = settings.HEALTH_CHECK['TIMEOUT']
+    futures = {name: _executor.submit(run_probe, name, probe) for name, probe in get_probes().items()}
+    wait(futures.values(), timeout=timeout)
+    checks = {}
+    for name, future in futures.items():
+        if future.done():
+            checks[name] = future.result()
+        else:
+            future.cancel()
+            checks[name] = {'status': 'timeout', 'seconds': timeout}
+    return checks
+
+
+def check_readiness():
+    """
+    Return (healthy, checks, age in seconds).
+
+    The composite result is reused for HEALTH_CHECK['CACHE_SECONDS'] seconds
+    and only one thread probes at a time, so frequent probes from many
+    orchestrators cost one round of dependency checks per window.
+    """
+    global _last_check
+    with _lock:
+        now = time.monotonic()
+        if _last_check is None or now - _last_check[0] >= settings.HEALTH_CHECK['CACHE_SECONDS']:
+            _last_check = (now, run_probes())
+        checked_at, checks = _last_check
+    healthy = all(check['status'] == 'ok' for check in checks.values())
+    return healthy, checks, now - checked_at
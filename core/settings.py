@@ -1,8 +1,10 @@
 from pathlib import Path
+import importlib.util
 import os
+import django
 from dotenv import load_dotenv
 from datetime import timedelta
-from rest_framework.settings import api_settings
+from rest_framework import ISO_8601
 
 load_dotenv()
 
@@ -27,9 +29,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
+    'utils.middleware.MetricsMiddleware',
+    'utils.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,7 +48,7 @@ ROOT_URLCONF = 'core.urls'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'knox.auth.TokenAuthentication',
+        'utils.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -58,7 +63,7 @@ REST_KNOX = {
     'USER_SERIALIZER': 'knox.serializers.UserSerializer',
     'TOKEN_LIMIT_PER_USER': None, # By default, this option is disabled and set to None -- thus no limit.
     'AUTO_REFRESH': False, # This defines if the token expiry time is extended by TOKEN_TTL each time the token is used.
-    'EXPIRY_DATETIME_FORMAT': api_settings.DATETIME_FORMAT,
+    'EXPIRY_DATETIME_FORMAT': ISO_8601, # DRF's default DATETIME_FORMAT.
 }
 
 SPECTACULAR_SETTINGS = {
@@ -74,6 +79,8 @@ SILENCED_SYSTEM_CHECKS = ['urls.W002']
 
 AUTH_USER_MODEL  = "users.User"
 
+AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"] # The API login checks passwords on the hashing pool instead (utils.authentication.PooledPasswordBackend).
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -92,17 +99,193 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# Sized per process type through the environment of each service: web
+# processes need one connection per serving thread, prefork Celery children
+# one each. DB_POOL_MAX_SIZE=0 falls back to persistent connections.
+DB_POOL = {
+    'MIN_SIZE': int(os.getenv("DB_POOL_MIN_SIZE", 0)), # Connections opened when the process first connects.
+    'MAX_SIZE': int(os.getenv("DB_POOL_MAX_SIZE", 10)), # Connections per process; checkouts wait once all are in use.
+    'TIMEOUT': float(os.getenv("DB_POOL_TIMEOUT", 10)), # Seconds a checkout may wait before failing.
+    'MAX_LIFETIME': float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)), # Seconds before a connection is replaced.
+    'CHECK_AFTER': float(os.getenv("DB_POOL_CHECK_AFTER", 30)), # Seconds idle after which a connection is pinged on checkout.
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "utils.db.pooled_postgresql" if DB_POOL['MAX_SIZE'] else "django.db.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": "db",
         "PORT": "5432",
+        # Pooled connections go back to the pool at the end of each request;
+        # without a pool they are kept this many seconds.
+        "CONN_MAX_AGE": 0 if DB_POOL['MAX_SIZE'] else int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": DB_POOL,
     }
 }
 
+if DB_POOL['MAX_SIZE'] and django.VERSION >= (5, 1) and importlib.util.find_spec("psycopg_pool"):
+    # Django's own pool on psycopg 3; pool wait metrics are only recorded by utils.db.pooled_postgresql.
+    from psycopg_pool import ConnectionPool
+    DATABASES["default"]["ENGINE"] = "django.db.backends.postgresql"
+    DATABASES["default"]["OPTIONS"] = {"pool": {
+        "min_size": DB_POOL['MIN_SIZE'],
+        "max_size": DB_POOL['MAX_SIZE'],
+        "timeout": DB_POOL['TIMEOUT'],
+        "max_lifetime": DB_POOL['MAX_LIFETIME'],
+        "check": ConnectionPool.check_connection,
+    }}
+
+# Read replicas of default, as comma-separated hosts; see utils.routers.
+for index, host in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), 1):
+    DATABASES["replica%d" % index] = {**DATABASES["default"], "HOST": host.strip(), "TEST": {"MIRROR": "default"}}
+
+DATABASE_ROUTERS = ['utils.routers.ReplicaRouter']
+
+REPLICA_ROUTING = {
+    'ALIASES': [alias for alias in DATABASES if alias != "default"], # Replicas used by views with replica_reads = True.
+    'MAX_LAG': float(os.getenv("DB_REPLICA_MAX_LAG", 2)), # Seconds of replay lag after which a replica is skipped.
+    'CHECK_SECONDS': float(os.getenv("DB_REPLICA_CHECK_SECONDS", 5)), # How often each process checks a replica.
+    'STICKY_SECONDS': int(os.getenv("DB_REPLICA_STICKY_SECONDS", 10)), # Reads go to the primary this long after a write.
+    'COOKIE': 'read_primary_until',
+    'HEADER': 'X-Read-Primary-Until',
+}
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Short-lived state shared by all processes (group memberships, verified tokens).
+    # Through Redis when REDIS_URL is set, per process otherwise.
+    "shared": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "shared",
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+    # Rendered catalog responses and their version counters (utils.cache).
+    # Shared through Redis when REDIS_URL is set, per process otherwise.
+    "responses": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "responses",
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+    },
+}
+
+RESPONSE_CACHE = {
+    'ALIAS': 'responses',
+    'TIMEOUT': int(os.getenv("RESPONSE_CACHE_TIMEOUT", 600)), # Seconds; entries are also invalidated by model signals.
+}
+
+GROUP_CACHE = {
+    'ALIAS': 'shared',
+    'TIMEOUT': int(os.getenv("GROUP_CACHE_TIMEOUT", 60)), # Seconds; m2m changes on User.groups invalidate it right away.
+}
+
+TOKEN_CACHE = {
+    'ALIAS': 'shared' if REDIS_URL else None, # None keeps verified tokens in a per-process LRU.
+    'MAX_ENTRIES': int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000)), # Size of the per-process LRU.
+    'TIMEOUT': int(os.getenv("TOKEN_CACHE_TIMEOUT", 300)), # Seconds, never past the token expiry.
+}
+
+THROTTLING = {
+    'ALIAS': 'shared', # Cache alias of the throttle counters (utils.throttle); limits hold across processes only with Redis.
+}
+
+HEALTH_CHECK = {
+    'TIMEOUT': float(os.getenv("HEALTH_CHECK_TIMEOUT", 2)), # Seconds each readiness probe may take.
+    'CACHE_SECONDS': float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", 5)), # Readiness results are reused this long.
+    'BROKER': True, # Probe the Celery broker.
+    'CACHES': ['shared', 'responses'] if REDIS_URL else [], # Cache aliases to probe; local memory ones cannot fail.
+    'MEMORY_THRESHOLD': 90, # Percent of memory in use above which the app reports unavailable.
+}
+
+METRICS = {
+    'ALIAS': 'shared', # Cache alias the workers publish their metrics to for /metrics.
+    'PUBLISH_SECONDS': int(os.getenv("METRICS_PUBLISH_SECONDS", 10)), # How often each process publishes.
+    'MAX_PROCESSES': 64, # Processes that can publish at the same time.
+}
+
+COUNT_ESTIMATES = {
+    'ALIAS': 'shared', # Cache alias for exact counts of large filtered querysets.
+    'THRESHOLD': int(os.getenv("COUNT_ESTIMATE_THRESHOLD", 10000)), # Rows from which paginators report estimated counts.
+    'TIMEOUT': int(os.getenv("COUNT_CACHE_TIMEOUT", 60)), # Seconds a large exact count is reused.
+}
+
+TASK_BATCHING = {
+    'MAX_SIZE': int(os.getenv("TASK_BATCHING_MAX_SIZE", 100)), # Calls coalesced into one message by core.batching.
+    'MAX_WAIT': float(os.getenv("TASK_BATCHING_MAX_WAIT", 0.05)), # Seconds the oldest call may wait for a batch to fill.
+}
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.getenv("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1)), # Processes of each of the pools logins and bulk user provisioning hash passwords in (utils.hashing); 0 hashes in the request thread.
+    'MAX_QUEUE': int(os.getenv("PASSWORD_HASHING_MAX_QUEUE", 8)), # Login checks per process waiting for a worker, beyond which logins get 503.
+    'TIMEOUT': float(os.getenv("PASSWORD_HASHING_TIMEOUT", 5)), # Seconds a login waits for its check before getting 503.
+}
+
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL) # Task results and progress; disabled when neither is set.
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "pyamqp://rabbitmq:5672")
+CELERY_BEAT_SCHEDULER = "core.beat:LockedScheduler"
+
+BEAT_LOCK = {
+    'ALIAS': 'shared', # Cache alias of the lock; it only keeps a second beat idle with Redis.
+    'TIMEOUT': int(os.getenv("BEAT_LOCK_TIMEOUT", 60)), # Seconds after which a beat that stopped renewing loses the lock.
+}
+
+# Execution profiles of the workers, one per queue. A worker applies the one named by
+# CELERY_WORKER_PROFILE (core.celery) and consumes its QUEUES. CONCURRENCY None is one
+# per CPU. Time limits are enforced by the prefork pool only; with ACKS_LATE a task is
+# acknowledged once it finishes and redelivered if its worker dies, so it must be idempotent.
+WORKER_PROFILES = {
+    # Short CPU-bound tasks: a process per core, each reserving a few messages ahead.
+    'queue1': {
+        'QUEUES': ['queue1'],
+        'POOL': 'prefork',
+        'CONCURRENCY': None,
+        'PREFETCH_MULTIPLIER': 4,
+        'ACKS_LATE': False,
+        'SOFT_TIME_LIMIT': 30,
+        'TIME_LIMIT': 60,
+    },
+    # Tasks blocked on IO: many threads in one process.
+    'queue2': {
+        'QUEUES': ['queue2'],
+        'POOL': 'threads',
+        'CONCURRENCY': int(os.getenv("CELERY_IO_CONCURRENCY", 32)),
+        'PREFETCH_MULTIPLIER': 1,
+        'ACKS_LATE': False,
+        'SOFT_TIME_LIMIT': None,
+        'TIME_LIMIT': None,
+    },
+    # Imports, exports and batches: long, so nothing is reserved behind a running task
+    # and an interrupted one is run again.
+    'default': {
+        'QUEUES': ['celery'],
+        'POOL': 'prefork',
+        'CONCURRENCY': None,
+        'PREFETCH_MULTIPLIER': 1,
+        'ACKS_LATE': True,
+        'SOFT_TIME_LIMIT': 3600,
+        'TIME_LIMIT': 3900,
+    },
+}
+
+# 7 keys new rows with time-ordered UUIDs (utils.uuids), which insert at the end of the
+# B-tree indexes but reveal when a row was created; 4 keeps them fully random.
+UUID_PRIMARY_KEY_VERSION = int(os.getenv("UUID_PRIMARY_KEY_VERSION", 7))
+
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english") # PostgreSQL text search configuration used by items.search.
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -1,5 +1,6 @@
 from .celery import app
 from time import sleep
+from celery.backends.base import DisabledBackend
 
 
 @app.task(name="SimpleTask1", queue="queue1")
@@ -14,3 +15,53 @@ def simple_task_2() -> None:
     for i in range(10):
         sleep(1)
         print(f"Simple Task 2: {i}")
+
+
+@app.task(name="ImportItems", bind=True)
+def import_items_task(self, path: str, format: str | None = None, batch_size: int = 1000) -> dict:
+    from items.feed import import_file
+
+    def progress(stats):
+        if isinstance(self.backend, DisabledBackend):
+            return
+        self.update_state(state='PROGRESS', meta={key: stats[key] for key in ('rows', 'imported', 'rejected')})
+
+    return import_file(path, format, batch_size, progress)
+
+
+@app.task(name="ExportItems")
+def export_items_task(path: str, format: str | None = None) -> dict:
+    from items.feed import export_file
+    return export_file(path, format)
+
+
+@app.task(name="ProvisionUsers", bind=True)
+def provision_users_task(self, path: str, format: str | None = None, batch_size: int = 1000) -> dict:
+    """
+    Create users from a file rather than from rows in the message, so that
+    passwords do not pass through the broker.
+    """
+    from users.provisioning import import_file
+
+    def progress(stats):
+        if isinstance(self.backend, DisabledBackend):
+            return
+        self.update_state(state='PROGRESS', meta={key: stats[key] for key in ('rows', 'created', 'rejected')})
+
+    return import_file(path, format, batch_size, progress)
+
+
+@app.task(name="RunBatch")
+def run_batch(task_name: str, calls: list) -> list:
+    """
+    Run calls of `task_name` coalesced by core.batching in this invocation.
+    Each outcome is {"result": ...} or {"error": ...}, in call order.
+    """
+    task = app.tasks[task_name]
+    outcomes = []
+    for args, kwargs in calls:
+        try:
+            outcomes.append({'result': task.run(*args, **kwargs)})
+        except Exception as e:
+            outcomes.append({'error': '%s: %s' % (type(e).__name__, e)})
+    return outcomes
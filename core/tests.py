@@ -0,0 +1,181 @@
+import threading
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from core import health
+from core.batching import BatchedTaskError, Batcher
+from core.beat import LOCK_KEY, LockedScheduler
+from core.celery import _publish_started, app, enqueue_seconds, record_publish_time, start_publish_timer
+from core.health import check_readiness, probe_postgresql, run_probes
+from core.tasks import run_batch
+
+
+class BatcherTests(SimpleTestCase):
+    task = SimpleNamespace(name='tests.Task', queue='queue1')
+    other_task = SimpleNamespace(name='tests.OtherTask')
+
+    def setUp(self):
+        patcher = mock.patch.object(run_batch, 'apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_flush_by_size(self):
+        batcher = Batcher(max_size=3, max_wait=60)
+        results = [batcher.enqueue(self.task, i, key=i) for i in range(3)]
+        self.apply_async.assert_called_once_with(('tests.Task', [((i,), {'key': i}) for i in range(3)]), queue='queue1')
+        self.apply_async.return_value.get.return_value = [{'result': 0}, {'error': 'ValueError: bad'}, {'result': 2}]
+        self.assertEqual([results[0].get(timeout=1), results[2].get(timeout=1)], [0, 2])
+        with self.assertRaisesMessage(BatchedTaskError, 'ValueError: bad'):
+            results[1].get(timeout=1)
+
+    def test_flush_by_age(self):
+        batcher = Batcher(max_size=100, max_wait=0.01)
+        result = batcher.enqueue(self.task, 1)
+        self.assertTrue(result.batch.sent.wait(5))
+        self.apply_async.assert_called_once_with(('tests.Task', [((1,), {})]), queue='queue1')
+
+    def test_batches_per_task(self):
+        batcher = Batcher(max_size=2, max_wait=60)
+        batcher.enqueue(self.task, 1)
+        batcher.enqueue(self.other_task, 2)
+        self.apply_async.assert_not_called()
+        batcher.enqueue(self.other_task, 3)
+        self.apply_async.assert_called_once_with(('tests.OtherTask', [((2,), {}), ((3,), {})]))
+        batcher.flush()
+        self.assertEqual(self.apply_async.call_args.args, (('tests.Task', [((1,), {})]),))
+        self.assertEqual(batcher.pending, {})
+
+    def test_publish_error(self):
+        self.apply_async.side_effect = ConnectionError('broker down')
+        batcher = Batcher(max_size=1, max_wait=60)
+        with self.assertRaisesMessage(ConnectionError, 'broker down'):
+            batcher.enqueue(self.task).get(timeout=1)
+
+    def test_not_sent(self):
+        result = Batcher(max_size=100, max_wait=60).enqueue(self.task)
+        self.assertFalse(result.ready())
+        with self.assertRaises(TimeoutError):
+            result.get(timeout=0.01)
+
+
+class RunBatchTests(SimpleTestCase):
+    def test_outcomes(self):
+        def divide(a, b=1):
+            return a / b
+
+        with mock.patch.dict(app.tasks, {'tests.Divide': SimpleNamespace(run=divide)}):
+            outcomes = run_batch('tests.Divide', [((4,), {'b': 2}), ((1,), {'b': 0}), ((3,), {})])
+        self.assertEqual(outcomes, [{'result': 2}, {'error': 'ZeroDivisionError: division by zero'}, {'result': 3}])
+
+
+class LockedSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches[settings.BEAT_LOCK['ALIAS']]
+        self.cache.delete(LOCK_KEY)
+        self.addCleanup(self.cache.delete, LOCK_KEY)
+
+    def scheduler(self):
+        # Only the lock is exercised, without a schedule file.
+        scheduler = LockedScheduler.__new__(LockedScheduler)
+        scheduler.lock_id, scheduler.has_lock = uuid.uuid4().hex, False
+        return scheduler
+
+    def test_single_holder(self):
+        first, second = self.scheduler(), self.scheduler()
+        self.assertTrue(first.acquire_lock())
+        self.assertFalse(second.acquire_lock())
+        self.assertTrue(first.acquire_lock())
+        self.cache.delete(LOCK_KEY)  # Expired.
+        self.assertTrue(second.acquire_lock())
+        self.assertFalse(first.acquire_lock())
+        self.assertFalse(first.has_lock)
+
+    def test_taken_over_during_renewal(self):
+        first, second = self.scheduler(), self.scheduler()
+        self.assertTrue(first.acquire_lock())
+        touch = self.cache.touch
+
+        def expire_and_take_over(key, timeout):
+            self.cache.delete(key)
+            self.cache.add(key, second.lock_id)
+            return touch(key, timeout)
+
+        with mock.patch.object(self.cache, 'touch', side_effect=expire_and_take_over):
+            self.assertFalse(first.acquire_lock())
+        self.assertTrue(second.acquire_lock())
+
+
+class PublishTimerTests(SimpleTestCase):
+    def test_failed_publish(self):
+        observed = enqueue_seconds.snapshot(task='tests.Task')['count']
+        start_publish_timer(headers={'id': 'failed'})  # The broker raised: no after_task_publish.
+        start_publish_timer(headers={'id': 'sent'})
+        record_publish_time(sender='tests.Task', headers={'id': 'sent'})
+        record_publish_time(sender='tests.Task', headers={'id': 'failed'})
+        self.assertEqual(enqueue_seconds.snapshot(task='tests.Task')['count'], observed + 1)
+        self.assertEqual(_publish_started.task, (None, None))
+
+
+class DatabaseProbeTests(SimpleTestCase):
+    def test_bounded_connection(self):
+        connection = mock.MagicMock(vendor='postgresql')
+        connection.get_connection_params.return_value = {'database': 'app', 'options': '-c search_path=app'}
+        probe_postgresql(connection, 0.5)
+        connection.Database.connect.assert_called_once_with(database='app', connect_timeout=2, options='-c search_path=app -c statement_timeout=500')
+        connection.Database.connect.return_value.close.assert_called_once_with()
+
+
+@override_settings(HEALTH_CHECK={**settings.HEALTH_CHECK, 'TIMEOUT': 0.5, 'CACHE_SECONDS': 60})
+class ReadinessTests(SimpleTestCase):
+    def setUp(self):
+        self.probes = {'ok': mock.Mock(return_value={'usage': 1})}
+        patcher = mock.patch.object(health, 'get_probes', lambda: self.probes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        health._last_check = None
+        self.addCleanup(setattr, health, '_last_check', None)
+
+    def test_run_probes(self):
+        released = threading.Event()
+        self.addCleanup(released.set)
+        self.probes.update(failing=mock.Mock(side_effect=RuntimeError('down')), slow=lambda: released.wait(5))
+        with override_settings(HEALTH_CHECK={**settings.HEALTH_CHECK, 'TIMEOUT': 0.05}):
+            checks = run_probes()
+        self.assertEqual({name: check['status'] for name, check in checks.items()}, {'ok': 'ok', 'failing': 'error', 'slow': 'timeout'})
+        self.assertEqual((checks['ok']['usage'], checks['failing']['detail'], checks['slow']['seconds']), (1, 'down', 0.05))
+
+    def test_cached(self):
+        self.assertEqual(check_readiness()[:2], (True, {'ok': mock.ANY}))
+        healthy, _, age = check_readiness()
+        self.assertTrue(healthy)
+        self.assertGreater(age, 0)
+        self.probes['ok'].assert_called_once_with()
+        with override_settings(HEALTH_CHECK={**settings.HEALTH_CHECK, 'CACHE_SECONDS': 0}):
+            check_readiness()
+        self.assertEqual(self.probes['ok'].call_count, 2)
+
+    def test_ready(self):
+        response = self.client.get('/health/ready')
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'OK'))
+        self.assertEqual(response.json()['checks']['ok']['status'], 'ok')
+
+    def test_unavailable(self):
+        released = threading.Event()
+        self.addCleanup(released.set)
+        self.probes['slow'] = lambda: released.wait(5)
+        with override_settings(HEALTH_CHECK={**settings.HEALTH_CHECK, 'TIMEOUT': 0.05}):
+            response = self.client.get('/health/ready')
+        self.assertEqual((response.status_code, response.json()['status']), (503, 'Unavailable'))
+        self.assertEqual(response.json()['checks']['slow']['status'], 'timeout')
+        # Cached, failures included, until the window passes.
+        self.assertEqual(self.client.get('/health/').status_code, 503)
+
+    def test_liveness(self):
+        self.probes['ok'].side_effect = RuntimeError('down')
+        response = self.client.get('/health/live')
+        self.assertEqual((response.status_code, response.json()), (200, {'status': 'OK'}))
+        self.probes['ok'].assert_not_called()
+        self.assertEqual(self.client.get('/health/ready').status_code, 503)
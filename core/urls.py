@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView, SpectacularAPIView
-from core.views import health_check, view1, view2, index
+from core.views import health_check, liveness_check, metrics, view1, view2, index
 
 urlpatterns = [
     # admin
@@ -15,6 +15,9 @@ urlpatterns = [
     path('button2', view2, name='view2'),
     # docs
     path('health/', health_check, name='health_check'),
+    path('health/live', liveness_check, name='liveness_check'),
+    path('health/ready', health_check, name='readiness_check'),
+    path('metrics', metrics, name='metrics'),
     path('docs', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('redoc', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     path('api/schema', SpectacularAPIView.as_view(), name='schema'),
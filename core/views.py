@@ -2,10 +2,9 @@ import logging
 from django.shortcuts import render
 from .tasks import simple_task_1, simple_task_2
 from django.views.decorators.http import require_GET
-from django.http import JsonResponse
-from django.db import connection
-import time
-import psutil
+from django.http import HttpResponse, JsonResponse
+from .health import check_readiness, probe_seconds
+from utils.metrics import publisher, render as render_metrics
 
 def index(request):
     return render(request, 'index.html')
@@ -30,35 +29,32 @@ def view2(request):
         return render(request, 'index.html', context={'button2': True})
 
 @require_GET
-def health_check(request):
-    health_status = {'status': 'OK'}
-
-    # 1. Checking database connection status
-    try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT 1")
-    except Exception as e:
-        return JsonResponse({'status': 'Database connection error'}, status=500)
-
-    # 2. Measuring database response time
-    try:
-        start_time = time.time()
-        cursor.execute("SELECT 1")
-        health_status['database_response_time'] = time.time() - start_time
-    except Exception as e:
-        return JsonResponse({'status': 'Database response time measurement error'}, status=500)
-
-    # 3. Checking memory consumptionb
-    memory_usage = psutil.virtual_memory().percent
-    health_status['memory_usage'] = memory_usage
-    if memory_usage > 90:  # Example threshold of memory usage considered dangerous
-        health_status['status'] = 'High memory usage'
-        health_status['memory_usage'] = memory_usage
-        return JsonResponse(health_status, status=500)
+def liveness_check(request):
+    """
+    The process is up and serving requests; dependencies are not checked.
+    """
+    return JsonResponse({'status': 'OK'})
 
-    
-
-    # 5. Checking the status of other API dependencies
-    # Here you can put code to check the status of other external API dependencies
+@require_GET
+def health_check(request):
+    """
+    Readiness: database, Celery broker, caches and memory usage, probed
+    concurrently and cached for HEALTH_CHECK['CACHE_SECONDS'] seconds.
+    Answers 503 when any probe fails or times out.
+    """
+    healthy, checks, age = check_readiness()
+    health_status = {
+        'status': 'OK' if healthy else 'Unavailable',
+        'age': age,
+        'checks': checks,
+        'latency': {name: probe_seconds.snapshot(probe=name) for name in checks},
+    }
+    return JsonResponse(health_status, status=200 if healthy else 503)
 
-    return JsonResponse(health_status)
\ No newline at end of file
+@require_GET
+def metrics(request):
+    """
+    Metrics of every worker in the Prometheus text format, summed through
+    the METRICS['ALIAS'] cache.
+    """
+    return HttpResponse(render_metrics(publisher.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,117 @@
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import ValidationError
+from .filters import category_items, filter_by_attributes, is_enabled, parse_attribute_filters
+from .models import Category, Item
+from .serializers import CategoryReadSerializer, CategoryTreeSerializer, ItemReadSerializer
+from utils.streaming import astream_queryset, dumps, get_async_stream_format
+
+# Async variants of the public catalog reads for ASGI deployments (core.asgi).
+# DRF views are synchronous, so these are plain Django views: the queries go
+# through the async ORM, lists are always streamed, and responses are the
+# same JSON as their DRF counterparts. They are not response cached.
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def not_found():
+    return json_response({'detail': 'Not found.'}, status=404)
+
+
+class AsyncAllItemsView(View):
+    """
+    Stream all items, as a JSON array or NDJSON with `Accept: application/x-ndjson`.
+
+    Example:
+    http://localhost:8000/items/async?attr=color:red
+    """
+    read_serializer_class = ItemReadSerializer
+    replica_reads = True
+
+    async def get(self, request):
+        try:
+            items = filter_by_attributes(Item.objects.all(), parse_attribute_filters(request))
+        except ValidationError as e:
+            return json_response(e.detail, status=400)
+        items = self.read_serializer_class.values(items)
+        return astream_queryset(items, self.read_serializer_class, get_async_stream_format(request))
+
+
+class AsyncItemsByCategoryView(View):
+    """
+    Stream the items of a category, with `include_descendants=1` those of its whole subtree.
+
+    Example:
+    http://localhost:8000/items/async/category/<uuid>/?include_descendants=1
+    """
+    read_serializer_class = ItemReadSerializer
+    replica_reads = True
+
+    async def get(self, request, uuid):
+        try:
+            items = category_items(uuid, is_enabled(request, 'include_descendants'))
+            items = filter_by_attributes(items, parse_attribute_filters(request))
+        except ValidationError as e:
+            return json_response(e.detail, status=400)
+        items = self.read_serializer_class.values(items)
+        return astream_queryset(items, self.read_serializer_class, get_async_stream_format(request))
+
+
+class AsyncItemDetailView(View):
+    """
+    Retrieve a single item.
+
+    Example:
+    http://localhost:8000/items/async/<uuid>
+    """
+    read_serializer_class = ItemReadSerializer
+    replica_reads = True
+
+    async def get(self, request, uuid):
+        row = await self.read_serializer_class.values(Item.objects.filter(uuid=uuid)).afirst()
+        if row is None:
+            return not_found()
+        return json_response(self.read_serializer_class([row]).data[0])
+
+
+class AsyncAllCategoriesView(View):
+    """
+    Retrieve all categories, or the whole hierarchy nested with `tree=1`, from a single query.
+
+    Example:
+    http://localhost:8000/items/async/categories?tree=1
+    """
+    read_serializer_class = CategoryReadSerializer
+    replica_reads = True
+    tree_serializer_class = CategoryTreeSerializer
+
+    async def get(self, request):
+        if is_enabled(request, 'tree'):
+            queryset = self.tree_serializer_class.values(Category.objects.order_by('name'))
+            return json_response(self.tree_serializer_class([row async for row in queryset]).data)
+        queryset = self.read_serializer_class.values(Category.objects.all())
+        rows = [row async for row in queryset]
+        return json_response(self.read_serializer_class(rows, complete=True).data)
+
+
+class AsyncCategoryDetailView(View):
+    """
+    Retrieve a single category with the UUIDs of its direct subcategories.
+
+    Example:
+    http://localhost:8000/items/async/categories/<uuid>
+    """
+    read_serializer_class = CategoryReadSerializer
+    replica_reads = True
+
+    async def get(self, request, uuid):
+        row = await self.read_serializer_class.values(Category.objects.filter(uuid=uuid)).afirst()
+        if row is None:
+            return not_found()
+        data = self.read_serializer_class([row]).to_representation(row)
+        data['subcategories'] = [
+            child async for child in Category.objects.filter(parent_category=uuid).values_list('uuid', flat=True)
+        ]
+        return json_response(data)
@@ -0,0 +1,221 @@
+import csv
+import json
+import time
+import uuid
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from utils.cache import bump_versions
+from utils.uuids import new_uuid
+from .models import Attribute, AttributeValue, Category, Item
+from .search import update_search_vectors
+
+FORMATS = ('csv', 'jsonl')
+ITEM_FIELDS = ['uuid', 'name', 'description', 'price', 'category']
+# CSV columns holding attribute values, e.g. "attr:color".
+ATTRIBUTE_PREFIX = 'attr:'
+MAX_REPORTED_ERRORS = 100
+
+
+class InvalidRow:
+    """
+    Placeholder for a feed line that could not be parsed, rejected on import.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+
+def guess_format(path):
+    return 'csv' if str(path).endswith('.csv') else 'jsonl'
+
+
+def read_rows(stream, format):
+    """
+    Yield feed rows as {uuid, name, description, price, category, attributes}.
+    """
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            attributes = {
+                key[len(ATTRIBUTE_PREFIX):]: value
+                for key, value in row.items()
+                if key.startswith(ATTRIBUTE_PREFIX) and value
+            }
+            yield {**{field: row.get(field) for field in ITEM_FIELDS}, 'attributes': attributes}
+    else:
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield InvalidRow(f'Invalid JSON: {e}')
+
+
+def write_rows(rows, stream, format, attribute_names=()):
+    if format == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(ITEM_FIELDS + [ATTRIBUTE_PREFIX + name for name in attribute_names])
+        for row in rows:
+            attributes = row['attributes']
+            writer.writerow([row[field] for field in ITEM_FIELDS] + [attributes.get(name, '') for name in attribute_names])
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+class ItemImporter:
+    """
+    Upsert items and their attribute values from feed rows in batches.
+
+    Categories (by UUID or unique name) and attributes (by category and name)
+    are resolved through in-memory maps loaded once; missing attributes are
+    created. Items are upserted on their UUID with a single bulk INSERT ... ON
+    CONFLICT per batch and their attribute values are replaced.
+
+    Bulk writes skip model signals, so search vectors are refreshed per batch
+    and the catalog response cache is invalidated once at the end.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.categories = {}
+        duplicate_names = set()
+        for category_uuid, name in Category.objects.values_list('uuid', 'name'):
+            self.categories[str(category_uuid)] = category_uuid
+            if name in self.categories:
+                duplicate_names.add(name)
+            self.categories[name] = category_uuid
+        for name in duplicate_names:
+            del self.categories[name]
+        self.attributes = {
+            (category, name): attribute
+            for attribute, category, name in Attribute.objects.values_list('uuid', 'category', 'name')
+        }
+        self.fields = {name: Item._meta.get_field(name) for name in ('name', 'description', 'price')}
+        self.value_field = AttributeValue._meta.get_field('value')
+        self.stats = {'rows': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+
+    def reject(self, line, message):
+        self.stats['rejected'] += 1
+        if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+            self.stats['errors'].append({'line': line, 'error': message})
+
+    def build_item(self, row):
+        if isinstance(row, InvalidRow):
+            raise ValidationError(row.message)
+        if not isinstance(row, dict):
+            raise ValidationError('Expected an object.')
+        attributes = row.get('attributes') or {}
+        if not isinstance(attributes, dict):
+            raise ValidationError('Attributes must be an object of name: value pairs.')
+        category = self.categories.get(str(row.get('category') or ''))
+        if category is None:
+            raise ValidationError(f"Unknown or ambiguous category {row.get('category')!r}.")
+        # Only a missing or null value is blank; a price of 0 is a price.
+        values = {name: field.clean('' if row.get(name) is None else row.get(name), None) for name, field in self.fields.items()}
+        item_uuid = uuid.UUID(str(row['uuid'])) if row.get('uuid') else new_uuid()
+        attributes = {name: self.value_field.clean(str(value), None) for name, value in attributes.items()}
+        return Item(uuid=item_uuid, category_id=category, **values), attributes
+
+    def import_rows(self, rows, progress=None):
+        start = time.perf_counter()
+        rows = enumerate(rows, start=1)
+        while batch := list(islice(rows, self.batch_size)):
+            self.import_batch(batch)
+            if progress:
+                progress(self.stats)
+        bump_versions(['catalog', 'tree'])
+        self.stats['seconds'] = time.perf_counter() - start
+        self.stats['rows_per_second'] = self.stats['rows'] / self.stats['seconds'] if self.stats['seconds'] else 0
+        return self.stats
+
+    def import_batch(self, batch):
+        items = {}
+        attributes = {}
+        for line, row in batch:
+            self.stats['rows'] += 1
+            try:
+                item, values = self.build_item(row)
+            except (ValidationError, ValueError) as e:
+                self.reject(line, '; '.join(e.messages) if isinstance(e, ValidationError) else str(e))
+                continue
+            if item.uuid in items:
+                self.reject(line, f'Duplicate uuid {item.uuid} in the batch.')
+                continue
+            items[item.uuid] = item
+            attributes[item.uuid] = values
+
+        with transaction.atomic():
+            Item.objects.bulk_create(
+                items.values(),
+                update_conflicts=True,
+                unique_fields=['uuid'],
+                update_fields=['name', 'description', 'price', 'category'],
+            )
+            self.create_missing_attributes(items, attributes)
+            # One DELETE without per-row post_delete signals: the import bumps the
+            # catalog versions and refreshes the search vectors itself.
+            replaced = AttributeValue.objects.filter(item__in=items)
+            replaced._raw_delete(replaced.db)
+            AttributeValue.objects.bulk_create(
+                AttributeValue(item_id=item_uuid, attribute_id=self.attributes[items[item_uuid].category_id, name], value=value)
+                for item_uuid, values in attributes.items()
+                for name, value in values.items()
+            )
+            update_search_vectors(list(items))
+        self.stats['imported'] += len(items)
+
+    def create_missing_attributes(self, items, attributes):
+        missing = {
+            (items[item_uuid].category_id, name)
+            for item_uuid, values in attributes.items()
+            for name in values
+        } - self.attributes.keys()
+        for attribute in Attribute.objects.bulk_create(Attribute(category_id=category, name=name) for category, name in missing):
+            self.attributes[attribute.category_id, attribute.name] = attribute.uuid
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Yield feed rows for `queryset` chunk by chunk, with one attribute value
+    query per chunk.
+    """
+    rows = queryset.values_list('uuid', 'name', 'description', 'price', 'category').iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        attributes = {}
+        values = AttributeValue.objects.filter(item__in=[row[0] for row in chunk]).values_list('item', 'attribute__name', 'value')
+        for item_uuid, name, value in values:
+            attributes.setdefault(item_uuid, {})[name] = value
+        for item_uuid, name, description, price, category in chunk:
+            yield {
+                'uuid': str(item_uuid),
+                'name': name,
+                'description': description,
+                'price': str(price),
+                'category': str(category),
+                'attributes': attributes.get(item_uuid, {}),
+            }
+
+
+def import_file(path, format=None, batch_size=1000, progress=None):
+    format = format or guess_format(path)
+    with open(path, newline='', encoding='utf-8') as stream:
+        return ItemImporter(batch_size).import_rows(read_rows(stream, format), progress)
+
+
+def export_file(path, format=None, queryset=None, chunk_size=2000):
+    format = format or guess_format(path)
+    queryset = Item.objects.all() if queryset is None else queryset
+    attribute_names = sorted(set(Attribute.objects.values_list('name', flat=True))) if format == 'csv' else ()
+    start, count = time.perf_counter(), 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with open(path, 'w', newline='', encoding='utf-8') as stream:
+        write_rows(counted(export_rows(queryset, chunk_size)), stream, format, attribute_names)
+    seconds = time.perf_counter() - start
+    return {'rows': count, 'seconds': seconds, 'rows_per_second': count / seconds if seconds else 0}
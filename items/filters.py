@@ -0,0 +1,66 @@
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+from .models import Attribute, AttributeValue, Item
+
+ATTRIBUTE_QUERY_PARAM = 'attr'
+
+
+def is_enabled(request, param):
+    # GET rather than query_params so plain Django (async) views can share it.
+    return request.GET.get(param) in ('1', 'true')
+
+
+def category_items(uuid, include_descendants=False):
+    """
+    Items of a category, or of its whole subtree through the closure table.
+    """
+    if include_descendants:
+        return Item.objects.filter(category__ancestor_links__ancestor=uuid)
+    return Item.objects.filter(category=uuid)
+
+
+def parse_attribute_filters(request):
+    """
+    Read `?attr=<attribute name>:<value>` parameters into {name: [values]}.
+    """
+    filters = {}
+    for param in request.GET.getlist(ATTRIBUTE_QUERY_PARAM):
+        name, separator, value = param.partition(':')
+        if not separator or not name:
+            raise ValidationError({ATTRIBUTE_QUERY_PARAM: f'Expected <attribute>:<value>, got "{param}".'})
+        filters.setdefault(name, []).append(value)
+    return filters
+
+
+def filter_by_attributes(queryset, filters):
+    """
+    Keep items having, for every attribute name, one of the requested values.
+
+    Values of the same attribute are OR-ed, different attributes are AND-ed.
+    Each attribute becomes one semi-join driven by the (attribute, value, item)
+    index.
+    """
+    for name, values in filters.items():
+        matching = AttributeValue.objects.filter(
+            attribute__in=Attribute.objects.filter(name=name).values('uuid'),
+            value__in=values,
+        )
+        queryset = queryset.filter(uuid__in=matching.values('item'))
+    return queryset
+
+
+def facet_counts(queryset):
+    """
+    Count the items of `queryset` per attribute name and value.
+    """
+    rows = (
+        AttributeValue.objects
+        .filter(item__in=queryset.values('uuid'))
+        .values_list('attribute__name', 'value')
+        .annotate(count=Count('item', distinct=True))
+        .order_by('attribute__name', '-count', 'value')
+    )
+    facets = {}
+    for name, value, count in rows:
+        facets.setdefault(name, []).append({'value': value, 'count': count})
+    return [{'attribute': name, 'values': values} for name, values in facets.items()]
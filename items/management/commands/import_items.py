@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from items.feed import FORMATS, import_file
+
+
+class Command(BaseCommand):
+    help = 'Upsert items and attribute values from a CSV or JSONL feed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension (.csv, otherwise jsonl).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(f"{stats['rows']} rows, {stats['rejected']} rejected", ending='\r')
+
+        stats = import_file(options['path'], options['format'], options['batch_size'], progress)
+        self.stdout.write('')
+        for error in stats['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['imported']} of {stats['rows']} rows, {stats['rejected']} rejected "
+            f"in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)"
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name', 'uuid'], name='item_name_uuid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['price', 'uuid'], name='item_price_uuid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'name', 'uuid'], name='item_category_name_uuid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'price', 'uuid'], name='item_category_price_uuid_idx'),
+        ),
+    ]
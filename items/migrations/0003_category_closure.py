@@ -0,0 +1,46 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_category_closure(apps, schema_editor):
+    Category = apps.get_model('items', 'Category')
+    CategoryClosure = apps.get_model('items', 'CategoryClosure')
+    parents = dict(Category.objects.values_list('uuid', 'parent_category'))
+    links = []
+    for category in parents:
+        ancestor, depth, seen = category, 0, set()
+        while ancestor is not None and ancestor not in seen:
+            seen.add(ancestor)
+            links.append(CategoryClosure(ancestor_id=ancestor, descendant_id=category, depth=depth))
+            ancestor, depth = parents.get(ancestor), depth + 1
+    CategoryClosure.objects.bulk_create(links, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0002_item_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='items.category')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='items.category')),
+            ],
+            options={
+                'verbose_name': 'Category closure',
+                'verbose_name_plural': 'Category closures',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='categoryclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='category_closure_unique'),
+        ),
+        migrations.RunPython(build_category_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0003_category_closure'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attributevalue',
+            name='attribute',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='items.attribute'),
+        ),
+        migrations.AlterField(
+            model_name='attributevalue',
+            name='item',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='items.item'),
+        ),
+        migrations.AddIndex(
+            model_name='attribute',
+            index=models.Index(fields=['name'], name='attribute_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attributevalue',
+            index=models.Index(fields=['attribute', 'value', 'item'], name='attr_value_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attributevalue',
+            index=models.Index(fields=['item', 'attribute', 'value'], name='attr_value_by_item_idx'),
+        ),
+    ]
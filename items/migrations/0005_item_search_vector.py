@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='item_search_vector_idx')
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes and tsvector values only exist on PostgreSQL; other
+    # databases use the in-process index of items.search.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Item = apps.get_model('items', 'Item')
+    schema_editor.add_index(Item, SEARCH_INDEX)
+    schema_editor.execute(
+        """
+        UPDATE items_item SET search_vector =
+            setweight(to_tsvector(%(config)s::regconfig, name), 'A')
+            || setweight(to_tsvector(%(config)s::regconfig, description), 'B')
+            || setweight(to_tsvector(%(config)s::regconfig, coalesce(
+                (SELECT string_agg(value, ' ') FROM items_attributevalue WHERE item_id = items_item.uuid), ''
+            )), 'C')
+        """,
+        {'config': settings.SEARCH_CONFIG},
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('items', 'Item'), SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0004_attribute_value_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='item', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0005_item_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='items.category'),
+        ),
+    ]
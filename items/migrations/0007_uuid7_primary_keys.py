@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:51
+
+import utils.uuids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0006_item_category_composite_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attribute',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='attributevalue',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+    ]
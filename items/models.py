@@ -1,8 +1,11 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
-import uuid
+from utils.uuids import new_uuid
 
 class Category(models.Model):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
     name = models.CharField(max_length=100)
     parent_category = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories')
 
@@ -13,41 +16,89 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.parent_category_id and CategoryClosure.objects.filter(ancestor=self.pk, descendant=self.parent_category_id).exists():
+            raise ValidationError({'parent_category': 'A category cannot be moved under itself or its subcategories.'})
+
+class CategoryClosure(models.Model):
+    """
+    Every ancestor/descendant pair of the category tree, including each
+    category paired with itself at depth 0.
+
+    Kept in sync by the Category signal handlers in items.signals; rows of a
+    deleted category go away through the foreign key cascade.
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Category closure"
+        verbose_name_plural = "Category closures"
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='category_closure_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
 class Attribute(models.Model):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
     name = models.CharField(max_length=100)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
 
     class Meta:
         verbose_name = "Attribute"
         verbose_name_plural = "Attributes"
+        indexes = [
+            models.Index(fields=['name'], name='attribute_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 class Item(models.Model):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    # Led by category, the composite indexes below replace the single column one.
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, db_index=False)
+    # Weighted name/description/attribute values, maintained by items.search (PostgreSQL only).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Item"
         verbose_name_plural = "Items"
+        # Keyset pagination orders on (name|price, uuid), optionally within a category.
+        indexes = [
+            models.Index(fields=['name', 'uuid'], name='item_name_uuid_idx'),
+            models.Index(fields=['price', 'uuid'], name='item_price_uuid_idx'),
+            models.Index(fields=['category', 'name', 'uuid'], name='item_category_name_uuid_idx'),
+            models.Index(fields=['category', 'price', 'uuid'], name='item_category_price_uuid_idx'),
+            GinIndex(fields=['search_vector'], name='item_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 class AttributeValue(models.Model):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
-    item = models.ForeignKey(Item, on_delete=models.CASCADE)
-    attribute = models.ForeignKey(Attribute, on_delete=models.CASCADE)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
+    # Both foreign keys lead the composite indexes below, which replace
+    # their single column indexes.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, db_index=False)
+    attribute = models.ForeignKey(Attribute, on_delete=models.CASCADE, db_index=False)
     value = models.CharField(max_length=100)
 
     class Meta:
         verbose_name = "Atrribute value"
         verbose_name_plural = "Atrribute values"
+        indexes = [
+            # Facet filtering: attribute + value -> matching items, index only.
+            models.Index(fields=['attribute', 'value', 'item'], name='attr_value_item_idx'),
+            # Facet counting: items of a result set -> their attribute values.
+            models.Index(fields=['item', 'attribute', 'value'], name='attr_value_by_item_idx'),
+        ]
 
     def __str__(self):
         return f"{self.item.name} - {self.attribute.name}: {self.value}"
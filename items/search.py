@@ -0,0 +1,165 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.db.models import OuterRef, Subquery, TextField
+from utils.cache import get_versions
+from .models import AttributeValue, Item
+
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search on the GIN-indexed `Item.search_vector` column.
+
+    Name, description and attribute values are weighted A, B and C; the vector
+    is refreshed by `update_search_vectors` whenever one of them is written.
+    """
+
+    def __init__(self):
+        from django.contrib.postgres import search
+        self.search_module = search
+        self.config = settings.SEARCH_CONFIG
+
+    def get_vector(self):
+        from django.contrib.postgres.aggregates import StringAgg
+        search = self.search_module
+        attribute_values = (
+            AttributeValue.objects.filter(item=OuterRef('pk'))
+            .values('item')
+            .annotate(text=StringAgg('value', ' '))
+            .values('text')
+        )
+        return (
+            search.SearchVector('name', weight='A', config=self.config)
+            + search.SearchVector('description', weight='B', config=self.config)
+            + search.SearchVector(Subquery(attribute_values, output_field=TextField()), weight='C', config=self.config)
+        )
+
+    def update(self, item_ids):
+        Item.objects.filter(pk__in=item_ids).update(search_vector=self.get_vector())
+
+    def search(self, text):
+        query = self.search_module.SearchQuery(text, config=self.config, search_type='websearch')
+        return (
+            Item.objects.filter(search_vector=query)
+            .annotate(rank=self.search_module.SearchRank('search_vector', query))
+            .order_by('-rank', 'uuid')
+            .values_list('uuid', flat=True)
+        )
+
+    def autocomplete(self, text, limit):
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        # Only \w tokens reach to_tsquery, so the raw query cannot be malformed.
+        raw = ' & '.join(tokens[:-1] + [tokens[-1] + ':*'])
+        query = self.search_module.SearchQuery(raw, config=self.config, search_type='raw')
+        return list(
+            Item.objects.filter(search_vector=query)
+            .annotate(rank=self.search_module.SearchRank('search_vector', query))
+            .order_by('-rank', 'name')
+            .values_list('uuid', 'name')[:limit]
+        )
+
+
+class InvertedIndexSearchBackend:
+    """
+    In-process inverted index used on databases without full-text search,
+    such as SQLite in tests.
+
+    The index is rebuilt from the database whenever the catalog response cache
+    version changes, so it follows the same invalidation as the cached lists.
+    Scoring mirrors the Postgres weights: a term counts 1.0 in the name, 0.4
+    in the description and 0.2 in an attribute value.
+    """
+    weights = {'name': 1.0, 'description': 0.4, 'attribute': 0.2}
+
+    def __init__(self):
+        self.version = None
+        self.postings = {}
+        self.vocabulary = []
+        self.names = {}
+
+    def get_index(self):
+        version = get_versions(['catalog'])
+        if version != self.version:
+            self.build()
+            self.version = version
+        return self
+
+    def build(self):
+        postings = defaultdict(lambda: defaultdict(float))
+        names = {}
+        for uuid, name, description in Item.objects.values_list('uuid', 'name', 'description').iterator():
+            names[uuid] = name
+            for field, text in (('name', name), ('description', description)):
+                for token in tokenize(text):
+                    postings[token][uuid] += self.weights[field]
+        for uuid, value in AttributeValue.objects.values_list('item', 'value').iterator():
+            for token in tokenize(value):
+                postings[token][uuid] += self.weights['attribute']
+        postings = {token: dict(scores) for token, scores in postings.items()}
+        self.postings, self.vocabulary, self.names = postings, sorted(postings), names
+
+    def update(self, item_ids):
+        # Writes bump the catalog version, which triggers a rebuild on next use.
+        pass
+
+    def score(self, terms):
+        scores = None
+        for term in terms:
+            matches = term if isinstance(term, dict) else self.postings.get(term, {})
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {uuid: score + matches[uuid] for uuid, score in scores.items() if uuid in matches}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def prefix_postings(self, prefix):
+        matches = defaultdict(float)
+        for token in self.vocabulary[bisect_left(self.vocabulary, prefix):]:
+            if not token.startswith(prefix):
+                break
+            for uuid, score in self.postings[token].items():
+                matches[uuid] += score
+        return matches
+
+    def search(self, text):
+        index = self.get_index()
+        scores = index.score(tokenize(text))
+        return sorted(scores, key=lambda uuid: (-scores[uuid], str(uuid)))
+
+    def autocomplete(self, text, limit):
+        index = self.get_index()
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        scores = index.score(tokens[:-1] + [index.prefix_postings(tokens[-1])])
+        ranked = sorted(scores, key=lambda uuid: (-scores[uuid], index.names[uuid]))
+        return [(uuid, index.names[uuid]) for uuid in ranked[:limit]]
+
+
+_backends = {}
+
+
+def get_search_backend():
+    """
+    Return the search backend for the default database, one per process.
+    """
+    vendor = connection.vendor
+    if vendor not in _backends:
+        _backends[vendor] = PostgresSearchBackend() if vendor == 'postgresql' else InvertedIndexSearchBackend()
+    return _backends[vendor]
+
+
+def update_search_vectors(item_ids):
+    get_search_backend().update(item_ids)
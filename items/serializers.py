@@ -1,4 +1,6 @@
+from django.db.models.query import QuerySet
 from rest_framework import serializers
+from utils.serializers import ValuesSerializer
 from .models import Category, Attribute, Item, AttributeValue
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -26,3 +28,80 @@ class AttributeValueSerializer(serializers.ModelSerializer):
         model = AttributeValue
         fields = ['uuid', 'item', 'attribute', 'value']
         read_only_fields = ['uuid']
+
+class ItemReadSerializer(ValuesSerializer):
+    """
+    Fast read path with the same output as ItemSerializer.
+    """
+    class Meta:
+        model = Item
+        fields = ItemSerializer.Meta.fields
+
+class CategoryReadSerializer(ValuesSerializer):
+    """
+    Fast read path with the same output as CategorySerializer.
+
+    Subcategories are attached in memory: for the whole category table they
+    come from the same single query, for a filtered queryset from one extra
+    query, never from a reverse query per category. Pass `complete=True` with
+    rows already fetched from the whole table, as the async views do.
+    """
+    class Meta:
+        model = Category
+        fields = ['uuid', 'name', 'parent_category']
+
+    def __init__(self, instance, many=True, complete=False):
+        super().__init__(instance, many)
+        self.complete = complete
+
+    def get_subcategories(self, rows):
+        if self.complete or isinstance(self.instance, QuerySet) and not self.instance.query.has_filters():
+            children = [(row.parent_category_id, row.uuid) for row in rows]
+        else:
+            parents = [row.uuid for row in rows]
+            children = Category.objects.filter(parent_category__in=parents).values_list('parent_category', 'uuid')
+        subcategories = {}
+        for parent, child in children:
+            if parent is not None:
+                subcategories.setdefault(parent, []).append(child)
+        return subcategories
+
+    @property
+    def data(self):
+        rows = list(self.get_rows())
+        subcategories = self.get_subcategories(rows)
+        data = []
+        for row in rows:
+            representation = self.to_representation(row)
+            representation['subcategories'] = subcategories.get(row.uuid, [])
+            data.append(representation)
+        return data
+
+class CategoryTreeSerializer(CategoryReadSerializer):
+    """
+    The category forest as nested nodes, built from a single query.
+
+    Each node is `{uuid, name, subcategories: [nodes]}`; categories whose
+    parent is not part of the queryset become roots.
+    """
+    class Meta:
+        model = Category
+        fields = ['uuid', 'name']
+
+    @classmethod
+    def get_columns(cls):
+        return super().get_columns() + ['parent_category_id']
+
+    @property
+    def data(self):
+        rows = list(self.get_rows())
+        nodes = {}
+        for row in rows:
+            node = self.to_representation(row)
+            node['subcategories'] = []
+            nodes[row.uuid] = node
+        roots = []
+        for row in rows:
+            parent = nodes.get(row.parent_category_id)
+            (roots if parent is None else parent['subcategories']).append(nodes[row.uuid])
+        return roots
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from utils.cache import bump_versions
+from utils.transactions import on_commit_batched
+from .models import Attribute, AttributeValue, Category, CategoryClosure, Item
+from .search import update_search_vectors
+
+
+def get_ancestor_links(category_id):
+    return list(CategoryClosure.objects.filter(descendant=category_id).values_list('ancestor', 'depth'))
+
+
+@receiver(post_save, sender=Category)
+def update_category_closure(sender, instance, created, **kwargs):
+    """
+    Keep CategoryClosure in sync when a category is created or moved.
+    """
+    parent_id = instance.parent_category_id
+    with transaction.atomic():
+        if created:
+            links = [CategoryClosure(ancestor=instance, descendant=instance, depth=0)]
+            if parent_id:
+                links += [
+                    CategoryClosure(ancestor_id=ancestor, descendant=instance, depth=depth + 1)
+                    for ancestor, depth in get_ancestor_links(parent_id)
+                ]
+            CategoryClosure.objects.bulk_create(links)
+            return
+
+        current_parent_id = CategoryClosure.objects.filter(descendant=instance, depth=1).values_list('ancestor', flat=True).first()
+        if current_parent_id == parent_id:
+            return
+
+        # The category moved: detach its subtree from the old ancestors and
+        # attach it below every ancestor of the new parent.
+        subtree = list(CategoryClosure.objects.filter(ancestor=instance).values_list('descendant', 'depth'))
+        subtree_ids = [descendant for descendant, _ in subtree]
+        CategoryClosure.objects.filter(descendant__in=subtree_ids).exclude(ancestor__in=subtree_ids).delete()
+        if parent_id:
+            CategoryClosure.objects.bulk_create(
+                CategoryClosure(ancestor_id=ancestor, descendant_id=descendant, depth=ancestor_depth + depth + 1)
+                for ancestor, ancestor_depth in get_ancestor_links(parent_id)
+                for descendant, depth in subtree
+            )
+
+
+def invalidate_catalog(ancestors):
+    """
+    Bump the catalog-wide response cache version and the version of every
+    category whose (descendant-inclusive) item list may have changed.
+    """
+    bump_versions(['catalog', *('category:%s' % ancestor for ancestor in ancestors.values_list('ancestor', flat=True))])
+
+
+def is_cascade(sender, origin=None, **kwargs):
+    """
+    Whether a post_delete comes from deleting a category or an item that
+    `sender` cascades from. Their own handlers invalidate everything the
+    cascade removes, so there is no need to do it again row by row.
+    """
+    model = getattr(origin, 'model', type(origin))
+    return model is not sender and model in (Category, Item)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance, **kwargs):
+    # Any tree change can move items in or out of descendant listings, so
+    # category edits invalidate every category endpoint at once.
+    bump_versions(['catalog', 'tree'])
+
+
+@receiver(pre_save, sender=Item)
+def remember_item_category(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_category_id = Item.objects.filter(pk=instance.pk).values_list('category', flat=True).first()
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_item(sender, instance, **kwargs):
+    if is_cascade(sender, **kwargs):
+        return
+    categories = {instance.category_id, getattr(instance, '_previous_category_id', None)} - {None}
+    invalidate_catalog(CategoryClosure.objects.filter(descendant__in=categories))
+
+
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+def invalidate_attribute(sender, instance, **kwargs):
+    if is_cascade(sender, **kwargs):
+        return
+    invalidate_catalog(CategoryClosure.objects.filter(descendant=instance.category_id))
+
+
+@receiver(post_save, sender=AttributeValue)
+@receiver(post_delete, sender=AttributeValue)
+def invalidate_attribute_value(sender, instance, **kwargs):
+    if is_cascade(sender, **kwargs):
+        return
+    invalidate_catalog(CategoryClosure.objects.filter(descendant__item=instance.item_id))
+
+
+@receiver(post_save, sender=Item)
+def update_item_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'name', 'description'} & set(update_fields):
+        on_commit_batched(update_search_vectors, [instance.pk])
+
+
+@receiver(post_save, sender=AttributeValue)
+@receiver(post_delete, sender=AttributeValue)
+def update_attribute_value_search_vector(sender, instance, **kwargs):
+    # Values deleted along with their item leave no vector to refresh; the
+    # others are refreshed once per item when the transaction commits.
+    if is_cascade(sender, **kwargs):
+        return
+    on_commit_batched(update_search_vectors, [instance.item_id])
@@ -1,3 +1,652 @@
-from django.test import TestCase
+import json
+import time
+from base64 import urlsafe_b64encode
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from benchmarks.seed import ATTRIBUTES, seed_attribute_values
+from utils.middleware import ReplicaMiddleware
+from utils.routers import ReplicaMonitor, ReplicaRouter, RequestRouting, current_routing, monitor
+from utils.streaming import stream_queryset
+from utils.testing import QueryPlanMixin, analyze, clear_caches
+from utils.uuids import uuid7
+from .feed import ItemImporter
+from .models import Attribute, AttributeValue, Category, CategoryClosure, Item
+from .serializers import CategoryReadSerializer, CategorySerializer, CategoryTreeSerializer, ItemReadSerializer, ItemSerializer
+from .search import InvertedIndexSearchBackend, update_search_vectors
 
-# Create your tests here.
+SEEDED_ATTRIBUTE_VALUES = 100000
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Plans and counts are those of PostgreSQL.')
+class CatalogQueryPlanTests(QueryPlanMixin, TestCase):
+    """
+    Query budgets and plans of the catalog endpoints over a seeded catalog
+    of 20,000 items in 20 categories, one of them with two subcategories.
+    Below that volume the planner rightly prefers some sequential scans.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Created one by one so the closure table is maintained.
+        cls.categories = [Category.objects.create(name=f'Category {i}') for i in range(18)]
+        cls.parent = cls.categories[0]
+        cls.categories += [Category.objects.create(name=f'Subcategory {i}', parent_category=cls.parent) for i in range(2)]
+        seed_attribute_values(SEEDED_ATTRIBUTE_VALUES, cls.categories)
+        # Seeded names and descriptions draw on 20 words; search for a rare one.
+        Item.objects.bulk_create(
+            Item(name=f'Zeppelin {i}', description='Rare item', price=10, category=cls.categories[1]) for i in range(5)
+        )
+        update_search_vectors(Item.objects.values('uuid'))
+        analyze()
+
+    def test_items_first_page(self):
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get('/items?page_size=20')
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_items_deep_page(self):
+        next_link = self.client.get('/items?page_size=20&ordering=-price').json()['next']
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get(next_link)
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_items_by_attribute(self):
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get('/items?page_size=20&attr=color:red&attr=size:XL')
+        self.assertEqual(response.status_code, 200)
+
+    def test_items_by_category(self):
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get(f'/items/category/{self.categories[5].pk}/?page_size=20&ordering=price')
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_items_by_category_with_descendants(self):
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get(f'/items/category/{self.parent.pk}/?include_descendants=1&page_size=20')
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_category_facets(self):
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get(f'/items/category/{self.categories[5].pk}/facets?attr=color:red')
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalog_facets(self):
+        # Counting the whole catalog reads every attribute value.
+        with self.assertQueryPlan(max_queries=1, seq_scans=['items_attribute', 'items_attributevalue', 'items_item']):
+            response = self.client.get('/items/facets')
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        with self.assertQueryPlan(max_queries=3):
+            response = self.client.get('/items/search?q=zeppelin&page_size=20')
+        self.assertEqual(response.json()['count'], 5)
+
+    def test_autocomplete(self):
+        with self.assertQueryPlan(max_queries=1):
+            response = self.client.get('/items/search?q=rare+zepp&mode=autocomplete')
+        self.assertEqual(len(response.json()), 5)
+
+    def test_categories(self):
+        # The whole, small category table is the response.
+        with self.assertQueryPlan(max_queries=1, seq_scans=['items_category']):
+            response = self.client.get('/items/categories')
+        self.assertEqual(len(response.json()), len(self.categories))
+
+    def test_category_tree(self):
+        with self.assertQueryPlan(max_queries=1, seq_scans=['items_category']):
+            response = self.client.get('/items/categories?tree=1')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(REPLICA_ROUTING={**settings.REPLICA_ROUTING, 'ALIASES': ['default']})
+class ReplicaRoutingTests(TestCase):
+    """
+    The only "replica" is `default` itself; the tests check that item reads
+    are routed while the request opted in to replica reads.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category')
+        Item.objects.bulk_create(Item(name=f'Item {i}', description='', price=i, category=category) for i in range(3))
+
+    def setUp(self):
+        clear_caches()
+
+    def routed_item_reads(self):
+        reads = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            routing = current_routing.get()
+            if model is Item:
+                reads.append(routing is not None and routing.replica)
+            return db_for_read(router, model, **hints)
+
+        return reads, mock.patch.object(ReplicaRouter, 'db_for_read', spy)
+
+    def test_paged_list(self):
+        reads, spy = self.routed_item_reads()
+        with spy, mock.patch.object(monitor, 'is_healthy', return_value=True):
+            self.assertEqual(len(self.client.get('/items?page_size=2').json()['results']), 2)
+        self.assertTrue(reads)
+        self.assertTrue(all(reads))
+
+    def test_streamed_list(self):
+        for query_string in ('stream=1', 'format=ndjson'):
+            reads, spy = self.routed_item_reads()
+            with spy, mock.patch.object(monitor, 'is_healthy', return_value=True):
+                response = self.client.get('/items?' + query_string)
+                self.assertEqual(b''.join(response.streaming_content).count(b'"uuid"'), 3)
+            self.assertTrue(reads)
+            self.assertTrue(all(reads), query_string)
+
+    async def test_async_streamed_list(self):
+        reads, spy = self.routed_item_reads()
+        with spy, mock.patch.object(monitor, 'is_healthy', return_value=True):
+            response = await self.async_client.get('/items/async')
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body.count(b'"uuid"'), 3)
+        self.assertTrue(reads)
+        self.assertTrue(all(reads))
+
+    def test_pinned_to_primary_after_write(self):
+        future, past = str(time.time() + 60), str(time.time() - 1)
+        for cookie, headers, replica in ((future, {}, False), (None, {'X-Read-Primary-Until': future}, False), (past, {}, True)):
+            if cookie:
+                self.client.cookies['read_primary_until'] = cookie
+            reads, spy = self.routed_item_reads()
+            with spy, mock.patch.object(monitor, 'is_healthy', return_value=True):
+                self.client.get('/items?page_size=2', headers=headers)
+            self.assertEqual(set(reads), {replica}, (cookie, headers))
+            self.client.cookies.clear()
+            clear_caches()
+
+    def test_write_sets_deadline(self):
+        middleware = ReplicaMiddleware(lambda request: HttpResponse())
+        response = middleware(RequestFactory().post('/items'))
+        deadline = float(response.cookies['read_primary_until'].value)
+        self.assertAlmostEqual(deadline, time.time() + settings.REPLICA_ROUTING['STICKY_SECONDS'], delta=5)
+        self.assertEqual(response['X-Read-Primary-Until'], response.cookies['read_primary_until'].value)
+        self.assertNotIn('read_primary_until', middleware(RequestFactory().get('/items')).cookies)
+
+    def test_unhealthy_replica(self):
+        router = ReplicaRouter()
+        routing = RequestRouting()
+        routing.replica = True
+        token = current_routing.set(routing)
+        try:
+            with override_settings(REPLICA_ROUTING={**settings.REPLICA_ROUTING, 'ALIASES': ['replica']}):
+                with mock.patch.object(monitor, 'is_healthy', return_value=True):
+                    self.assertEqual(router.db_for_read(Item), 'replica')
+                with mock.patch.object(monitor, 'is_healthy', return_value=False):
+                    self.assertEqual(router.db_for_read(Item), 'default')
+            self.assertEqual(router.db_for_write(Item), 'default')
+        finally:
+            current_routing.reset(token)
+        self.assertEqual(router.db_for_read(Item), 'default')
+
+    def test_monitor_checks_once_per_interval(self):
+        replica_monitor = ReplicaMonitor()
+        with mock.patch.object(replica_monitor, 'check', return_value=True) as check:
+            self.assertTrue(replica_monitor.is_healthy('default'))
+            self.assertTrue(replica_monitor.is_healthy('default'))
+        check.assert_called_once_with('default', settings.REPLICA_ROUTING['MAX_LAG'])
+        self.assertTrue(ReplicaMonitor().check('default', 0))
+
+
+
+class ItemImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+
+    def row(self, **values):
+        return {'name': 'Item', 'description': 'Thing', 'price': '1.00', 'category': str(self.category.pk), **values}
+
+    def test_zero_price(self):
+        stats = ItemImporter().import_rows([self.row(name='Free', price=0), self.row(name='Also free', price=0.0)])
+        self.assertEqual((stats['imported'], stats['rejected']), (2, 0))
+        self.assertEqual(set(Item.objects.values_list('price', flat=True)), {0})
+
+    def test_missing_price(self):
+        stats = ItemImporter().import_rows([self.row(price=None)])
+        self.assertEqual(stats['rejected'], 1)
+
+    def test_duplicate_uuid_in_batch(self):
+        item_uuid = '00000000-0000-7000-8000-000000000001'
+        stats = ItemImporter().import_rows([self.row(uuid=item_uuid, name='First'), self.row(uuid=item_uuid, name='Second')])
+        self.assertEqual((stats['rows'], stats['imported'], stats['rejected']), (2, 1, 1))
+        self.assertEqual(stats['errors'][0]['line'], 2)
+        self.assertEqual(Item.objects.get(pk=item_uuid).name, 'First')
+
+    def test_reimport_queries(self):
+        rows = [
+            self.row(uuid=f'00000000-0000-7000-8000-{i:012d}', attributes={'color': 'red', 'size': 'M', 'material': 'wood'})
+            for i in range(200)
+        ]
+        with CaptureQueriesContext(connection) as first:
+            ItemImporter().import_rows(rows)
+        with CaptureQueriesContext(connection) as again:
+            stats = ItemImporter().import_rows(rows)
+        self.assertEqual((stats['imported'], AttributeValue.objects.count()), (200, 600))
+        # Replacing the values costs one DELETE, not a signal per value.
+        self.assertLessEqual(len(again), len(first) + 1)
+
+
+class CatalogInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+        cls.items = seed_attribute_values(40 * len(ATTRIBUTES), [cls.category])
+
+    def test_category_delete(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks() as callbacks:
+            self.category.delete()
+        self.assertFalse(Item.objects.exists())
+        # The category's own bump covers its items and their values.
+        self.assertEqual(len(callbacks), 1)
+        closure_reads = [query for query in queries if query['sql'].startswith('SELECT') and 'categoryclosure' in query['sql']]
+        self.assertLess(len(closure_reads), self.items)
+
+    def test_bumps_merged_per_transaction(self):
+        item = Item.objects.filter(category=self.category).first()
+        with mock.patch('utils.cache._bump') as bump, self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+            Item.objects.create(name='Item', description='Thing', price=1, category=self.category)
+        bump.assert_called_once_with({'catalog', f'category:{self.category.pk}'})
+
+
+class SearchVectorUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+        seed_attribute_values(len(ATTRIBUTES), [cls.category])
+        cls.item = Item.objects.get()
+
+    def test_values_update_once_per_item(self):
+        with mock.patch('items.signals.update_search_vectors') as update, self.captureOnCommitCallbacks(execute=True):
+            for value in AttributeValue.objects.filter(item=self.item):
+                value.value = 'Other'
+                value.save()
+        update.assert_called_once_with({self.item.pk})
+
+    def test_item_delete(self):
+        with mock.patch('items.signals.update_search_vectors') as update, self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        update.assert_not_called()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category')
+        # Few distinct prices, so pages split runs of equal keys.
+        cls.items = Item.objects.bulk_create(
+            Item(name=f'Item {i % 3}', description='Thing', price=i % 3, category=category) for i in range(7)
+        )
+
+    def setUp(self):
+        clear_caches()
+
+    def walk(self, url, link):
+        uuids = []
+        while url:
+            body = self.client.get(url).json()
+            page = [item['uuid'] for item in body['results']]
+            uuids += page if link == 'next' else page[::-1]
+            url = body[link]
+        return uuids
+
+    def test_round_trip(self):
+        for ordering, reverse in (('price', False), ('-price', True), ('name', False)):
+            field = ordering.lstrip('-')
+            expected = [str(item.uuid) for item in sorted(self.items, key=lambda item: (getattr(item, field), item.uuid), reverse=reverse)]
+            self.assertEqual(self.walk(f'/items?page_size=2&ordering={ordering}', 'next'), expected, ordering)
+            # Back from the last page, through the previous links.
+            url = f'/items?page_size=2&ordering={ordering}'
+            while (body := self.client.get(url).json())['next']:
+                url = body['next']
+            self.assertEqual(self.walk(url, 'previous'), expected[::-1], ordering)
+
+    def test_first_page(self):
+        body = self.client.get('/items?page_size=3&count=1').json()
+        self.assertEqual((len(body['results']), body['count'], body['previous']), (3, 7, None))
+        self.assertNotIn('count', self.client.get('/items?page_size=3').json())
+        self.assertIsInstance(self.client.get('/items').json(), list)
+
+    def test_bad_cursor(self):
+        for cursor in ('garbage', urlsafe_b64encode(b'{"p":["1"]}').decode(), urlsafe_b64encode(b'{"p":["x","y"]}').decode()):
+            self.assertEqual(self.client.get(f'/items?ordering=price&cursor={cursor}').status_code, 404, cursor)
+
+
+class StreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+        Item.objects.bulk_create(Item(name=f'Item {i}', description='Thing', price=i, category=cls.category) for i in range(5))
+
+    def setUp(self):
+        clear_caches()
+
+    def test_json_array(self):
+        response = self.client.get('/items?stream=1')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), self.client.get('/items').json())
+
+    def test_ndjson(self):
+        expected = self.client.get('/items').json()
+        for headers, query_string in (({'Accept': 'application/x-ndjson'}, ''), ({}, '?format=ndjson')):
+            response = self.client.get('/items' + query_string, headers=headers)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_chunks(self):
+        items = ItemReadSerializer.values(Item.objects.order_by('price'))
+        expected = self.client.get('/items').json()
+        for chunk_size in (1, 2, 5, 10):
+            response = stream_queryset(items, ItemReadSerializer, chunk_size=chunk_size)
+            self.assertEqual(json.loads(b''.join(response.streaming_content)), sorted(expected, key=lambda item: float(item['price'])))
+
+    def test_empty(self):
+        response = self.client.get(f'/items/category/{Category.objects.create(name="Empty").pk}/?stream=1')
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+        response = self.client.get(f'/items/category/{self.category.pk}/?format=ndjson&attr=color:none')
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    async def test_async_ndjson(self):
+        response = await self.async_client.get('/items/async', headers={'Accept': 'application/x-ndjson'})
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual({json.loads(line)['name'] for line in lines}, {f'Item {i}' for i in range(5)})
+
+
+class ReadSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name='Root')
+        cls.child = Category.objects.create(name='Child', parent_category=cls.root)
+        Category.objects.create(name='Grandchild', parent_category=cls.child)
+        Category.objects.create(name='Sibling', parent_category=cls.root)
+        for price in ('0', '0.5', '19.99', '-3.10', '12345678.90'):
+            Item.objects.create(name=f'Item {price}', description='Zażółć "gęślą"\n', price=Decimal(price), category=cls.child)
+
+    def rendered(self, data):
+        data = json.loads(JSONRenderer().render(data))
+        for row in data:
+            if 'subcategories' in row:
+                row['subcategories'].sort()
+        return data
+
+    def assertSameOutput(self, read_serializer, serializer, queryset):
+        self.assertEqual(self.rendered(read_serializer(queryset).data), self.rendered(serializer(queryset, many=True).data))
+
+    def test_items(self):
+        self.assertSameOutput(ItemReadSerializer, ItemSerializer, Item.objects.order_by('price'))
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'COERCE_DECIMAL_TO_STRING': False}):
+            self.assertSameOutput(ItemReadSerializer, ItemSerializer, Item.objects.order_by('price'))
+        self.assertEqual(ItemReadSerializer(Item.objects.order_by('price')).data[0]['price'], '-3.10')
+
+    def test_categories(self):
+        for queryset in (Category.objects.order_by('name'), Category.objects.filter(name__in=['Root', 'Grandchild']).order_by('name')):
+            self.assertSameOutput(CategoryReadSerializer, CategorySerializer, queryset)
+        rows = list(CategoryReadSerializer.values(Category.objects.order_by('name')))
+        expected = self.rendered(CategorySerializer(Category.objects.order_by('name'), many=True).data)
+        self.assertEqual(self.rendered(CategoryReadSerializer(rows, complete=True).data), expected)
+        self.assertIsNone(self.rendered(CategoryReadSerializer(Category.objects.filter(pk=self.root.pk)).data)[0]['parent_category'])
+
+    def test_tree(self):
+        clear_caches()
+        node = lambda category, *subcategories: {'uuid': str(category.pk), 'name': category.name, 'subcategories': list(subcategories)}
+        grandchild, sibling = Category.objects.get(name='Grandchild'), Category.objects.get(name='Sibling')
+        other = Category.objects.create(name='Other')
+        with self.assertNumQueries(1):
+            response = self.client.get('/items/categories?tree=1')
+        # Roots and siblings by name.
+        self.assertEqual(response.json(), [node(other), node(self.root, node(self.child, node(grandchild)), node(sibling))])
+        # Categories whose parent is left out become roots.
+        tree = CategoryTreeSerializer(Category.objects.exclude(pk=self.root.pk).order_by('name')).data
+        self.assertEqual(json.loads(JSONRenderer().render(tree)), [node(self.child, node(grandchild)), node(other), node(sibling)])
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name='Root')
+        cls.child = Category.objects.create(name='Child', parent_category=cls.root)
+        cls.item = Item.objects.create(name='Item', description='Zażółć', price=Decimal('9.90'), category=cls.root)
+        cls.child_item = Item.objects.create(name='Child item', description='Thing', price=1, category=cls.child)
+        cls.missing = uuid7()
+        serialize = lambda *items: json.loads(JSONRenderer().render(ItemSerializer(items, many=True).data))
+        cls.expected_item, cls.expected_child_item = serialize(cls.item, cls.child_item)
+        cls.expected_root = json.loads(JSONRenderer().render(CategorySerializer(cls.root).data))
+
+    async def get_streamed(self, path):
+        response = await self.async_client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+
+    async def test_item_detail(self):
+        response = await self.async_client.get(f'/items/async/{self.item.pk}')
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'application/json'))
+        self.assertEqual(response.json(), self.expected_item)
+        response = await self.async_client.get(f'/items/async/{self.missing}')
+        self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Not found.'}))
+
+    async def test_items_by_category(self):
+        self.assertEqual(await self.get_streamed(f'/items/async/category/{self.root.pk}/'), [self.expected_item])
+        items = await self.get_streamed(f'/items/async/category/{self.root.pk}/?include_descendants=1')
+        self.assertCountEqual(items, [self.expected_item, self.expected_child_item])
+        self.assertEqual(await self.get_streamed(f'/items/async/category/{self.missing}/'), [])
+        response = await self.async_client.get(f'/items/async/category/{self.root.pk}/?attr=color')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_category_detail(self):
+        response = await self.async_client.get(f'/items/async/categories/{self.root.pk}')
+        self.assertEqual((response.status_code, response.json()), (200, self.expected_root))
+        self.assertEqual(response.json()['subcategories'], [str(self.child.pk)])
+        response = await self.async_client.get(f'/items/async/categories/{self.missing}')
+        self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Not found.'}))
+
+
+class CategoryClosureTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # root > middle > leaf, and other.
+        cls.root = Category.objects.create(name='Root')
+        cls.middle = Category.objects.create(name='Middle', parent_category=cls.root)
+        cls.leaf = Category.objects.create(name='Leaf', parent_category=cls.middle)
+        cls.other = Category.objects.create(name='Other')
+        cls.item = Item.objects.create(name='Item', description='Thing', price=1, category=cls.leaf)
+
+    def setUp(self):
+        clear_caches()
+
+    def ancestors(self, category):
+        return dict(CategoryClosure.objects.filter(descendant=category).values_list('ancestor', 'depth'))
+
+    def listed_under(self, category):
+        return len(self.client.get(f'/items/category/{category.pk}/?include_descendants=1').json())
+
+    def test_create(self):
+        self.assertEqual(self.ancestors(self.leaf), {self.leaf.pk: 0, self.middle.pk: 1, self.root.pk: 2})
+        self.assertEqual((self.listed_under(self.root), self.listed_under(self.other)), (1, 0))
+
+    def test_move_subtree(self):
+        self.assertEqual((self.listed_under(self.root), self.listed_under(self.other)), (1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.middle.parent_category = self.other
+            self.middle.save()
+        self.assertEqual(self.ancestors(self.middle), {self.middle.pk: 0, self.other.pk: 1})
+        self.assertEqual(self.ancestors(self.leaf), {self.leaf.pk: 0, self.middle.pk: 1, self.other.pk: 2})
+        self.assertEqual(self.ancestors(self.root), {self.root.pk: 0})
+        self.assertEqual((self.listed_under(self.root), self.listed_under(self.other)), (0, 1))
+
+    def test_move_to_root(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leaf.parent_category = None
+            self.leaf.save()
+        self.assertEqual(self.ancestors(self.leaf), {self.leaf.pk: 0})
+        self.assertEqual((self.listed_under(self.root), self.listed_under(self.leaf)), (0, 1))
+
+    def test_save_without_move(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.leaf.name = 'Renamed'
+            self.leaf.save()
+        self.assertFalse([query for query in queries if 'INSERT INTO "items_categoryclosure"' in query['sql']])
+        self.assertEqual(self.ancestors(self.leaf), {self.leaf.pk: 0, self.middle.pk: 1, self.root.pk: 2})
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+        cls.other = Category.objects.create(name='Other')
+        cls.item = Item.objects.create(name='Item', description='Thing', price=1, category=cls.category)
+
+    def setUp(self):
+        clear_caches()
+
+    def test_hit(self):
+        response = self.client.get('/items')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/items')
+        self.assertEqual((cached.content, cached['ETag']), (response.content, response['ETag']))
+
+    def test_not_modified(self):
+        etag = self.client.get('/items')['ETag']
+        for _ in range(2):  # Miss, then hit.
+            response = self.client.get('/items?page_size=1', headers={'If-None-Match': self.client.get('/items?page_size=1')['ETag']})
+            self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/items', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get('/items', headers={'If-None-Match': '"other"'}).status_code, 200)
+
+    def test_write_invalidates(self):
+        etag = self.client.get('/items')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.name = 'Renamed'
+            self.item.save()
+        response = self.client.get('/items', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], 'Renamed')
+
+    def test_other_category_stays_cached(self):
+        self.client.get(f'/items/category/{self.other.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(name='New', description='Thing', price=1, category=self.category)
+        with self.assertNumQueries(0):
+            self.client.get(f'/items/category/{self.other.pk}/')
+        self.assertEqual(len(self.client.get(f'/items/category/{self.category.pk}/').json()), 2)
+
+    def test_categories_skip_item_writes(self):
+        self.client.get('/items/categories')
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(name='New', description='Thing', price=1, category=self.category)
+        with self.assertNumQueries(0):
+            self.client.get('/items/categories')
+
+    def test_categories_follow_category_writes(self):
+        self.client.get('/items/categories')
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='New', parent_category=self.other)
+        self.assertEqual(len(self.client.get('/items/categories').json()), 3)
+
+    def test_keyed_on_host_and_scheme(self):
+        Item.objects.create(name='Other', description='Thing', price=2, category=self.other)
+        for host, secure in (('a.example.com', False), ('b.example.com', False), ('b.example.com', True)):
+            link = self.client.get('/items?page_size=1', headers={'Host': host}, secure=secure).json()['next']
+            self.assertTrue(link.startswith(('https://' if secure else 'http://') + host + '/items?'), link)
+
+    def test_stream_not_cached(self):
+        b''.join(self.client.get('/items?format=ndjson').streaming_content)
+        with self.assertNumQueries(1):
+            b''.join(self.client.get('/items?format=ndjson').streaming_content)
+
+
+class AttributeFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+        color, size = (Attribute.objects.create(name=name, category=cls.category) for name in ('color', 'size'))
+        cls.items = {}
+        for name, values in (('A', {color: 'red', size: 'XL'}), ('B', {color: 'red', size: 'M'}), ('C', {color: 'blue', size: 'XL'}), ('D', {})):
+            item = cls.items[name] = Item.objects.create(name=name, description='Thing', price=1, category=cls.category)
+            AttributeValue.objects.bulk_create(AttributeValue(item=item, attribute=attribute, value=value) for attribute, value in values.items())
+
+    def setUp(self):
+        clear_caches()
+
+    def names(self, query_string):
+        return sorted(item['name'] for item in self.client.get('/items?' + query_string).json())
+
+    def test_filters(self):
+        self.assertEqual(self.names('attr=color:red'), ['A', 'B'])
+        self.assertEqual(self.names('attr=color:red&attr=size:XL'), ['A'])
+        self.assertEqual(self.names('attr=color:red&attr=color:blue'), ['A', 'B', 'C'])
+        self.assertEqual(self.names('attr=color:red&attr=color:blue&attr=size:M'), ['B'])
+        self.assertEqual(self.names('attr=color:green'), [])
+        self.assertEqual(len(self.client.get(f'/items/category/{self.category.pk}/?attr=size:XL').json()), 2)
+
+    def test_bad_filter(self):
+        for value in ('color', ':red'):
+            self.assertEqual(self.client.get('/items?attr=' + value).status_code, 400, value)
+
+    def test_facets(self):
+        self.assertEqual(self.client.get('/items/facets').json(), [
+            {'attribute': 'color', 'values': [{'value': 'red', 'count': 2}, {'value': 'blue', 'count': 1}]},
+            {'attribute': 'size', 'values': [{'value': 'XL', 'count': 2}, {'value': 'M', 'count': 1}]},
+        ])
+        self.assertEqual(self.client.get(f'/items/category/{self.category.pk}/facets?attr=size:XL').json(), [
+            {'attribute': 'color', 'values': [{'value': 'blue', 'count': 1}, {'value': 'red', 'count': 1}]},
+            {'attribute': 'size', 'values': [{'value': 'XL', 'count': 2}]},
+        ])
+
+
+class InvertedIndexSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category')
+        speaker = Attribute.objects.create(name='kind', category=category)
+        cls.by_name = Item.objects.create(name='Wireless speaker', description='Loud', price=1, category=category)
+        cls.by_description = Item.objects.create(name='Radio', description='A wireless radio', price=1, category=category)
+        cls.by_attribute = Item.objects.create(name='Headphones', description='Quiet', price=1, category=category)
+        AttributeValue.objects.create(item=cls.by_attribute, attribute=speaker, value='Wireless')
+
+    def setUp(self):
+        clear_caches()
+        self.backend = InvertedIndexSearchBackend()
+
+    def test_ranking(self):
+        self.assertEqual(self.backend.search('WIRELESS'), [self.by_name.pk, self.by_description.pk, self.by_attribute.pk])
+        self.assertEqual(self.backend.search('wireless radio'), [self.by_description.pk])
+        self.assertEqual(self.backend.search('wireless nothing'), [])
+        self.assertEqual(self.backend.search('!!'), [])
+
+    def test_autocomplete(self):
+        self.assertEqual(self.backend.autocomplete('wire', 2), [(self.by_name.pk, 'Wireless speaker'), (self.by_description.pk, 'Radio')])
+        self.assertEqual(self.backend.autocomplete('wireless spe', 10), [(self.by_name.pk, 'Wireless speaker')])
+        self.assertEqual(self.backend.autocomplete('', 10), [])
+
+    def test_rebuilt_on_write(self):
+        self.assertEqual(self.backend.search('portable'), [])
+        with self.assertNumQueries(0):  # The index is reused until the catalog changes.
+            self.backend.search('portable')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.by_name.name = 'Portable speaker'
+            self.by_name.save()
+        self.assertEqual(self.backend.search('portable'), [self.by_name.pk])
+
+    @skipUnless(connection.vendor != 'postgresql', 'PostgreSQL searches with PostgresSearchBackend.')
+    def test_search_view(self):
+        response = self.client.get('/items/search?q=wireless&page_size=2')
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Wireless speaker', 'Radio'])
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(self.client.get('/items/search?q=head&mode=autocomplete').json(), [{'uuid': str(self.by_attribute.pk), 'name': 'Headphones'}])
+        self.assertEqual(self.client.get('/items/search').status_code, 400)
@@ -1,8 +1,18 @@
 from django.urls import path
-from .views import ItemsByCategoryView, AllItemsView, AllCategoriesView
+from .views import ItemsByCategoryView, AllItemsView, AllCategoriesView, ItemFacetsView, ItemSearchView
+from .async_views import AsyncAllCategoriesView, AsyncAllItemsView, AsyncCategoryDetailView, AsyncItemDetailView, AsyncItemsByCategoryView
 
 urlpatterns = [
     path('/category/<uuid:uuid>/', ItemsByCategoryView.as_view(), name='items_by_category'),
+    path('/category/<uuid:uuid>/facets', ItemFacetsView.as_view(), name='category_facets'),
     path('', AllItemsView.as_view(), name='items'),
+    path('/facets', ItemFacetsView.as_view(), name='facets'),
+    path('/search', ItemSearchView.as_view(), name='item_search'),
     path('/categories', AllCategoriesView.as_view(), name='categories'),
+    # async variants for ASGI
+    path('/async', AsyncAllItemsView.as_view(), name='async_items'),
+    path('/async/<uuid:uuid>', AsyncItemDetailView.as_view(), name='async_item'),
+    path('/async/category/<uuid:uuid>/', AsyncItemsByCategoryView.as_view(), name='async_items_by_category'),
+    path('/async/categories', AsyncAllCategoriesView.as_view(), name='async_categories'),
+    path('/async/categories/<uuid:uuid>', AsyncCategoryDetailView.as_view(), name='async_category'),
 ]
@@ -2,45 +2,214 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Item, Category
-from .serializers import ItemSerializer, CategorySerializer
+from .serializers import ItemSerializer, CategorySerializer, ItemReadSerializer, CategoryReadSerializer, CategoryTreeSerializer
 from rest_framework.permissions import AllowAny
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
+from rest_framework.settings import api_settings
+from utils.cache import CachedResponseMixin
+from .search import get_search_backend
+from .filters import category_items, facet_counts, filter_by_attributes, is_enabled, parse_attribute_filters
+from utils.paginators import KeysetPagination, StandardResultsSetPagination
+from utils.streaming import NDJSONRenderer, get_stream_format, stream_queryset
 
-class ItemsByCategoryView(APIView):
+attribute_parameters = [
+    OpenApiParameter(name="attr", type=OpenApiTypes.STR, many=True, description='Attribute filter as `<attribute>:<value>`; repeat it to OR values of one attribute and AND different attributes.', required=False),
+]
+
+keyset_parameters = [
+    OpenApiParameter(name="cursor", type=OpenApiTypes.STR, description='Opaque cursor taken from the next/previous link.', required=False),
+    OpenApiParameter(name="page_size", type=OpenApiTypes.INT, description='Page size; enables keyset pagination.', required=False),
+    OpenApiParameter(name="ordering", type=OpenApiTypes.STR, enum=KeysetPagination.orderings, description='Ordering of the pages.', required=False),
+    OpenApiParameter(name="count", type=OpenApiTypes.BOOL, description='Include the total count (costs a COUNT query).', required=False),
+    OpenApiParameter(name="stream", type=OpenApiTypes.BOOL, description='Stream the full list as a chunked JSON array. Use `Accept: application/x-ndjson` for NDJSON.', required=False),
+]
+
+class ItemsByCategoryView(CachedResponseMixin, APIView):
     serializer_class = ItemSerializer
+    read_serializer_class = ItemReadSerializer
     permission_classes = [AllowAny]
+    replica_reads = True
+    pagination_class = KeysetPagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+
+    def get_cache_versions(self, request, *args, **kwargs):
+        return ['tree', 'category:%s' % kwargs['uuid']]
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="include_descendants", type=OpenApiTypes.BOOL, description='Include items of all subcategories.', required=False),
+            *attribute_parameters,
+            *keyset_parameters,
+        ],
+    )
     def get(self, request, uuid):
+        """
+        Retrieve items of a category, keyset paginated when `cursor` or `page_size` is given
+        or streamed with `stream=1` / NDJSON.
+
+        With `include_descendants=1` items of every subcategory, at any depth, are
+        included through a single join on the category closure table.
+
+        Example:
+        http://localhost:8000/items/category/<uuid>/?include_descendants=1&page_size=50&ordering=price
+        """
         try:
-            items = Item.objects.filter(category=uuid)
-            serializer = self.serializer_class(items, many=True)
+            items = category_items(uuid, is_enabled(request, 'include_descendants'))
+            items = filter_by_attributes(items, parse_attribute_filters(request))
+            items = self.read_serializer_class.values(items)
+            stream_format = get_stream_format(request)
+            if stream_format:
+                return stream_queryset(items, self.read_serializer_class, stream_format)
+            paginator = self.pagination_class()
+            paginated_items = paginator.paginate_queryset(items, request, view=self)
+            if paginated_items is not None:
+                serializer = self.read_serializer_class(paginated_items, many=True)
+                return paginator.get_paginated_response(serializer.data)
+            serializer = self.read_serializer_class(items, many=True)
             return Response(serializer.data)
         except Item.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
         
-class AllItemsView(APIView):
+class AllItemsView(CachedResponseMixin, APIView):
     """
     A view to list all items.
     """
     serializer_class = ItemSerializer
+    read_serializer_class = ItemReadSerializer
     permission_classes = [AllowAny]
+    replica_reads = True
+    pagination_class = KeysetPagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+
+    @extend_schema(parameters=attribute_parameters + keyset_parameters)
     def get(self, request):
         """
-        Retrieve a list of all items.
+        Retrieve a list of all items, keyset paginated when `cursor` or `page_size` is given
+        or streamed with `stream=1` / NDJSON.
+
+        Example:
+        http://localhost:8000/items?page_size=100&ordering=-price
         """
-        items = Item.objects.all()
-        serializer = self.serializer_class(items, many=True)
+        items = filter_by_attributes(Item.objects.all(), parse_attribute_filters(request))
+        items = self.read_serializer_class.values(items)
+        stream_format = get_stream_format(request)
+        if stream_format:
+            return stream_queryset(items, self.read_serializer_class, stream_format)
+        paginator = self.pagination_class()
+        paginated_items = paginator.paginate_queryset(items, request, view=self)
+        if paginated_items is not None:
+            serializer = self.read_serializer_class(paginated_items, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        serializer = self.read_serializer_class(items, many=True)
         return Response(serializer.data)
     
-class AllCategoriesView(APIView):
+class ItemFacetsView(CachedResponseMixin, APIView):
+    """
+    A view to count attribute values over the items matching the list filters.
+    """
+    permission_classes = [AllowAny]
+    replica_reads = True
+
+    def get_cache_versions(self, request, *args, **kwargs):
+        if 'uuid' in kwargs:
+            return ['tree', 'category:%s' % kwargs['uuid']]
+        return ['catalog']
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="include_descendants", type=OpenApiTypes.BOOL, description='Include items of all subcategories (category facets only).', required=False),
+            *attribute_parameters,
+        ],
+    )
+    def get(self, request, uuid=None):
+        """
+        Retrieve facet counts for all items or the items of a category, narrowed by the same
+        `attr` filters as the item lists.
+
+        Example:
+        http://localhost:8000/items/category/<uuid>/facets?include_descendants=1&attr=color:red
+        """
+        if uuid is None:
+            items = Item.objects.all()
+        else:
+            items = category_items(uuid, is_enabled(request, 'include_descendants'))
+        items = filter_by_attributes(items, parse_attribute_filters(request))
+        return Response(facet_counts(items))
+
+class ItemSearchView(CachedResponseMixin, APIView):
+    """
+    A view to search items by name, description and attribute values.
+    """
+    read_serializer_class = ItemReadSerializer
+    permission_classes = [AllowAny]
+    replica_reads = True
+    pagination_class = StandardResultsSetPagination
+    autocomplete_limit = 10
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="q", type=OpenApiTypes.STR, description='Search terms.', required=True),
+            OpenApiParameter(name="mode", type=OpenApiTypes.STR, enum=['autocomplete'], description='Prefix-match the last term and return item names only.', required=False),
+            OpenApiParameter(name="page_size", type=OpenApiTypes.INT, description='Page Size for pagination.', required=False),
+            OpenApiParameter(name="page", type=OpenApiTypes.INT, description='Page number for pagination.', required=False),
+        ],
+    )
+    def get(self, request):
+        """
+        Retrieve items matching all search terms, best ranked first and paginated.
+        With `mode=autocomplete` the last term is a prefix and the best
+        matching item names are returned.
+
+        Example:
+        http://localhost:8000/items/search?q=wireless+speaker&page=2
+        http://localhost:8000/items/search?q=wireless+spea&mode=autocomplete
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'q': ['This query parameter is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        backend = get_search_backend()
+
+        if request.query_params.get('mode') == 'autocomplete':
+            suggestions = backend.autocomplete(text, self.autocomplete_limit)
+            return Response([{'uuid': uuid, 'name': name} for uuid, name in suggestions])
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(backend.search(text), request, view=self)
+        rows = {row.uuid: row for row in self.read_serializer_class.values(Item.objects.filter(uuid__in=page))}
+        serializer = self.read_serializer_class([rows[uuid] for uuid in page if uuid in rows], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+class AllCategoriesView(CachedResponseMixin, APIView):
     """
     A view to list all categories.
     """
     serializer_class = CategorySerializer
+    read_serializer_class = CategoryReadSerializer
+    tree_serializer_class = CategoryTreeSerializer
     permission_classes = [AllowAny]
+    replica_reads = True
+
+    def get_cache_versions(self, request, *args, **kwargs):
+        # Only category writes change the list; item writes leave it cached.
+        return ['tree']
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="tree", type=OpenApiTypes.BOOL, description='Return the categories as a nested tree.', required=False),
+        ],
+    )
     def get(self, request):
         """
-        Retrieve a list of all categories.
+        Retrieve a list of all categories, or the whole hierarchy nested with `tree=1`.
+        Either way the categories are read in a single query.
+
+        Example:
+        http://localhost:8000/items/categories?tree=1
         """
+        if is_enabled(request, 'tree'):
+            serializer = self.tree_serializer_class(Category.objects.order_by('name'))
+            return Response(serializer.data)
         items = Category.objects.all()
-        serializer = self.serializer_class(items, many=True)
+        serializer = self.read_serializer_class(items, many=True)
         return Response(serializer.data)
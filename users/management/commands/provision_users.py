@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from users.provisioning import FORMATS, import_file
+
+
+class Command(BaseCommand):
+    help = 'Create users from a CSV or JSONL file, hashing their passwords on a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension (.csv, otherwise jsonl).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--celery', action='store_true', help='Run the import in a ProvisionUsers task; the file must be readable by the workers.')
+
+    def handle(self, *args, **options):
+        if options['celery']:
+            from core.tasks import provision_users_task
+            result = provision_users_task.delay(options['path'], options['format'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Queued ProvisionUsers task {result.id}'))
+            return
+
+        def progress(stats):
+            self.stdout.write(f"{stats['rows']} rows, {stats['rejected']} rejected", ending='\r')
+
+        stats = import_file(options['path'], options['format'], options['batch_size'], progress)
+        self.stdout.write('')
+        for error in stats['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {stats['created']} of {stats['rows']} users, {stats['rejected']} rejected "
+            f"in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)"
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:51
+
+import utils.uuids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='address',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='uuid',
+            field=models.UUIDField(default=utils.uuids.new_uuid, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+    ]
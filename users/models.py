@@ -1,6 +1,6 @@
-import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from utils.uuids import new_uuid
 
 gender_choices = (
     ('M', 'Male'),
@@ -8,7 +8,7 @@ gender_choices = (
 )
 
 class Address(models.Model):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
     country = models.CharField(max_length=100)
     city = models.CharField(max_length=100)
     street = models.CharField(max_length=100)
@@ -23,7 +23,7 @@ class Address(models.Model):
         return f"{self.street} {self.house_number}, {self.postal_code} {self.city}"
 
 class UserProfile(models.Model):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
     # profile
     gender = models.CharField(max_length=1, choices=gender_choices, null=True, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
@@ -36,7 +36,7 @@ class UserProfile(models.Model):
         verbose_name_plural = "User profiles"
     
 class User(AbstractUser):
-    uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    uuid = models.UUIDField(primary_key=True, default=new_uuid, editable=False, unique=True)
     password = models.CharField(max_length=128, blank=False)
     email_verified = models.BooleanField(default=False)
     profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='user_profile', null=True, blank=True, to_field='uuid')
@@ -0,0 +1,122 @@
+import csv
+import json
+import time
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from utils.hashing import hash_passwords
+from .models import User
+
+FORMATS = ('csv', 'jsonl')
+USER_FIELDS = ['username', 'email', 'first_name', 'last_name', 'password']
+MAX_REPORTED_ERRORS = 100
+
+
+class InvalidRow:
+    """
+    Placeholder for a line that could not be parsed, rejected on import.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+
+def guess_format(path):
+    return 'csv' if str(path).endswith('.csv') else 'jsonl'
+
+
+def read_rows(stream, format):
+    """
+    Yield rows as {username, email, first_name, last_name, password}.
+    """
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {field: row.get(field) for field in USER_FIELDS}
+    else:
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield InvalidRow(f'Invalid JSON: {e}')
+
+
+class UserProvisioner:
+    """
+    Create users from rows in batches.
+
+    Each batch is validated in one pass, with a single query for usernames
+    that are taken, its passwords are hashed in parallel on the hashing
+    process pool (utils.hashing) and the users are inserted with one
+    bulk_create. Rows without a password get an unusable one. Existing users
+    are never updated; their rows are rejected.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.fields = {name: User._meta.get_field(name) for name in ('username', 'email', 'first_name', 'last_name')}
+        self.stats = {'rows': 0, 'created': 0, 'rejected': 0, 'errors': []}
+
+    def reject(self, line, message):
+        self.stats['rejected'] += 1
+        if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+            self.stats['errors'].append({'line': line, 'error': message})
+
+    def build_user(self, row):
+        if isinstance(row, InvalidRow):
+            raise ValidationError(row.message)
+        if not isinstance(row, dict):
+            raise ValidationError('Expected an object.')
+        values = {name: field.clean(row.get(name) or '', None) for name, field in self.fields.items()}
+        return User(**values), row.get('password') or None
+
+    def import_rows(self, rows, progress=None):
+        start = time.perf_counter()
+        rows = enumerate(rows, start=1)
+        while batch := list(islice(rows, self.batch_size)):
+            self.import_batch(batch)
+            if progress:
+                progress(self.stats)
+        self.stats['seconds'] = time.perf_counter() - start
+        self.stats['rows_per_second'] = self.stats['rows'] / self.stats['seconds'] if self.stats['seconds'] else 0
+        return self.stats
+
+    def import_batch(self, batch):
+        users = {}
+        for line, row in batch:
+            self.stats['rows'] += 1
+            try:
+                user, password = self.build_user(row)
+            except (ValidationError, ValueError) as e:
+                self.reject(line, '; '.join(e.messages) if isinstance(e, ValidationError) else str(e))
+                continue
+            if user.username in users:
+                self.reject(line, f'Duplicate username {user.username!r} in the batch.')
+                continue
+            users[user.username] = line, user, password
+
+        for username in User.objects.filter(username__in=list(users)).values_list('username', flat=True):
+            line, _, _ = users.pop(username)
+            self.reject(line, f'A user with username {username!r} already exists.')
+
+        passwords = [password for _, _, password in users.values() if password is not None]
+        hashes = iter(hash_passwords(passwords))
+        for _, user, password in users.values():
+            user.password = next(hashes) if password is not None else make_password(None)
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user, _ in users.values()])
+        except IntegrityError as e:
+            # A username taken since the check above; the batch is all or nothing.
+            for line, _, _ in users.values():
+                self.reject(line, f'Batch not created: {e}')
+            return
+        self.stats['created'] += len(users)
+
+
+def import_file(path, format=None, batch_size=1000, progress=None):
+    format = format or guess_format(path)
+    with open(path, newline='', encoding='utf-8') as stream:
+        return UserProvisioner(batch_size).import_rows(read_rows(stream, format), progress)
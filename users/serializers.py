@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from .models import User
+from .models import Address, User, UserProfile
 from django.contrib.auth.hashers import check_password
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from utils.authentication import PooledPasswordBackend
 
 class UserGetListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,7 +19,45 @@ class UserPostSerializer(serializers.Serializer):
     first_name = serializers.CharField(required=False, default='')
     last_name = serializers.CharField(required=False, default='')
 
+class UserBulkPostSerializer(serializers.Serializer):
+    """
+    Request body of the bulk create; rows are validated by users.provisioning.
+    """
+    users = UserPostSerializer(many=True)
+
+class AddressSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Address
+        fields = ['uuid', 'country', 'city', 'street', 'house_number', 'postal_code']
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    """
+    A profile with its address as a UUID, or nested with `expand_address`.
+    """
+    def __init__(self, *args, expand_address=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand_address:
+            self.fields['address'] = AddressSerializer(read_only=True, allow_null=True)
+
+    class Meta:
+        model = UserProfile
+        fields = ['uuid', 'gender', 'date_of_birth', 'address', 'phone_number']
+
+# Relations UserGetSerializer can nest, in the order they are joined.
+USER_EXPANSIONS = ('profile', 'address')
+
 class UserGetSerializer(serializers.ModelSerializer):
+    """
+    A user with the profile as a UUID, or nested when `expand` holds
+    'profile' and, with 'address', the profile's address nested in it too.
+    Select the expanded relations (see users.views.expanded_users) to keep it
+    to one query.
+    """
+    def __init__(self, *args, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'profile' in expand or 'address' in expand:
+            self.fields['profile'] = UserProfileSerializer(read_only=True, allow_null=True, expand_address='address' in expand)
+
     class Meta:
         model = User
         fields = ['uuid', 'username', 'email', 'first_name', 'last_name', 'email_verified', 'profile']
@@ -33,9 +75,21 @@ class UserPatchSerializer(serializers.ModelSerializer):
         fields = ['uuid', 'username', 'email', 'first_name', 'last_name', 'email_verified', 'profile']
         read_only_fields = ['uuid']
 
-class AuthSerializer(serializers.Serializer):
-    username = serializers.CharField()
-    password = serializers.CharField()
+class AuthSerializer(AuthTokenSerializer):
+    session = serializers.BooleanField(default=True, help_text='Also log in a Django session; API clients that only use the token can skip it.')
+
+    def validate(self, attrs):
+        """
+        AuthTokenSerializer.validate with the password checked on the hashing
+        pool; raises HashingBusy when the pool is saturated.
+        """
+        user = PooledPasswordBackend().authenticate(self.context.get('request'), username=attrs['username'], password=attrs['password'])
+        if not user:
+            raise serializers.ValidationError(_('Unable to log in with provided credentials.'), code='authorization')
+        # Sessions resolve their user through the configured backend.
+        user.backend = settings.AUTHENTICATION_BACKENDS[0]
+        attrs['user'] = user
+        return attrs
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
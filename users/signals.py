@@ -0,0 +1,47 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from knox.models import AuthToken
+from utils.authentication import forget_token
+from utils.permissions import invalidate_group_names
+from .models import User
+
+
+def invalidate_on_commit(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_group_names(user_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop cached group names of every user whose memberships changed, from
+    either side of the relation (user.groups or group.user_set).
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_on_commit([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_on_commit(pk_set)
+    elif action == 'pre_clear':
+        invalidate_on_commit(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_members(sender, instance, **kwargs):
+    # Renaming or deleting a group changes the names of all its members.
+    if instance.pk:
+        invalidate_on_commit(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=AuthToken)
+def revoke_cached_token(sender, instance, **kwargs):
+    """
+    Forget a deleted token right away, and again on commit in case a
+    concurrent request cached it from the still uncommitted row.
+    """
+    forget_token(instance.digest)
+    transaction.on_commit(lambda: forget_token(instance.digest))
@@ -0,0 +1,383 @@
+import contextlib
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+from utils import hashing
+from utils.authentication import get_token_store
+from utils.hashing import HashingBusy, get_hashing_executor, hash_passwords
+from utils.permissions import get_group_names
+from utils.testing import QueryPlanMixin, analyze
+from utils.throttle import LoginThrottle
+from .models import Address, User, UserProfile
+
+SEEDED_USERS = 20000
+
+
+@override_settings(COUNT_ESTIMATES={'ALIAS': 'shared', 'THRESHOLD': 10000, 'TIMEOUT': 60})
+@skipUnless(connection.vendor == 'postgresql', 'Plans and counts are those of PostgreSQL.')
+class UserQueryPlanTests(QueryPlanMixin, TestCase):
+    """
+    Query budgets and plans of the user endpoints over 20,000 seeded users.
+    Every request also reads the IT group membership of the caller.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='admin')
+        cls.admin.groups.add(Group.objects.create(name='IT'))
+        User.objects.bulk_create(
+            (User(username='user%05d' % i, email='user%05d@example.com' % i, password='!') for i in range(SEEDED_USERS)),
+            batch_size=5000,
+        )
+        analyze()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_user_page(self):
+        # Estimated count, page.
+        with self.assertQueryPlan(max_queries=3):
+            response = self.client.get('/users?page=2&page_size=20')
+        self.assertTrue(response.json()['count_is_estimate'])
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_user_keyset_pages(self):
+        next_link = self.client.get('/users?pagination=keyset&page_size=20').json()['next']
+        with self.assertQueryPlan(max_queries=2):
+            response = self.client.get(next_link)
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_user_keyset_descending(self):
+        with self.assertQueryPlan(max_queries=2):
+            response = self.client.get('/users?pagination=keyset&ordering=-username')
+        self.assertEqual(response.json()['results'][0]['username'], 'user%05d' % (SEEDED_USERS - 1))
+
+    def test_user_detail(self):
+        user = User.objects.get(username='user00042')
+        with self.assertQueryPlan(max_queries=2):
+            response = self.client.get(f'/users/{user.pk}')
+        self.assertEqual(response.json()['username'], 'user00042')
+
+    def test_user_detail_expanded(self):
+        address = Address.objects.create(country='PL', city='Kraków', street='Długa', house_number='1', postal_code='31-000')
+        user = User.objects.create(username='expanded', profile=UserProfile.objects.create(address=address))
+        with self.assertQueryPlan(max_queries=2):
+            response = self.client.get(f'/users/{user.pk}?expand=profile,address')
+        self.assertEqual(response.json()['profile']['address']['city'], 'Kraków')
+
+    def test_user_batch(self):
+        uuids = [str(pk) for pk in User.objects.order_by('-username').values_list('pk', flat=True)[:100]]
+        with self.assertQueryPlan(max_queries=2):
+            response = self.client.get('/users/batch?expand=profile&uuids=' + ','.join(uuids))
+        self.assertEqual([user['uuid'] for user in response.json()['results']], uuids)
+
+
+class UserBulkCreateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='admin')
+        self.admin.groups.add(Group.objects.create(name='IT'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_create(self):
+        rows = [{'username': 'bulk%d' % i, 'email': 'bulk%d@example.com' % i, 'password': 'secret%d' % i} for i in range(3)]
+        rows += [{'username': 'admin'}, {'username': 'bulk0'}, {'username': ''}, {'username': 'nopassword'}]
+        response = self.client.post('/users/bulk', {'users': rows}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['rejected']), (4, 3))
+        self.assertEqual([error['line'] for error in response.json()['errors']], [5, 6, 4])
+        self.assertTrue(User.objects.get(username='bulk2').check_password('secret2'))
+        self.assertFalse(User.objects.get(username='nopassword').has_usable_password())
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+
+    def login(self, now):
+        with mock.patch.object(LoginThrottle, 'timer', return_value=now):
+            return self.client.post('/users/login', {'username': 'nobody', 'password': 'wrong'})
+
+    def test_sliding_window(self):
+        # 5/minute: five attempts late in one window, then the weighted count
+        # lets one more through once a fifth of the next window has passed.
+        start = 60 * 1000
+        for second in range(55, 60):
+            self.assertEqual(self.login(start + second).status_code, 401)
+        response = self.login(start + 60 + 1)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '11')
+        self.assertEqual(self.login(start + 60 + 1 + 11).status_code, 401)
+        self.assertEqual(self.login(start + 60 + 1 + 11).status_code, 429)
+
+
+class LoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='login', password='secret')
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_login(self):
+        response = self.client.post('/users/login', {'username': 'login', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json())
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(self.client.post('/users/login', {'username': 'login', 'password': 'wrong'}).status_code, 401)
+        self.assertEqual(self.client.post('/users/login', {'username': 'nobody', 'password': 'secret'}).status_code, 401)
+
+    def test_login_without_session(self):
+        response = self.client.post('/users/login', {'username': 'login', 'password': 'secret', 'session': False})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json())
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_login_when_hashing_is_busy(self):
+        with mock.patch('utils.authentication.verify_password', side_effect=HashingBusy):
+            response = self.client.post('/users/login', {'username': 'login', 'password': 'secret'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_other_logins_skip_the_pool(self):
+        with mock.patch('utils.authentication.verify_password', side_effect=HashingBusy):
+            self.assertEqual(authenticate(username='login', password='secret').username, 'login')
+            response = self.client.post('/admin/login/', {'username': 'login', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)  # Not staff: the form again.
+
+    def test_provisioning_leaves_login_pool_free(self):
+        with (
+            mock.patch('utils.hashing.ProcessPoolExecutor', side_effect=lambda **kwargs: mock.MagicMock()),
+            mock.patch.dict('utils.hashing._executors', clear=True),
+            override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'WORKERS': 2}),
+        ):
+            hash_passwords(['first', 'second'])
+            self.assertTrue(get_hashing_executor('provisioning').map.called)
+            self.assertIsNot(get_hashing_executor('login'), get_hashing_executor('provisioning'))
+
+
+class GroupCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='member', password='secret')
+        cls.group = Group.objects.create(name='IT')
+        cls.user.groups.add(cls.group)
+        cls.token = AuthToken.objects.create(cls.user)[1]
+
+    def setUp(self):
+        caches['shared'].clear()
+        get_token_store().clear()
+
+    def get(self):
+        return self.client.get(f'/users/{self.user.pk}', headers={'Authorization': f'Token {self.token}'})
+
+    def group_reads(self):
+        with CaptureQueriesContext(connection) as queries:
+            status_code = self.get().status_code
+        return status_code, len([query for query in queries if 'auth_group' in query['sql']])
+
+    def test_cached(self):
+        self.assertEqual(self.group_reads(), (200, 1))
+        self.assertEqual(self.group_reads(), (200, 0))
+
+    def test_membership_removed(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.group)
+        self.assertEqual(self.get().status_code, 403)
+
+    def test_membership_cleared_from_group(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.user_set.clear()
+        self.assertEqual(self.get().status_code, 403)
+
+    def test_group_renamed(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.name = 'Former IT'
+            self.group.save()
+        self.assertEqual(self.get().status_code, 403)
+
+    def test_membership_added(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+        self.assertEqual(self.get().status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.user_set.add(self.user)
+        self.assertEqual(self.get().status_code, 200)
+
+
+class TokenCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='member', password='secret')
+        cls.user.groups.add(Group.objects.create(name='IT'))
+
+    def setUp(self):
+        caches['shared'].clear()
+        get_token_store().clear()
+        self.auth_token, self.token = AuthToken.objects.create(self.user)
+
+    def get(self, token=None):
+        return self.client.get('/users', headers={'Authorization': f'Token {token or self.token}'})
+
+    def token_reads(self):
+        with CaptureQueriesContext(connection) as queries:
+            status_code = self.get().status_code
+        return status_code, len([query for query in queries if 'knox_authtoken' in query['sql']])
+
+    def test_cached(self):
+        self.assertEqual(self.token_reads()[0], 200)
+        self.assertEqual(self.token_reads(), (200, 0))
+
+    def test_invalid_token(self):
+        self.assertEqual(self.get('0' * len(self.token)).status_code, 401)
+
+    def test_token_deleted(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auth_token.delete()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_all_tokens_deleted(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            AuthToken.objects.filter(user=self.user).delete()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_user_deleted(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_expired(self):
+        self.assertEqual(self.get().status_code, 200)
+        with mock.patch('utils.authentication.timezone.now', return_value=timezone.now() + timedelta(days=1)):
+            self.assertEqual(self.get().status_code, 401)
+
+
+class UserListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='admin')
+        cls.admin.groups.add(Group.objects.create(name='IT'))
+        User.objects.bulk_create(User(username='user%d' % i, password='!') for i in range(6))
+        cls.usernames = sorted(User.objects.values_list('username', flat=True))
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_keyset_pages(self):
+        for ordering, expected in (('username', self.usernames), ('-username', self.usernames[::-1])):
+            usernames, url = [], f'/users?pagination=keyset&page_size=3&ordering={ordering}'
+            while url:
+                body = self.client.get(url).json()
+                usernames += [user['username'] for user in body['results']]
+                url = body['next']
+            self.assertEqual(usernames, expected, ordering)
+        self.assertEqual(self.client.get('/users?cursor=garbage').status_code, 404)
+
+    def test_exact_count(self):
+        body = self.client.get('/users?page_size=3&page=3').json()
+        self.assertEqual((body['count'], body['total_pages'], body['count_is_estimate'], body['next']), (7, 3, False, None))
+        self.assertEqual(self.client.get('/users?page_size=3&page=4').status_code, 404)
+
+    @override_settings(COUNT_ESTIMATES={'ALIAS': 'shared', 'THRESHOLD': 5, 'TIMEOUT': 60})
+    def test_cached_count(self):
+        self.assertEqual(self.client.get('/users?page_size=3').json()['count'], 7)
+        User.objects.bulk_create(User(username='late%d' % i, password='!') for i in range(3))
+        body = self.client.get('/users?page_size=3&page=3').json()
+        # The cached count is served and marked as an estimate, while pages
+        # past it still resolve and the next links stay exact.
+        self.assertEqual((body['count'], body['count_is_estimate']), (7, True))
+        self.assertIsNotNone(body['next'])
+        self.assertEqual(len(self.client.get('/users?page_size=3&page=4').json()['results']), 1)
+
+
+@override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'WORKERS': 1})
+class HashingPoolTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict('utils.hashing._executors', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: [executor.shutdown() for executor in hashing._executors.values()])
+        self.encoded = make_password('secret')
+
+    def kill_workers(self, purpose):
+        executor = hashing.get_hashing_executor(purpose)
+        for process in list(executor._processes.values()):
+            process.kill()
+            process.join()
+
+    def test_login_pool_replaced_after_a_worker_died(self):
+        self.assertEqual(hashing.verify_password('secret', self.encoded), (True, None))
+        self.kill_workers('login')
+        with contextlib.suppress(HashingBusy):
+            hashing.verify_password('secret', self.encoded)  # May find the pool broken mid-check.
+        self.assertEqual(hashing.verify_password('secret', self.encoded), (True, None))
+
+    def test_provisioning_pool_replaced_after_a_worker_died(self):
+        with override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'WORKERS': 2}):
+            hash_passwords(['first', 'second'])
+            self.kill_workers('provisioning')
+            hashes = hash_passwords(['first', 'second'])
+        self.assertTrue(check_password('second', hashes[1]))
+
+
+class UserDetailAndBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='admin')
+        cls.admin.groups.add(Group.objects.create(name='IT'))
+        cls.address = Address.objects.create(country='PL', city='Kraków', street='Długa', house_number='1', postal_code='31-000')
+        cls.profile = UserProfile.objects.create(address=cls.address, phone_number='123')
+        cls.user = User.objects.create(username='expanded', profile=cls.profile)
+        cls.bare = User.objects.create(username='bare')
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        get_group_names(self.admin)  # Leave only the users' queries to count.
+
+    def test_expand(self):
+        address = {'uuid': str(self.address.pk), 'country': 'PL', 'city': 'Kraków', 'street': 'Długa', 'house_number': '1', 'postal_code': '31-000'}
+        profile = {'uuid': str(self.profile.pk), 'gender': None, 'date_of_birth': None, 'address': str(self.address.pk), 'phone_number': '123'}
+        for expand, expected in (('', str(self.profile.pk)), ('profile', profile), ('address', {**profile, 'address': address}), ('profile,address', {**profile, 'address': address})):
+            with self.assertNumQueries(1):
+                response = self.client.get(f'/users/{self.user.pk}?expand={expand}')
+            self.assertEqual(response.json()['profile'], expected, expand)
+        self.assertIsNone(self.client.get(f'/users/{self.bare.pk}?expand=address').json()['profile'])
+        self.assertEqual(self.client.get(f'/users/{self.user.pk}?expand=groups').status_code, 400)
+
+    def test_batch(self):
+        missing = '00000000-0000-7000-8000-000000000000'
+        uuids = [str(self.bare.pk), missing, str(self.user.pk), str(self.bare.pk)]
+        with self.assertNumQueries(1):
+            body = self.client.get('/users/batch?expand=profile&uuids=' + ','.join(uuids)).json()
+        self.assertEqual([user['username'] for user in body['results']], ['bare', 'expanded'])
+        self.assertEqual(body['results'][1]['profile']['address'], str(self.address.pk))
+        self.assertEqual(body['missing'], [missing])
+
+    def test_batch_limits(self):
+        uuids = [str(self.user.pk)] * 100
+        self.assertEqual(self.client.get('/users/batch?uuids=' + ','.join(uuids)).status_code, 200)
+        many = ','.join('00000000-0000-7000-8000-%012d' % i for i in range(101))
+        for query_string in ('uuids=' + many, 'uuids=', 'uuids=not-a-uuid', ''):
+            self.assertEqual(self.client.get('/users/batch?' + query_string).status_code, 400, query_string[:20])
@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import UserDetailView, UserListView, LoginAPIView, ChangePasswordAPIView
+from .views import UserBatchView, UserBulkView, UserDetailView, UserListView, LoginAPIView, ChangePasswordAPIView
 
 urlpatterns = [
     path('/login', LoginAPIView.as_view(), name='login'),
     path('', UserListView.as_view(), name='user-list'),
+    path('/batch', UserBatchView.as_view(), name='user-batch'),
+    path('/bulk', UserBulkView.as_view(), name='user-bulk'),
     path('/<uuid:uuid>', UserDetailView.as_view(), name='user-detail'),
     path('/change-password', ChangePasswordAPIView.as_view(), name='change-password'),
 ]
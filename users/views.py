@@ -1,19 +1,46 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from uuid import UUID
 from .models import User
-from .serializers import AuthSerializer, UserGetListSerializer, UserGetSerializer, UserPatchSerializer, UserPostSerializer, ChangePasswordSerializer
+from rest_framework.exceptions import ValidationError
+from .serializers import AuthSerializer, UserBulkPostSerializer, UserGetListSerializer, UserGetSerializer, UserPatchSerializer, UserPostSerializer, ChangePasswordSerializer, USER_EXPANSIONS
+from .provisioning import UserProvisioner
 from utils.permissions import HasGroupPermission
 from rest_framework.permissions import AllowAny
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-from utils.paginators import SmallResultsSetPagination
+from utils.paginators import EstimatedCountPagination, UserKeysetPagination
 from knox.views import LoginView as KnoxLoginView
-from rest_framework.authtoken.serializers import AuthTokenSerializer
 from django.contrib.auth import login
+from utils.hashing import HashingBusy
 from utils.throttle import LoginThrottle
 
 from utils.scheme import KnoxTokenScheme
+
+expand_parameter = OpenApiParameter(
+    name="expand", type=OpenApiTypes.STR, description='Comma-separated relations to nest: `profile`, `address` (the profile\'s, implies `profile`).', required=False,
+)
+
+
+def get_expansions(request):
+    expand = {name.strip() for name in request.query_params.get('expand', '').split(',') if name.strip()}
+    unknown = expand.difference(USER_EXPANSIONS)
+    if unknown:
+        raise ValidationError({'expand': ['Unknown relation(s): %s.' % ', '.join(sorted(unknown))]})
+    return expand
+
+
+def expanded_users(expand):
+    """
+    Users joined to the relations UserGetSerializer nests for `expand`.
+    """
+    if 'address' in expand:
+        return User.objects.select_related('profile__address')
+    if 'profile' in expand:
+        return User.objects.select_related('profile')
+    return User.objects.all()
+
 class LoginAPIView(KnoxLoginView):
     """
     A view to handle user authentication and token generation.
@@ -29,13 +56,26 @@ class LoginAPIView(KnoxLoginView):
         Required parameters in the request:
         - username: The username of the user (string).
         - password: The password of the user (string).
+
+        Optional parameters in the request:
+        - session: Whether to also log in a Django session (boolean, default true).
+
+        Passwords are checked on the hashing pool; when it is saturated the
+        response is 503 with Retry-After.
         """
-        serializer = AuthTokenSerializer(data=request.data)
-        if not serializer.is_valid():
+        serializer = AuthSerializer(data=request.data, context={'request': request})
+        try:
+            valid = serializer.is_valid()
+        except HashingBusy:
+            return Response({'error': 'Too many logins in progress, retry shortly'}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+        if not valid:
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         
         user = serializer.validated_data['user']
-        login(request, user)
+        if serializer.validated_data['session']:
+            login(request, user)
+        else:
+            request.user = user
         return super(LoginAPIView, self).post(request, format=None)
 
 class UserListView(APIView):
@@ -44,24 +84,36 @@ class UserListView(APIView):
     """
     permission_classes = [HasGroupPermission]
     required_groups = ['IT']
-    pagination_class = SmallResultsSetPagination
+    pagination_class = EstimatedCountPagination
+    keyset_pagination_class = UserKeysetPagination
+    replica_reads = True
 
     @extend_schema(
         parameters=[
             OpenApiParameter(name="page_size", type=OpenApiTypes.INT, description='Page Size for pagination.', required=False),
             OpenApiParameter(name="page", type=OpenApiTypes.INT, description='Page number for pagination.', required=False),
+            OpenApiParameter(name="pagination", type=OpenApiTypes.STR, enum=['keyset'], description='Use keyset pages on (username, uuid) with next/previous cursors instead of page numbers.', required=False),
+            OpenApiParameter(name="cursor", type=OpenApiTypes.STR, description='Opaque cursor taken from the next/previous link of a keyset page.', required=False),
+            OpenApiParameter(name="ordering", type=OpenApiTypes.STR, enum=UserKeysetPagination.orderings, description='Ordering of keyset pages.', required=False),
         ],
     )
     def get(self, request):
         """
         Get a list of paginated users.
 
+        Page numbers report an estimated count on large tables; keyset pages
+        cost the same at any depth.
+
         Example:
         http://localhost:8000/users?page=2&page_size=20
+        http://localhost:8000/users?pagination=keyset&page_size=20
         """
         users = User.objects.all().order_by('username')
 
-        paginator = self.pagination_class()
+        if request.query_params.get('pagination') == 'keyset' or 'cursor' in request.query_params:
+            paginator = self.keyset_pagination_class()
+        else:
+            paginator = self.pagination_class()
         paginated_users = paginator.paginate_queryset(users, request)
 
         serializer = UserGetListSerializer(paginated_users, many=True)
@@ -92,30 +144,36 @@ class UserDetailView(APIView):
     permission_classes = [HasGroupPermission]
     required_groups = ['IT']
 
-    def get_object(self, uuid):
+    def get_object(self, uuid, expand=()):
         """
         Retrieve an user object by its UUID.
 
         parameters:
          - uuid: The UUID of the user to retrieve (string).
+         - expand: Relations to fetch in the same query (see get_expansions).
 
         return: User object if found, None otherwise.
         """
         try:
-            return User.objects.get(uuid=uuid)
+            return expanded_users(expand).get(uuid=uuid)
         except User.DoesNotExist:
             return None
 
+    @extend_schema(parameters=[expand_parameter])
     def get(self, request, uuid):
         """
         Retrieve details of an user by UUID.
 
         Required parameter in the URL:
         - uuid: The UUID of the user to retrieve (string).
+
+        Example:
+        http://localhost:8000/users/<uuid>?expand=profile,address
         """
-        user = self.get_object(uuid)
+        expand = get_expansions(request)
+        user = self.get_object(uuid, expand)
         if user:
-            serializer = UserGetSerializer(user)
+            serializer = UserGetSerializer(user, expand=expand)
             return Response(serializer.data)
         return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -154,6 +212,68 @@ class UserDetailView(APIView):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_404_NOT_FOUND)
     
+class UserBatchView(APIView):
+    """
+    A view to retrieve many users by UUID in one query.
+    """
+    permission_classes = [HasGroupPermission]
+    required_groups = ['IT']
+    replica_reads = True
+    max_batch_size = 100
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="uuids", type=OpenApiTypes.STR, description='Comma-separated user UUIDs, at most 100.', required=True),
+            expand_parameter,
+        ],
+    )
+    def get(self, request):
+        """
+        Retrieve the users of the given UUIDs in the order given; UUIDs without
+        a user are listed in `missing`.
+
+        Example:
+        http://localhost:8000/users/batch?uuids=<uuid>,<uuid>&expand=profile
+        """
+        expand = get_expansions(request)
+        try:
+            uuids = list(dict.fromkeys(UUID(value.strip()) for value in request.query_params.get('uuids', '').split(',') if value.strip()))
+        except ValueError:
+            return Response({'uuids': ['Expected comma-separated UUIDs.']}, status=status.HTTP_400_BAD_REQUEST)
+        if not uuids or len(uuids) > self.max_batch_size:
+            return Response({'uuids': [f'Expected 1 to {self.max_batch_size} UUIDs.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = expanded_users(expand).in_bulk(uuids)
+        serializer = UserGetSerializer([users[uuid] for uuid in uuids if uuid in users], many=True, expand=expand)
+        return Response({'results': serializer.data, 'missing': [uuid for uuid in uuids if uuid not in users]})
+
+class UserBulkView(APIView):
+    """
+    A view to create many users in one request.
+    """
+    permission_classes = [HasGroupPermission]
+    required_groups = ['IT']
+    max_batch_size = 1000
+
+    @extend_schema(request=UserBulkPostSerializer)
+    def post(self, request):
+        """
+        Create up to 1000 users. Valid rows are created even if others are
+        rejected; the response reports the counts and the rejected rows by
+        their 1-based position. Larger imports belong to the provision_users
+        command.
+
+        Parameters of each user are those of creating a single user; users
+        without a password cannot log in until one is set.
+        """
+        rows = request.data.get('users') if isinstance(request.data, dict) else None
+        if not isinstance(rows, list) or not rows or len(rows) > self.max_batch_size:
+            return Response({'users': [f'Expected a list of 1 to {self.max_batch_size} users.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = UserProvisioner(batch_size=self.max_batch_size).import_rows(rows)
+        return Response(stats, status=status.HTTP_201_CREATED if stats['created'] else status.HTTP_400_BAD_REQUEST)
+
+
 class ChangePasswordAPIView(APIView):
     """
     A view to handle changing user password.
@@ -0,0 +1,194 @@
+import binascii
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import router
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from knox.settings import knox_settings
+from rest_framework import exceptions
+from utils.hashing import verify_password
+from utils.metrics import counter
+
+token_requests = counter('token_cache_requests_total', 'Token authentications by result (hit, miss).')
+
+
+class LRUTokenStore:
+    """
+    Bounded in-process LRU with a deadline per entry and the get/set/delete
+    subset of the Django cache API.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, deadline = entry
+            if deadline <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_store = None
+
+
+def get_token_store():
+    """
+    Return the cache alias TOKEN_CACHE['ALIAS'] when set, shared by every
+    worker, otherwise an LRU local to this process.
+    """
+    global _store
+    if _store is None:
+        alias = settings.TOKEN_CACHE['ALIAS']
+        _store = caches[alias] if alias else LRUTokenStore(settings.TOKEN_CACHE['MAX_ENTRIES'])
+    return _store
+
+
+def token_cache_key(digest):
+    return 'token:%s' % digest
+
+
+def forget_token(digest):
+    get_token_store().delete(token_cache_key(digest))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    knox TokenAuthentication that remembers verified tokens.
+
+    A verified digest maps to (user id, token key, expiry) until the token
+    expires, capped at TOKEN_CACHE['TIMEOUT'] seconds. A hit costs the digest
+    and one user query instead of the token lookup, the digest compare and
+    knox's scan for expired tokens of the user. Expired entries, tokens due
+    for an AUTO_REFRESH renewal and misses go through the stock class.
+
+    users.signals forgets a token as soon as it is deleted (logout, logout
+    all, expiry cleanup, user deletion). Without a shared alias that only
+    reaches the cache of the process doing the delete, so multi-process
+    deployments should set TOKEN_CACHE['ALIAS'].
+    """
+
+    def authenticate_credentials(self, token):
+        try:
+            digest = hash_token(token.decode('utf-8'))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        store = get_token_store()
+        key = token_cache_key(digest)
+        entry = store.get(key)
+        if entry is not None:
+            user_id, token_key, expiry = entry
+            if (expiry is None or expiry > timezone.now()) and not self.needs_refresh(expiry):
+                user = get_user_model()._default_manager.filter(pk=user_id).first()
+                if user is None:
+                    store.delete(key)
+                    raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                token_requests.inc(result='hit')
+                auth_token = AuthToken.from_db(
+                    router.db_for_read(AuthToken),
+                    ['digest', 'token_key', 'user_id', 'expiry'],
+                    [digest, token_key, user_id, expiry],
+                )
+                auth_token.user = user
+                return self.validate_user(auth_token)
+            store.delete(key)
+
+        token_requests.inc(result='miss')
+        user, auth_token = super().authenticate_credentials(token)
+        self.remember(auth_token)
+        return user, auth_token
+
+    def needs_refresh(self, expiry):
+        if not knox_settings.AUTO_REFRESH or expiry is None:
+            return False
+        new_expiry = timezone.now() + knox_settings.TOKEN_TTL
+        return (new_expiry - expiry).total_seconds() > knox_settings.MIN_REFRESH_INTERVAL
+
+    def remember(self, auth_token):
+        timeout = settings.TOKEN_CACHE['TIMEOUT']
+        if auth_token.expiry is not None:
+            timeout = min(timeout, (auth_token.expiry - timezone.now()).total_seconds())
+        if timeout > 0:
+            get_token_store().set(
+                token_cache_key(auth_token.digest),
+                (auth_token.user_id, auth_token.token_key, auth_token.expiry),
+                timeout,
+            )
+
+
+_unknown_user_password = None
+
+
+class PooledPasswordBackend(ModelBackend):
+    """
+    ModelBackend checking passwords on the hashing pool (utils.hashing), so
+    a burst of logins queues there instead of holding the GIL of the process
+    serving other requests.
+
+    Raises HashingBusy when the pool is saturated. Unknown usernames are
+    checked against a throwaway hash to keep their timing close to a wrong
+    password, and outdated hashes are upgraded on a successful check as
+    check_password() does.
+
+    Only the API login uses it (users.serializers.AuthSerializer), which
+    answers HashingBusy with 503. It is not in AUTHENTICATION_BACKENDS, so
+    the admin and other authenticate() callers keep ModelBackend and never
+    see HashingBusy.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        global _unknown_user_password
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            if _unknown_user_password is None:
+                _unknown_user_password = make_password(get_random_string(32))
+            verify_password(password, _unknown_user_password)
+            return
+        if not user.has_usable_password():
+            return
+        valid, new_password = verify_password(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return
+        if new_password:
+            user.password = new_password
+            user.save(update_fields=['password'])
+        return user
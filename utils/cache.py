@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from utils.metrics import counter
+from utils.transactions import on_commit_batched
+
+cache_requests = counter('response_cache_requests_total', 'Cached view lookups by result (hit, miss, not_modified).')
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE['ALIAS']]
+
+
+def get_versions(names):
+    """
+    Return the current version of every name. Missing versions start at the
+    current time so a counter evicted from the cache never reuses an old value.
+    """
+    cache = get_cache()
+    keys = ['version:%s' % name for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns())
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(names):
+    """
+    Invalidate every cached response depending on one of `names`, once the
+    current transaction commits. Bumps within one transaction are merged.
+    """
+    on_commit_batched(_bump_on_commit, names)
+
+
+def _bump(names):
+    cache = get_cache()
+    for name in names:
+        key = 'version:%s' % name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def _bump_on_commit(names):
+    _bump(names)
+    if settings.REPLICA_ROUTING['ALIASES']:
+        # A miss served by a replica that has not replayed the write yet
+        # caches stale content under the new version; bump again once
+        # replicas within the allowed lag have caught up.
+        timer = threading.Timer(settings.REPLICA_ROUTING['MAX_LAG'], _bump, [names])
+        timer.daemon = True
+        timer.start()
+
+
+class CachedResponseMixin:
+    """
+    Cache rendered JSON responses of an APIView per absolute URL and Accept
+    header.
+
+    Entries are keyed on the versions returned by `get_cache_versions`; bumping
+    one of them with `bump_versions` makes every dependent entry unreachable.
+    Responses carry an ETag and `If-None-Match` is answered with 304.
+
+    The lookup runs before authentication and permission checks, so only use
+    it on public views.
+    """
+    cached_headers = ('Content-Type', 'Vary', 'Allow')
+
+    def get_cache_versions(self, request, *args, **kwargs):
+        return ['catalog']
+
+    def get_cache_key(self, request, versions):
+        # Paginated bodies hold absolute next/previous links.
+        parts = [request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''), *map(str, versions)]
+        return 'response:%s' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        versions = get_versions(self.get_cache_versions(request, *args, **kwargs))
+        key = self.get_cache_key(request, versions)
+        entry = cache.get(key)
+        if entry is not None:
+            content, headers = entry
+            if self.etag_matches(request, headers['ETag']):
+                cache_requests.inc(result='not_modified')
+                return HttpResponseNotModified(headers={'ETag': headers['ETag']})
+            cache_requests.inc(result='hit')
+            return HttpResponse(content, headers=headers)
+
+        cache_requests.inc(result='miss')
+        response = super().dispatch(request, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if response.status_code != 200 or renderer is None or renderer.format != 'json':
+            return response
+        response.render()
+
+        response['ETag'] = '"%s"' % hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        headers = {name: response[name] for name in (*self.cached_headers, 'ETag') if response.has_header(name)}
+        cache.set(key, (response.content, headers), settings.RESPONSE_CACHE['TIMEOUT'])
+        if self.etag_matches(request, response['ETag']):
+            return HttpResponseNotModified(headers={'ETag': response['ETag']})
+        return response
+
+    @staticmethod
+    def etag_matches(request, etag):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from functools import partial
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import extensions
+from utils.metrics import counter, histogram
+
+pool_wait_seconds = histogram('db_pool_wait_seconds', 'Time spent getting a connection from the pool, by database alias.')
+pool_checkouts = counter('db_pool_checkouts_total', 'Pool checkouts by database alias and result (reused, opened).')
+pool_discards = counter('db_pool_discards_total', 'Connections closed instead of returned to the pool, by alias and reason.')
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections for one alias in one process.
+
+    `connect` opens a new connection when none is idle. Checkouts wait up to `timeout` seconds while `max_size` connections are in
+    use. Connections idle for more than `check_after` seconds are pinged
+    before being handed out and connections older than `max_lifetime` are
+    closed when returned.
+    """
+
+    def __init__(self, alias, max_size, timeout, max_lifetime, check_after):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.idle = []
+        self.size = 0
+        self.condition = threading.Condition()
+
+    def fill(self, connect, min_size):
+        for _ in range(min(min_size, self.max_size)):
+            now = time.monotonic()
+            with self.condition:
+                self.idle.append((connect(), now, now))
+                self.size += 1
+
+    def getconn(self, connect):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f'No connection of {self.alias!r} freed up within {self.timeout}s.')
+                    self.condition.wait(remaining)
+                if self.idle:
+                    entry = self.idle.pop()
+                else:
+                    self.size += 1
+                    entry = None
+            if entry is None:
+                try:
+                    now = time.monotonic()
+                    entry = connect(), now, now
+                except BaseException:
+                    self.release()
+                    raise
+                pool_checkouts.inc(alias=self.alias, result='opened')
+            elif not self.is_usable(entry):
+                self.discard(entry[0], 'unusable')
+                continue
+            else:
+                pool_checkouts.inc(alias=self.alias, result='reused')
+            pool_wait_seconds.observe(time.perf_counter() - start, alias=self.alias)
+            return entry
+
+    def is_usable(self, entry):
+        connection, created, returned = entry
+        if connection.closed:
+            return False
+        if time.monotonic() - returned < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def putconn(self, connection, created):
+        if connection.closed:
+            return self.discard(connection, 'closed')
+        if time.monotonic() - created > self.max_lifetime:
+            return self.discard(connection, 'lifetime')
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                return self.discard(connection, 'unusable')
+        with self.condition:
+            self.idle.append((connection, created, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection, reason):
+        pool_discards.inc(alias=self.alias, reason=reason)
+        try:
+            connection.close()
+        finally:
+            self.release()
+
+    def release(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection, created, returned in idle:
+            self.discard(connection, 'closed')
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_pools(alias):
+    """
+    Close the idle pooled connections of `alias` in this process.
+    """
+    for (pool_alias, pid, params), pool in list(_pools.items()):
+        if pool_alias == alias and pid == os.getpid():
+            pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database in use.
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The PostgreSQL backend for psycopg2 with a process-wide connection pool.
+
+    Closing a connection, as Django does at the end of every request and
+    Celery task with CONN_MAX_AGE = 0, returns it to the pool. Pool sizing
+    comes from the POOL key of the database settings:
+    MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_LIFETIME and CHECK_AFTER (seconds idle
+    before a connection is pinged on checkout).
+    """
+    creation_class = DatabaseCreation
+    pool_created = None
+    pool_key = None
+
+    def get_pool(self, key, connect):
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    config = self.settings_dict['POOL']
+                    pool = ConnectionPool(
+                        self.alias,
+                        config['MAX_SIZE'],
+                        config.get('TIMEOUT', 10),
+                        config.get('MAX_LIFETIME', 3600),
+                        config.get('CHECK_AFTER', 30),
+                    )
+                    pool.fill(connect, config.get('MIN_SIZE', 0))
+                    _pools[key] = pool
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connect = partial(super().get_new_connection, conn_params)
+        # Keyed on the parameters too: the test runner renames the database.
+        key = (self.alias, os.getpid(), repr(sorted(conn_params.items())))
+        connection, self.pool_created, _ = self.get_pool(key, connect).getconn(connect)
+        self.pool_key = key
+        # Set by the base class on real connects only.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel.READ_COMMITTED if isolation_level is None else IsolationLevel(isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.pool_key[1] != os.getpid():
+            # Inherited across a fork: the socket belongs to the parent, whose
+            # pool still counts it, so drop it without talking to the server.
+            return
+        with self.wrap_database_errors:
+            _pools[self.pool_key].putconn(self.connection, self.pool_created)
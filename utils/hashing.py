@@ -0,0 +1,148 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from utils.metrics import counter, histogram
+
+password_checks = counter('password_checks_total', 'Password checks by result (valid, invalid, busy).')
+password_check_seconds = histogram('password_check_seconds', 'Wall time of password checks, waiting for a hashing worker included.')
+
+_executors = {}
+_executor_lock = threading.Lock()
+_check_slots = None
+
+
+class HashingBusy(Exception):
+    """
+    Raised instead of queueing a password check behind PASSWORD_HASHING['MAX_QUEUE']
+    others, or when a check waited longer than PASSWORD_HASHING['TIMEOUT'].
+    """
+
+
+def setup_worker():
+    import django
+    django.setup()
+
+
+def get_hashing_executor(purpose='login'):
+    """
+    Return the process pool password hashes are computed in for `purpose`,
+    started on first use with PASSWORD_HASHING['WORKERS'] processes.
+
+    Logins and bulk provisioning get a pool each, so that a large bulk
+    request never queues logins behind its hashes until they time out.
+    Workers are spawned rather than forked: the web and Celery processes
+    that use them run threads, which a fork would copy mid-flight.
+    """
+    with _executor_lock:
+        if purpose not in _executors:
+            _executors[purpose] = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING['WORKERS'],
+                mp_context=get_context('spawn'),
+                initializer=setup_worker,
+            )
+    return _executors[purpose]
+
+
+def discard_hashing_executor(purpose, executor):
+    """
+    Forget a pool broken by a worker that died, so the next use of
+    `purpose` starts a new one instead of failing until a restart.
+    """
+    with _executor_lock:
+        if _executors.get(purpose) is executor:
+            del _executors[purpose]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit(purpose, fn, *args):
+    executor = get_hashing_executor(purpose)
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        discard_hashing_executor(purpose, executor)
+        return get_hashing_executor(purpose).submit(fn, *args)
+
+
+def hash_passwords(passwords):
+    """
+    Return make_password() of every password, computed across the provisioning
+    hashing pool, or in this process when there is nothing to parallelise.
+    """
+    passwords = list(passwords)
+    workers = settings.PASSWORD_HASHING['WORKERS']
+    if len(passwords) < 2 or workers < 2:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    for attempt in range(2):
+        executor = get_hashing_executor('provisioning')
+        try:
+            return list(executor.map(make_password, passwords, chunksize=chunksize))
+        except BrokenProcessPool:
+            # Hashing is idempotent: start over once on a new pool.
+            discard_hashing_executor('provisioning', executor)
+            if attempt:
+                raise
+
+
+def get_check_slots():
+    global _check_slots
+    with _executor_lock:
+        if _check_slots is None:
+            _check_slots = threading.BoundedSemaphore(settings.PASSWORD_HASHING['WORKERS'] + settings.PASSWORD_HASHING['MAX_QUEUE'])
+    return _check_slots
+
+
+def check_and_update(password, encoded):
+    """
+    Return whether `password` matches `encoded` and, if it does and the hash
+    is outdated, its hash with the preferred hasher.
+    """
+    if not check_password(password, encoded):
+        return False, None
+    hasher = identify_hasher(encoded)
+    preferred = get_hasher()
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def verify_password(password, encoded):
+    """
+    Check a password on the hashing pool, keeping the calling thread free of
+    the hashing work, and return check_and_update(password, encoded).
+
+    At most WORKERS + MAX_QUEUE checks are in flight per process; beyond that
+    HashingBusy is raised right away, or after TIMEOUT seconds, rather than letting callers pile up
+    behind a burst. With no WORKERS the check runs in the calling thread.
+    """
+    start = time.perf_counter()
+    if not settings.PASSWORD_HASHING['WORKERS']:
+        result = check_and_update(password, encoded)
+    else:
+        slots = get_check_slots()
+        if not slots.acquire(blocking=False):
+            password_checks.inc(result='busy')
+            raise HashingBusy()
+        try:
+            future = submit('login', check_and_update, password, encoded)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda future: slots.release())
+        try:
+            result = future.result(timeout=settings.PASSWORD_HASHING['TIMEOUT'])
+        except TimeoutError:
+            future.cancel()  # Unless a worker already took it.
+            password_checks.inc(result='busy')
+            raise HashingBusy() from None
+        except BrokenProcessPool:
+            # A worker died during the check; the next one gets a new pool.
+            password_checks.inc(result='busy')
+            raise HashingBusy() from None
+    password_check_seconds.observe(time.perf_counter() - start)
+    password_checks.inc(result='valid' if result[0] else 'invalid')
+    return result
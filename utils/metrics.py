@@ -0,0 +1,244 @@
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+# Seconds, suited to request and dependency latencies.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    """
+    Per-process counter, optionally split by labels.
+
+    Increments are plain dict updates without locking; a lost increment under
+    heavy thread contention is an acceptable price for keeping them off the
+    request path.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = defaultdict(int)
+
+    def inc(self, amount=1, **labels):
+        self.values[label_key(labels)] += amount
+
+    def get(self, **labels):
+        return self.values.get(label_key(labels), 0)
+
+    def export(self):
+        return {'kind': self.kind, 'documentation': self.documentation, 'values': dict(self.values)}
+
+
+class Histogram:
+    """
+    Per-process histogram of observed values, optionally split by labels.
+
+    Each label set keeps a count per bucket (the last one for values above
+    every bound), the sum and the count of observations. Same locking
+    trade-off as Counter.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = label_key(labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values.setdefault(key, {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0})
+        series['buckets'][bisect_left(self.buckets, value)] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def snapshot(self, **labels):
+        """
+        Return {count, sum, buckets} for one label set, with cumulative
+        bucket counts keyed by upper bound as in the Prometheus format.
+        """
+        series = self.values.get(label_key(labels))
+        if series is None:
+            return {'count': 0, 'sum': 0.0, 'buckets': {}}
+        buckets, total = {}, 0
+        for bound, count in zip((*self.buckets, '+Inf'), series['buckets']):
+            total += count
+            buckets[str(bound)] = total
+        return {'count': series['count'], 'sum': series['sum'], 'buckets': buckets}
+
+    def export(self):
+        return {
+            'kind': self.kind,
+            'documentation': self.documentation,
+            'buckets': self.buckets,
+            'values': {key: {**series, 'buckets': list(series['buckets'])} for key, series in list(self.values.items())},
+        }
+
+
+def counter(name, documentation):
+    """
+    Return the registered counter `name`, creating it on first use.
+    """
+    if name not in registry:
+        registry[name] = Counter(name, documentation)
+    return registry[name]
+
+
+def histogram(name, documentation, buckets=DEFAULT_BUCKETS):
+    """
+    Return the registered histogram `name`, creating it on first use.
+    """
+    if name not in registry:
+        registry[name] = Histogram(name, documentation, buckets)
+    return registry[name]
+
+
+def export():
+    """
+    Plain copy of every registered metric, as published to other processes.
+    """
+    return {name: metric.export() for name, metric in list(registry.items())}
+
+
+def merge(exports):
+    """
+    Sum exports of several processes: counters add up, histograms add up
+    bucket by bucket. Histograms whose buckets differ keep the first ones.
+    """
+    merged = {}
+    for exported in exports:
+        for name, metric in exported.items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            if metric['kind'] != target['kind'] or metric.get('buckets') != target.get('buckets'):
+                continue
+            for key, value in metric['values'].items():
+                if metric['kind'] == 'counter':
+                    target['values'][key] = target['values'].get(key, 0) + value
+                elif key not in target['values']:
+                    target['values'][key] = {**value, 'buckets': list(value['buckets'])}
+                else:
+                    series = target['values'][key]
+                    series['buckets'] = [a + b for a, b in zip(series['buckets'], value['buckets'])]
+                    series['sum'] += value['sum']
+                    series['count'] += value['count']
+    return merged
+
+
+def format_labels(key, extra=()):
+    labels = (*key, *extra)
+    if not labels:
+        return ''
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{%s}' % ','.join('%s="%s"' % (name, escape(value)) for name, value in labels)
+
+
+def render(exported):
+    """
+    Render an export in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, metric in sorted(exported.items()):
+        lines.append('# HELP %s %s' % (name, metric['documentation']))
+        lines.append('# TYPE %s %s' % (name, metric['kind']))
+        for key, value in sorted(metric['values'].items()):
+            if metric['kind'] == 'counter':
+                lines.append('%s%s %s' % (name, format_labels(key), value))
+                continue
+            total = 0
+            for bound, count in zip((*metric['buckets'], '+Inf'), value['buckets']):
+                total += count
+                lines.append('%s_bucket%s %s' % (name, format_labels(key, [('le', bound)]), total))
+            lines.append('%s_sum%s %s' % (name, format_labels(key), value['sum']))
+            lines.append('%s_count%s %s' % (name, format_labels(key), value['count']))
+    return '\n'.join(lines) + '\n'
+
+
+class Publisher:
+    """
+    Share this process's metrics with the other workers through the cache
+    alias METRICS['ALIAS'].
+
+    Every process claims one of METRICS['MAX_PROCESSES'] slots with
+    `cache.add` and stores its export there at most every
+    METRICS['PUBLISH_SECONDS'] seconds. Slots of processes that stopped
+    publishing expire after a few intervals. Nothing is locked: each process
+    only ever writes its own slot.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.token = None
+        self.slot = None
+        self.published_at = 0.0
+
+    @property
+    def cache(self):
+        return caches[settings.METRICS['ALIAS']]
+
+    @property
+    def timeout(self):
+        return settings.METRICS['PUBLISH_SECONDS'] * 6
+
+    def claim_slot(self):
+        if self.pid != os.getpid():
+            # A forked worker must not share its parent's slot.
+            self.pid, self.token, self.slot = os.getpid(), uuid.uuid4().hex, None
+        cache = self.cache
+        if self.slot is not None and cache.get('metrics:slot:%d' % self.slot) == self.token:
+            cache.touch('metrics:slot:%d' % self.slot, self.timeout)
+            return self.slot
+        for slot in range(settings.METRICS['MAX_PROCESSES']):
+            if cache.add('metrics:slot:%d' % slot, self.token, self.timeout):
+                self.slot = slot
+                return slot
+        self.slot = None
+        return None
+
+    def publish_if_due(self):
+        now = time.monotonic()
+        if now - self.published_at < settings.METRICS['PUBLISH_SECONDS']:
+            return
+        self.published_at = now
+        try:
+            self.publish()
+        except Exception:
+            # Metrics must never fail a request; the next interval retries.
+            logger.warning('Could not publish metrics.', exc_info=True)
+
+    def publish(self):
+        slot = self.claim_slot()
+        if slot is not None:
+            self.cache.set('metrics:export:%d' % slot, export(), self.timeout)
+
+    def collect(self):
+        """
+        Merged export of every live process, with this one's current values.
+        """
+        self.publish()
+        keys = ['metrics:export:%d' % slot for slot in range(settings.METRICS['MAX_PROCESSES'])]
+        exports = self.cache.get_many(keys)
+        if self.slot is None:
+            exports['self'] = export()
+        return merge(exports.values())
+
+
+publisher = Publisher()
@@ -0,0 +1,169 @@
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from utils.metrics import counter, histogram, publisher
+from utils.routers import RequestRouting, current_routing
+
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+requests_total = counter('http_requests_total', 'Requests by view, method and status code.')
+request_seconds = histogram('http_request_duration_seconds', 'Time spent in the view and the middleware below, by view.')
+request_queries = histogram('http_request_queries', 'SQL queries per request, by view.', QUERY_BUCKETS)
+request_db_seconds = histogram('http_request_db_seconds', 'Time spent in SQL queries per request, by view.')
+response_bytes = histogram('http_response_size_bytes', 'Size of non-streaming responses, by view.', SIZE_BUCKETS)
+
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper kept on every connection; it only measures while a
+    request has set `current_recorder`. Context variables follow the request
+    into sync_to_async threads, so async views are covered too.
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.seconds += time.perf_counter() - start
+        recorder.count += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL query count and time, and response size per resolved
+    URL name into utils.metrics, served by the /metrics view.
+
+    Queries and rows streamed after the view returned are not counted, nor is
+    the size of streaming responses. Place it first in MIDDLEWARE so the
+    latency covers the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recorder)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    def record(self, request, response, seconds, recorder):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else '<unresolved>'
+        requests_total.inc(view=view, method=request.method, status=response.status_code)
+        request_seconds.observe(seconds, view=view)
+        request_queries.observe(recorder.count, view=view)
+        request_db_seconds.observe(recorder.seconds, view=view)
+        if not response.streaming:
+            response_bytes.observe(len(response.content), view=view)
+        publisher.publish_if_due()
+
+
+class ReplicaMiddleware:
+    """
+    Let views with `replica_reads = True` read from the replicas in
+    REPLICA_ROUTING['ALIASES'] on safe methods (see utils.routers).
+
+    A successful unsafe request sets REPLICA_ROUTING['COOKIE'] and the
+    REPLICA_ROUTING['HEADER'] response header to a deadline STICKY_SECONDS
+    ahead; clients sending either back until then read from the primary, so
+    they see their own writes. Clients without cookies echo the header.
+    """
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.config = settings.REPLICA_ROUTING
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_routing.set(RequestRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.stick(request, response)
+
+    async def __acall__(self, request):
+        token = current_routing.set(RequestRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.stick(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = current_routing.get()
+        view = getattr(view_func, 'view_class', view_func)
+        if (
+            routing is not None and self.config['ALIASES'] and request.method in self.safe_methods
+            and getattr(view, 'replica_reads', False) and not self.is_pinned(request)
+        ):
+            routing.replica = True
+
+    def is_pinned(self, request):
+        header = 'HTTP_' + self.config['HEADER'].upper().replace('-', '_')
+        for value in (request.COOKIES.get(self.config['COOKIE']), request.META.get(header)):
+            try:
+                if value and float(value) > time.time():
+                    return True
+            except ValueError:
+                pass
+        return False
+
+    def stick(self, request, response):
+        if self.config['ALIASES'] and request.method not in self.safe_methods and response.status_code < 400:
+            seconds = self.config['STICKY_SECONDS']
+            deadline = '%.3f' % (time.time() + seconds)
+            response.set_cookie(self.config['COOKIE'], deadline, max_age=seconds, httponly=True, samesite='Lax')
+            response[self.config['HEADER']] = deadline
+        return response
@@ -1,4 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class LargeResultsSetPagination(PageNumberPagination):
     page_size = 1000
@@ -26,3 +39,256 @@ class SmallResultsSetPagination(PageNumberPagination):
         response = super(SmallResultsSetPagination, self).get_paginated_response(*args, **kwargs)
         response.data['total_pages'] = self.page.paginator.num_pages
         return response
+
+def estimate_count(queryset):
+    """
+    Return the planner's row estimate for an unfiltered PostgreSQL queryset,
+    or None when there is no estimate (other backends, filtered querysets,
+    tables never analyzed).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.has_filters() or queryset.query.distinct:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedPage(Page):
+    def has_next(self):
+        return self.more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that does not COUNT(*) large tables on every page.
+
+    Tables estimated at COUNT_ESTIMATES['THRESHOLD'] rows or more report the
+    PostgreSQL reltuples estimate; otherwise the exact count is used, and
+    cached for COUNT_ESTIMATES['TIMEOUT'] seconds when at or above the
+    threshold. Pages fetch one extra row, so next links stay exact even when
+    the count is not, and pages past an underestimated count still resolve.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        config = settings.COUNT_ESTIMATES
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= config['THRESHOLD']:
+            self.estimated = True
+            return estimate
+        cache = caches[config['ALIAS']]
+        key = 'count:%s' % hashlib.md5(str(self.object_list.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            if count >= config['THRESHOLD']:
+                cache.set(key, count, config['TIMEOUT'])
+        else:
+            self.estimated = True
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past the last page by the count; page() checks for rows.
+            if self.estimated and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        page = EstimatedPage(rows[:self.per_page], number, self)
+        page.more = len(rows) > self.per_page
+        return page
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    SmallResultsSetPagination over EstimatedCountPaginator; `count` and
+    `total_pages` are approximate when `count_is_estimate` is true.
+    """
+    django_paginator_class = EstimatedCountPaginator
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, *args, **kwargs):
+        response = super().get_paginated_response(*args, **kwargs)
+        response.data['total_pages'] = self.page.paginator.num_pages
+        response.data['count_is_estimate'] = self.page.paginator.estimated
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['total_pages'] = {'type': 'integer'}
+        response_schema['properties']['count_is_estimate'] = {'type': 'boolean'}
+        return response_schema
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a stable, indexed ordering.
+
+    Pages are addressed by an opaque cursor holding the ordering key of the
+    last (or first) row served, so fetching page 10,000 is the same index
+    range scan as fetching page 1. The primary key is appended to every
+    ordering as a tie-breaker. The total count is skipped unless requested
+    with ``?count=1``.
+
+    Pagination is opt-in unless ``always_paginate`` is set: without
+    ``cursor`` or ``page_size`` in the query string ``paginate_queryset``
+    returns None and the view serves the full list.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    count_query_param = 'count'
+    orderings = ('name', '-name', 'price', '-price')
+    default_ordering = 'name'
+    unique_field = 'uuid'
+    invalid_cursor_message = 'Invalid cursor'
+    always_paginate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if not self.always_paginate and self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+        self.count = None
+        if params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position, reverse))
+        ordering = [self.invert(name) for name in self.ordering] if reverse else self.ordering
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        del results[self.page_size:]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if ordering not in self.orderings:
+            ordering = self.default_ordering
+        prefix = '-' if ordering.startswith('-') else ''
+        return [ordering, prefix + self.unique_field]
+
+    @staticmethod
+    def invert(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    def get_keyset_filter(self, position, reverse):
+        """
+        Build ``(a > x) OR (a = x AND b > y)`` for the ordering columns,
+        with the comparison flipped for descending or backward pages.
+        """
+        keyset = Q()
+        equal = Q()
+        for name, field, value in zip(self.ordering, self.fields, position):
+            descending = name.startswith('-') != reverse
+            lookup = '%s__%s' % (field.name, 'lt' if descending else 'gt')
+            keyset |= equal & Q(**{lookup: value})
+            equal &= Q(**{field.name: value})
+        return keyset
+
+    def get_position(self, obj):
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def encode_cursor(self, obj, reverse):
+        payload = {'p': [str(value) for value in self.get_position(obj)]}
+        if reverse:
+            payload['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()))
+            position = [field.to_python(value) for field, value in zip(self.fields, payload['p'], strict=True)]
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Only present with ?count=1.'},
+                'results': schema,
+            },
+        }
+
+
+class UserKeysetPagination(KeysetPagination):
+    """
+    Keyset pages of users on (username, uuid), backed by the unique index on
+    username.
+    """
+    page_size = 10
+    max_page_size = 100
+    orderings = ('username', '-username')
+    default_ordering = 'username'
+    always_paginate = True
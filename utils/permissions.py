@@ -1,4 +1,44 @@
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework.permissions import BasePermission
+from utils.metrics import counter
+
+group_lookups = counter('group_cache_lookups_total', 'Group membership lookups by where they were answered (request, cache, database).')
+
+
+def group_cache_key(user_id):
+    return 'groups:%s' % user_id
+
+
+def get_group_names(user):
+    """
+    Return the names of the user's groups.
+
+    Cached on the user object for the rest of the request and in the shared
+    cache for GROUP_CACHE['TIMEOUT'] seconds; users.signals drops the shared
+    entry when memberships change.
+    """
+    names = getattr(user, '_group_names', None)
+    if names is not None:
+        group_lookups.inc(source='request')
+        return names
+
+    cache = caches[settings.GROUP_CACHE['ALIAS']]
+    key = group_cache_key(user.pk)
+    names = cache.get(key)
+    if names is None:
+        group_lookups.inc(source='database')
+        names = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, names, settings.GROUP_CACHE['TIMEOUT'])
+    else:
+        group_lookups.inc(source='cache')
+    user._group_names = names
+    return names
+
+
+def invalidate_group_names(user_ids):
+    caches[settings.GROUP_CACHE['ALIAS']].delete_many([group_cache_key(user_id) for user_id in user_ids])
+
 
 class HasGroupPermission(BasePermission):
     """
@@ -10,4 +50,4 @@ class HasGroupPermission(BasePermission):
             return False
         
         required_groups = getattr(view, 'required_groups', [])
-        return request.user.groups.filter(name__in=required_groups).exists()
+        return not get_group_names(request.user).isdisjoint(required_groups)
@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from utils.metrics import counter
+
+replica_reads = counter('db_replica_reads_total', 'Routed reads by database alias.')
+replica_checks = counter('db_replica_checks_total', 'Replica health checks by alias and result (ok, lagging, down).')
+
+
+class RequestRouting:
+    """
+    Routing decision of one request. utils.middleware.ReplicaMiddleware
+    publishes it in `current_routing` before the view is known and sets
+    `replica` once it is, which also reaches the copies of the context that
+    sync_to_async threads run in.
+    """
+
+    def __init__(self):
+        self.replica = False
+
+
+current_routing = ContextVar('current_routing', default=None)
+
+LAG_SQL = """
+    SELECT CASE WHEN pg_is_in_recovery()
+        THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        ELSE 0 END
+"""
+
+
+class ReplicaMonitor:
+    """
+    Per-process view of which replicas are usable.
+
+    Each replica is checked at most every REPLICA_ROUTING['CHECK_SECONDS'] by
+    the first request that needs it; other threads keep using the previous
+    result meanwhile. A replica that cannot be reached or replays more than
+    REPLICA_ROUTING['MAX_LAG'] seconds behind the primary is skipped until a
+    later check passes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {}
+        self.healthy = {}
+
+    def is_healthy(self, alias):
+        config = settings.REPLICA_ROUTING
+        if time.monotonic() - self.checked.get(alias, float('-inf')) >= config['CHECK_SECONDS'] and self.lock.acquire(blocking=False):
+            try:
+                self.healthy[alias] = self.check(alias, config['MAX_LAG'])
+                self.checked[alias] = time.monotonic()
+            finally:
+                self.lock.release()
+        return self.healthy.get(alias, False)
+
+    def check(self, alias, max_lag):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL if connection.vendor == 'postgresql' else 'SELECT 0')
+                lag = float(cursor.fetchone()[0])
+        except Exception:
+            connection.close_if_unusable_or_obsolete()
+            replica_checks.inc(alias=alias, result='down')
+            return False
+        result = 'ok' if lag <= max_lag else 'lagging'
+        replica_checks.inc(alias=alias, result=result)
+        return result == 'ok'
+
+
+monitor = ReplicaMonitor()
+
+
+class ReplicaRouter:
+    """
+    Send reads of opted-in requests to a healthy replica among
+    REPLICA_ROUTING['ALIASES'], everything else to the primary.
+
+    Replicas are copies of `default`: relations between them are allowed and
+    migrations only run on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = 'default'
+        routing = current_routing.get()
+        if routing is not None and routing.replica:
+            replicas = [alias for alias in settings.REPLICA_ROUTING['ALIASES'] if monitor.is_healthy(alias)]
+            if replicas:
+                alias = random.choice(replicas)
+            replica_reads.inc(alias=alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.REPLICA_ROUTING['ALIASES']}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_ROUTING['ALIASES']:
+            return False
+        return None
@@ -0,0 +1,81 @@
+from decimal import Decimal
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.query import QuerySet
+from rest_framework.settings import api_settings
+
+
+class ValuesSerializer:
+    """
+    Read-only list serializer working on `values_list()` rows.
+
+    Produces the same representation as a ModelSerializer with the same
+    `Meta.model` and `Meta.fields`, but skips DRF field introspection and
+    model instantiation: columns are mapped to output keys and converters
+    once per serializer instance, and each row is a single zip over them.
+    Only concrete fields with a known representation are supported.
+
+    Pass a queryset, or rows already fetched through `values()`.
+    """
+    plain_fields = (models.CharField, models.TextField, models.IntegerField, models.BooleanField)
+
+    class Meta:
+        model = None
+        fields = ()
+
+    def __init__(self, instance, many=True):
+        assert many, 'ValuesSerializer only serializes lists.'
+        self.instance = instance
+        model_fields = [self.Meta.model._meta.get_field(name) for name in self.Meta.fields]
+        self.keys = [field.name for field in model_fields]
+        self.converters = [self.get_converter(field) for field in model_fields]
+
+    @classmethod
+    def get_columns(cls):
+        return [cls.Meta.model._meta.get_field(name).attname for name in cls.Meta.fields]
+
+    @classmethod
+    def values(cls, queryset):
+        """
+        Rows for this serializer; named so paginators can read key columns by attribute.
+        """
+        return queryset.values_list(*cls.get_columns(), named=True)
+
+    def get_converter(self, field):
+        if isinstance(field, models.ForeignKey):
+            field = field.target_field
+            if isinstance(field, models.UUIDField):
+                return lambda value: None if value is None else str(value)
+            return None
+        if isinstance(field, models.UUIDField):
+            return str if not field.null else lambda value: None if value is None else str(value)
+        if isinstance(field, models.DecimalField):
+            return self.get_decimal_converter(field)
+        if isinstance(field, self.plain_fields):
+            return None
+        raise ImproperlyConfigured(
+            '%s cannot serialize %s.%s' % (type(self).__name__, field.model.__name__, field.name)
+        )
+
+    def get_decimal_converter(self, field):
+        # Mirrors rest_framework.fields.DecimalField.to_representation.
+        spec = '.%df' % field.decimal_places
+        quantum = Decimal('.1') ** field.decimal_places
+        if api_settings.COERCE_DECIMAL_TO_STRING:
+            return lambda value: '' if value is None else format(value, spec)
+        return lambda value: None if value is None else value.quantize(quantum)
+
+    def get_rows(self):
+        if isinstance(self.instance, QuerySet):
+            return self.values(self.instance)
+        return self.instance
+
+    def to_representation(self, row):
+        return {
+            key: value if convert is None else convert(value)
+            for key, convert, value in zip(self.keys, self.converters, row)
+        }
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.get_rows()]
@@ -0,0 +1,134 @@
+import json
+from itertools import islice
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def dumps(data):
+    # Same output as DRF's JSONRenderer with default settings, which also
+    # escapes the line and paragraph separators that JavaScript before ES2019
+    # rejects in string literals.
+    content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return content.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON, one object per line.
+
+    List views stream their rows in this format themselves; the renderer makes
+    DRF accept `Accept: application/x-ndjson` (or `?format=ndjson`) and renders
+    any regular response, such as an error, as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(dumps(row) + '\n' for row in rows).encode()
+
+
+def get_stream_format(request):
+    """
+    Return 'ndjson' or 'json' when the client asked for a streamed list, else None.
+    """
+    accepted_renderer = getattr(request, 'accepted_renderer', None)
+    if accepted_renderer is not None and accepted_renderer.format == NDJSONRenderer.format:
+        return 'ndjson'
+    if request.query_params.get('stream') in ('1', 'true'):
+        return 'json'
+    return None
+
+
+def iter_chunks(queryset, chunk_size):
+    # iterator() uses a server-side cursor on PostgreSQL, so only one chunk of
+    # rows is held in memory at a time.
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def stream_queryset(queryset, serializer_class, stream_format='json', chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Serialize `queryset` chunk by chunk into a StreamingHttpResponse, either
+    as a single JSON array or as NDJSON.
+    """
+    # Rows are only fetched while the body is iterated, after ReplicaMiddleware
+    # has reset the request's routing; pin the alias the router picks now.
+    queryset = queryset.using(queryset.db)
+
+    def serialize():
+        for chunk in iter_chunks(queryset, chunk_size):
+            yield serializer_class(chunk, many=True).data
+
+    if stream_format == 'ndjson':
+        content = (''.join(dumps(row) + '\n' for row in rows) for rows in serialize())
+        return StreamingHttpResponse(content, content_type=NDJSONRenderer.media_type)
+
+    def json_array():
+        separator = '['
+        for rows in serialize():
+            if rows:
+                yield separator + ','.join(dumps(row) for row in rows)
+                separator = ','
+        yield ']' if separator == ',' else '[]'
+
+    return StreamingHttpResponse(json_array(), content_type='application/json')
+
+
+def get_async_stream_format(request):
+    """
+    Stream format for plain Django (async) views, which always stream:
+    'ndjson' when asked for through Accept or `?format=ndjson`, else 'json'.
+    """
+    if request.GET.get('format') == NDJSONRenderer.format or NDJSONRenderer.media_type in request.headers.get('Accept', ''):
+        return 'ndjson'
+    return 'json'
+
+
+async def aiter_chunks(queryset, chunk_size):
+    chunk = []
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def astream_queryset(queryset, serializer_class, stream_format='json', chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Async counterpart of `stream_queryset` for ASGI: rows are fetched with
+    `aiterator()` and the response body is an async iterator, so no worker
+    thread is held between chunks.
+    """
+    # Rows are only fetched while the body is iterated, after ReplicaMiddleware
+    # has reset the request's routing; pin the alias the router picks now.
+    queryset = queryset.using(queryset.db)
+
+    async def serialize():
+        async for chunk in aiter_chunks(queryset, chunk_size):
+            yield serializer_class(chunk, many=True).data
+
+    if stream_format == 'ndjson':
+        async def ndjson():
+            async for rows in serialize():
+                yield ''.join(dumps(row) + '\n' for row in rows)
+        return StreamingHttpResponse(ndjson(), content_type=NDJSONRenderer.media_type)
+
+    async def json_array():
+        separator = '['
+        async for rows in serialize():
+            if rows:
+                yield separator + ','.join(dumps(row) for row in rows)
+                separator = ','
+        yield ']' if separator == ',' else '[]'
+
+    return StreamingHttpResponse(json_array(), content_type='application/json')
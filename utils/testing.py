@@ -0,0 +1,89 @@
+import json
+from contextlib import contextmanager
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def explain(sql):
+    """
+    Return the root node of the PostgreSQL plan of `sql`.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+        plan = cursor.fetchone()[0]
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+
+def estimated_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(table)])
+        return cursor.fetchone()[0]
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def analyze():
+    """
+    Refresh planner statistics after seeding, so plans match a populated
+    database. GIN pending lists are merged too, as autovacuum would have; the
+    planner prices large ones as slow to scan.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT gin_clean_pending_list(index.oid) FROM pg_class index
+                JOIN pg_am am ON am.oid = index.relam
+                WHERE am.amname = 'gin' AND index.relnamespace = current_schema()::regnamespace
+            """)
+            cursor.execute('ANALYZE')
+
+
+def clear_caches():
+    """
+    Empty every cache alias, so cached responses, counts and memberships
+    from earlier tests are not served.
+    """
+    for cache in caches.all():
+        cache.clear()
+
+
+class QueryPlanMixin:
+    """
+    TestCase mixin for endpoint query budgets.
+
+        with self.assertQueryPlan(max_queries=2, seq_scans=['items_category']):
+            self.client.get('/items/categories')
+
+    Fails when the block runs more than `max_queries` queries or, on
+    PostgreSQL, when the plan of one of its SELECTs sequentially scans a table
+    of `min_rows` or more rows that is not listed in `seq_scans`; reading a
+    small lookup table whole is cheaper than any index. Failures include the
+    queries and plans. Caches are cleared before every test so that
+    responses are computed.
+    """
+    min_rows = 1000
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+
+    @contextmanager
+    def assertQueryPlan(self, max_queries, seq_scans=()):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertLessEqual(len(queries), max_queries, 'Query budget exceeded:\n' + '\n'.join(queries))
+        if connection.vendor != 'postgresql':
+            return
+        for sql in queries:
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                continue
+            plan = explain(sql)
+            scanned = {node['Relation Name'] for node in plan_nodes(plan) if node['Node Type'] == 'Seq Scan'}
+            unexpected = sorted(table for table in scanned - set(seq_scans) if estimated_rows(table) >= self.min_rows)
+            self.assertFalse(unexpected, 'Sequential scan on %s:\n%s\n%s' % (', '.join(unexpected), sql, json.dumps(plan, indent=2)))
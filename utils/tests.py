@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from psycopg2 import extensions
+from rest_framework.renderers import JSONRenderer
+from utils import metrics, uuids
+from utils.db.pooled_postgresql.base import ConnectionPool, PoolTimeout
+from utils.metrics import Counter, Histogram, Publisher, merge, render
+from utils.middleware import request_db_seconds, request_queries, requests_total
+from utils.streaming import dumps
+from utils.testing import clear_caches
+from utils.uuids import uuid7
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.broken = False
+
+    def cursor(self):
+        if self.broken:
+            raise OSError('server closed the connection')
+        return mock.MagicMock()
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def get_pool(self, **options):
+        return ConnectionPool('default', **{'max_size': 2, 'timeout': 1, 'max_lifetime': 3600, 'check_after': 30, **options})
+
+    def test_reuse(self):
+        pool = self.get_pool()
+        connect = mock.Mock(side_effect=FakeConnection)
+        connection, created, _ = pool.getconn(connect)
+        pool.putconn(connection, created)
+        self.assertIs(pool.getconn(connect)[0], connection)
+        self.assertEqual((connect.call_count, pool.size), (1, 1))
+
+    def test_fill(self):
+        pool = self.get_pool()
+        pool.fill(FakeConnection, 5)
+        self.assertEqual((pool.size, len(pool.idle)), (2, 2))
+
+    def test_wait_for_a_connection(self):
+        pool = self.get_pool(max_size=1, timeout=0.01)
+        connection, created, _ = pool.getconn(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+        pool.timeout = 5
+        timer = threading.Timer(0.05, pool.putconn, (connection, created))
+        timer.start()
+        self.assertIs(pool.getconn(FakeConnection)[0], connection)
+        timer.join()
+
+    def test_rolled_back_on_return(self):
+        pool = self.get_pool()
+        connection, created, _ = pool.getconn(FakeConnection)
+        connection.status = extensions.TRANSACTION_STATUS_INERROR
+        pool.putconn(connection, created)
+        self.assertEqual(pool.getconn(FakeConnection)[0].get_transaction_status(), extensions.TRANSACTION_STATUS_IDLE)
+
+    def test_discarded(self):
+        pool = self.get_pool(max_lifetime=0)
+        connection, created, _ = pool.getconn(FakeConnection)
+        pool.putconn(connection, created)
+        self.assertEqual((connection.closed, pool.size, pool.idle), (1, 0, []))
+
+        pool = self.get_pool(check_after=0)
+        connection, created, _ = pool.getconn(FakeConnection)
+        pool.putconn(connection, created)
+        connection.broken = True
+        self.assertIsNot(pool.getconn(FakeConnection)[0], connection)
+        self.assertEqual((connection.closed, pool.size), (1, 1))
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = self.get_pool(max_size=1)
+        with self.assertRaises(OSError):
+            pool.getconn(mock.Mock(side_effect=OSError('refused')))
+        self.assertEqual(pool.size, 0)
+        pool.getconn(FakeConnection)
+
+    def test_close(self):
+        pool = self.get_pool()
+        pool.fill(FakeConnection, 2)
+        connections = [connection for connection, _, _ in pool.idle]
+        pool.close()
+        self.assertEqual(([connection.closed for connection in connections], pool.size), ([1, 1], 0))
+
+
+class MetricsTests(SimpleTestCase):
+    def test_counter(self):
+        requests = Counter('requests_total', 'Requests.')
+        requests.inc(view='a')
+        requests.inc(2, view='a')
+        requests.inc(view='b')
+        self.assertEqual((requests.get(view='a'), requests.get(view='b'), requests.get(view='c')), (3, 1, 0))
+
+    def test_histogram(self):
+        seconds = Histogram('seconds', 'Seconds.', buckets=(1, 0.1))
+        for value in (0.05, 0.1, 0.5, 3):
+            seconds.observe(value, view='a')
+        self.assertEqual(seconds.snapshot(view='a'), {'count': 4, 'sum': 3.65, 'buckets': {'0.1': 2, '1': 3, '+Inf': 4}})
+        self.assertEqual(seconds.snapshot(view='b'), {'count': 0, 'sum': 0.0, 'buckets': {}})
+
+    def test_merge(self):
+        first, second = Counter('requests_total', 'Requests.'), Counter('requests_total', 'Requests.')
+        first.inc(view='a')
+        second.inc(2, view='a')
+        second.inc(view='b')
+        first_seconds, second_seconds = Histogram('seconds', 'Seconds.', (1,)), Histogram('seconds', 'Seconds.', (1,))
+        first_seconds.observe(0.5)
+        second_seconds.observe(2)
+        other_buckets = Histogram('seconds', 'Seconds.', (5,))
+        other_buckets.observe(1)
+        merged = merge([
+            {'requests_total': first.export(), 'seconds': first_seconds.export()},
+            {'requests_total': second.export(), 'seconds': second_seconds.export()},
+            {'seconds': other_buckets.export()},
+        ])
+        self.assertEqual(merged['requests_total']['values'], {(('view', 'a'),): 3, (('view', 'b'),): 1})
+        self.assertEqual(merged['seconds']['values'], {(): {'buckets': [1, 1], 'sum': 2.5, 'count': 2}})
+        self.assertEqual(first_seconds.values[()]['buckets'], [1, 0])
+
+    def test_render(self):
+        requests = Counter('requests_total', 'Requests.')
+        requests.inc(view='say "hi"\n')
+        seconds = Histogram('seconds', 'Seconds.', (0.1, 1))
+        seconds.observe(0.5, view='a')
+        self.assertEqual(render({'requests_total': requests.export(), 'seconds': seconds.export()}), (
+            '# HELP requests_total Requests.\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{view="say \\"hi\\"\\n"} 1\n'
+            '# HELP seconds Seconds.\n'
+            '# TYPE seconds histogram\n'
+            'seconds_bucket{view="a",le="0.1"} 0\n'
+            'seconds_bucket{view="a",le="1"} 1\n'
+            'seconds_bucket{view="a",le="+Inf"} 1\n'
+            'seconds_sum{view="a"} 0.5\n'
+            'seconds_count{view="a"} 1\n'
+        ))
+
+
+@override_settings(METRICS={**settings.METRICS, 'ALIAS': 'default', 'MAX_PROCESSES': 2})
+class PublisherTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        patcher = mock.patch.dict(metrics.registry, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.requests = metrics.counter('requests_total', 'Requests.')
+
+    def test_collect(self):
+        worker, other = Publisher(), Publisher()
+        self.requests.inc(2)
+        other.publish()
+        self.requests.inc()
+        self.assertEqual((other.slot, worker.collect()['requests_total']['values']), (0, {(): 5}))
+        self.assertEqual(worker.slot, 1)
+        # No slot left: its own values (3) are added to the published 2 + 3.
+        self.assertEqual(Publisher().collect()['requests_total']['values'], {(): 8})
+
+    def test_publish_if_due(self):
+        publisher = Publisher()
+        with mock.patch.object(publisher, 'publish') as publish:
+            publisher.publish_if_due()
+            publisher.publish_if_due()
+        publish.assert_called_once_with()
+        with mock.patch.object(publisher.cache, 'add', side_effect=ConnectionError('down')):
+            publisher.published_at = 0.0
+            with self.assertLogs('utils.metrics', 'WARNING'):
+                publisher.publish_if_due()
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_queries(self):
+        before = requests_total.get(view='items', method='GET', status=200)
+        queries, db_seconds = request_queries.snapshot(view='items'), request_db_seconds.snapshot(view='items')
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get('/items').status_code, 200)
+        self.assertGreater(len(captured), 0)
+        self.assertEqual(requests_total.get(view='items', method='GET', status=200), before + 1)
+        self.assertEqual(request_queries.snapshot(view='items')['sum'], queries['sum'] + len(captured))
+        after = request_db_seconds.snapshot(view='items')
+        self.assertEqual(after['count'], db_seconds['count'] + 1)
+        self.assertGreater(after['sum'], db_seconds['sum'])
+
+    def test_endpoint(self):
+        self.client.get('/health/live')
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE http_requests_total counter', lines)
+        self.assertIn('http_requests_total{method="GET",status="200",view="liveness_check"} %d' % requests_total.get(view='liveness_check', method='GET', status=200), lines)
+        self.assertIn('# TYPE http_request_queries histogram', lines)
+
+
+class UUID7Tests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(setattr, uuids, '_last', uuids._last)
+
+    def test_layout(self):
+        before = time.time_ns() // 1_000_000
+        values = [uuid7() for _ in range(100)]
+        after = time.time_ns() // 1_000_000
+        self.assertEqual({(value.version, value.variant) for value in values}, {(7, uuid.RFC_4122)})
+        self.assertTrue(all(before <= value.int >> 80 <= after for value in values))
+
+    def test_monotonic(self):
+        now = time.time_ns()
+        with mock.patch.object(uuids.time, 'time_ns', return_value=now):
+            values = [uuid7() for _ in range(1000)]
+        # The clock stepped back.
+        with mock.patch.object(uuids.time, 'time_ns', return_value=now - 10_000_000):
+            values.append(uuid7())
+        self.assertEqual(values, sorted(set(values)))
+        self.assertEqual({value.int >> 80 for value in values}, {now // 1_000_000})
+        self.assertEqual(values[1].int - values[0].int, 1)
+
+    def test_random_bits_overflow(self):
+        later = time.time_ns() // 1_000_000 + 1000
+        uuids._last = (os.getpid(), later, (1 << uuids.RANDOM_BITS) - 1)
+        value = uuid7()
+        self.assertEqual((value.int >> 80, value.version, value.int & (1 << 62) - 1), (later + 1, 7, 0))
+
+    def test_forked(self):
+        later = time.time_ns() // 1_000_000 + 1000
+        uuids._last = (os.getpid() + 1, later, 0)
+        self.assertLess(uuid7().int >> 80, later)
+
+
+class DumpsTests(SimpleTestCase):
+    def test_same_as_renderer(self):
+        data = [{'name': 'Zażółć\u2028gęślą\u2029jaźń', 'price': Decimal('1.50'), 'uuid': uuid.UUID(int=1), 'tags': None}]
+        self.assertEqual(dumps(data).encode(), JSONRenderer().render(data))
+        self.assertNotIn('\u2028', dumps(data))
@@ -1,8 +1,77 @@
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework.throttling import UserRateThrottle
+from utils.metrics import counter
 
-class LoginThrottle(UserRateThrottle):
+throttle_requests = counter('throttle_requests_total', 'Throttled view requests by scope and result (allowed, throttled).')
+
+
+class SlidingWindowThrottle(UserRateThrottle):
+    """
+    Rate limit per user (or client IP when anonymous) on a sliding window
+    approximated by two fixed-window counters in the THROTTLING['ALIAS']
+    cache, shared by every process when it is Redis.
+
+    The count of the previous window is weighted by the part of it still
+    inside the sliding window. A request increments the current counter
+    first, which is atomic in the cache, and gives its slot back when that
+    puts the client over the limit, so concurrent requests from any number of
+    processes never let more than the rate through.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLING['ALIAS']]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, self.elapsed = divmod(self.now, self.duration)
+        current_key = '%s:%d' % (self.key, window)
+        previous_key = '%s:%d' % (self.key, window - 1)
+        # Counters live for two windows: as the current one, then as the previous one.
+        self.cache.add(current_key, 0, timeout=2 * self.duration)
+        try:
+            self.current = self.cache.incr(current_key)
+        except ValueError:
+            self.cache.set(current_key, 1, timeout=2 * self.duration)
+            self.current = 1
+        self.previous = self.cache.get(previous_key, 0)
+
+        if self.weighted_count(self.current, self.previous, self.elapsed) <= self.num_requests:
+            throttle_requests.inc(scope=self.scope, result='allowed')
+            return True
+        try:
+            self.current = self.cache.decr(current_key)
+        except ValueError:
+            pass
+        throttle_requests.inc(scope=self.scope, result='throttled')
+        return False
+
+    def weighted_count(self, current, previous, elapsed):
+        return current + previous * (1 - elapsed / self.duration)
+
+    def wait(self):
+        """
+        Seconds until the weighted count leaves room for one more request,
+        assuming no other request gets in first.
+        """
+        room = self.num_requests - 1
+        if self.current <= room:
+            # Only the previous window's share has to decay.
+            return max(0, self.duration * (1 - (room - self.current) / self.previous) - self.elapsed)
+        # The current window becomes the previous one and decays from there.
+        return self.duration - self.elapsed + self.duration * max(0, 1 - room / self.current)
+
+
+class LoginThrottle(SlidingWindowThrottle):
     rate = '5/minute'
     scope = 'login'
 
-class DefaultThrottle(UserRateThrottle):
+class DefaultThrottle(SlidingWindowThrottle):
     rate = '10/minute'
@@ -0,0 +1,31 @@
+from django.db import transaction
+
+
+def on_commit_batched(func, values, using=None):
+    """
+    Call `func` with a set of `values` once the current transaction commits.
+
+    Calls for the same `func` within one transaction (or savepoint) share a
+    single callback, so `func` runs once with the union of their values
+    rather than once per call. Outside of a transaction `func` runs right
+    away.
+    """
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block:
+        # Only merge into a callback of the same savepoint, which is dropped
+        # along with the values added here if that savepoint is rolled back.
+        # atomic(savepoint=False) blocks record None instead of an id.
+        savepoint_ids = set(connection.savepoint_ids) - {None}
+        for callback_savepoint_ids, callback, _ in connection.run_on_commit:
+            if callback_savepoint_ids - {None} == savepoint_ids and getattr(callback, 'batched', None) is func:
+                callback.values.update(values)
+                return
+
+    pending = set(values)
+
+    def callback():
+        func(pending)
+
+    callback.batched = func
+    callback.values = pending
+    transaction.on_commit(callback, using=using)